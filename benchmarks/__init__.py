@@ -0,0 +1 @@
+"""nelpy benchmarks (not collected by the test suite)."""
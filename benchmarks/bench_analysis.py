@@ -0,0 +1,168 @@
+"""Benchmarks for tuning curves, decoding, HMMs and replay scoring."""
+
+import warnings
+
+import numpy as np
+
+import nelpy as nel
+
+from .registry import benchmark
+from .synthetic import (make_place_cell_session,
+                        make_position2D,
+                        make_epocharray)
+
+def _place_cell_data(n_units, duration, n_events, ds=0.02):
+    """Place cell session, its tuning curve, and binned candidate events."""
+    st, pos = make_place_cell_session(n_units=n_units, duration=duration)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        bst_run = st.bin(ds=0.05)
+        tc = nel.TuningCurve1D(bst=bst_run, extern=pos, n_extern=50,
+                               extmin=0, extmax=100, sigma=2)
+        events = make_epocharray(n_epochs=n_events, duration=duration,
+                                 max_epoch_duration=0.3).merge()
+        bst = st[events].bin(ds=ds)
+    return st, pos, tc, bst
+
+def _fit_hmm(bst, n_states):
+    from nelpy.hmmutils import PoissonHMM
+    hmm = PoissonHMM(n_components=n_states, random_state=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        hmm.fit(bst)
+    return hmm
+
+# TuningCurve1D/2D -----------------------------------------------------
+
+@benchmark(group='TuningCurve')
+def tuningcurve1d(bst, pos):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        nel.TuningCurve1D(bst=bst, extern=pos, n_extern=50, extmin=0,
+                          extmax=100, sigma=2)
+
+@tuningcurve1d.setup
+def _(n_units, duration):
+    st, pos = make_place_cell_session(n_units=n_units, duration=duration)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        bst = st.bin(ds=0.05)
+    return {'bst': bst, 'pos': pos}
+
+@benchmark(group='TuningCurve')
+def tuningcurve2d(bst, pos):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        nel.TuningCurve2D(bst=bst, extern=pos, ext_nx=25, ext_ny=25,
+                          ext_xmin=0, ext_xmax=100, ext_ymin=0,
+                          ext_ymax=100, sigma=2)
+
+@tuningcurve2d.setup
+def _(n_units, duration):
+    st, _ = make_place_cell_session(n_units=n_units, duration=duration)
+    pos = make_position2D(duration=duration)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        bst = st.bin(ds=0.05)
+    return {'bst': bst, 'pos': pos}
+
+# decoding -------------------------------------------------------------
+
+@benchmark(group='decoding')
+def decode1d(bst, tc):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        nel.decoding.decode1D(bst=bst, ratemap=tc)
+
+@decode1d.setup
+def _(n_units, duration, n_events):
+    _, _, tc, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'tc': tc}
+
+@benchmark(group='decoding')
+def decode2d(bst, tc):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        nel.decoding.decode2D(bst=bst, ratemap=tc)
+
+@decode2d.setup
+def _(n_units, duration, n_events):
+    st, _ = make_place_cell_session(n_units=n_units, duration=duration)
+    pos = make_position2D(duration=duration)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        tc = nel.TuningCurve2D(bst=st.bin(ds=0.05), extern=pos, ext_nx=25,
+                               ext_ny=25, ext_xmin=0, ext_xmax=100,
+                               ext_ymin=0, ext_ymax=100, sigma=2)
+        events = make_epocharray(n_epochs=n_events, duration=duration,
+                                 max_epoch_duration=0.3).merge()
+        bst = st[events].bin(ds=0.02)
+    return {'bst': bst, 'tc': tc}
+
+# PoissonHMM -----------------------------------------------------------
+
+@benchmark(group='PoissonHMM')
+def poissonhmm_fit(bst, n_states):
+    _fit_hmm(bst, n_states)
+
+@poissonhmm_fit.setup
+def _(n_units, duration, n_events, n_states):
+    _, _, _, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'n_states': n_states}
+
+@benchmark(group='PoissonHMM')
+def poissonhmm_score(bst, hmm):
+    hmm.score(bst)
+
+@poissonhmm_score.setup
+def _(n_units, duration, n_events, n_states):
+    _, _, _, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'hmm': _fit_hmm(bst, n_states)}
+
+# replay scoring -------------------------------------------------------
+
+@benchmark(group='replay')
+def replay_trajectory_score_bst(bst, tc, n_shuffles):
+    from nelpy.analysis import replay
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        replay.trajectory_score_bst(bst, tc, w=3, n_shuffles=n_shuffles)
+
+@replay_trajectory_score_bst.setup
+def _(n_units, duration, n_events, n_shuffles):
+    _, _, tc, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'tc': tc, 'n_shuffles': n_shuffles}
+
+@benchmark(group='replay')
+def replay_linregress_bst(bst, tc):
+    from nelpy.analysis import replay
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        replay.linregress_bst(bst, tc)
+
+@replay_linregress_bst.setup
+def _(n_units, duration, n_events):
+    _, _, tc, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'tc': tc}
+
+@benchmark(group='replay')
+def replay_score_hmm_transmat_shuffle(bst, hmm, n_shuffles):
+    from nelpy.analysis import replay
+    replay.score_hmm_transmat_shuffle(bst, hmm, n_shuffles=n_shuffles)
+
+@replay_score_hmm_transmat_shuffle.setup
+def _(n_units, duration, n_events, n_states, n_shuffles):
+    _, _, _, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'hmm': _fit_hmm(bst, n_states),
+            'n_shuffles': n_shuffles}
+
+@benchmark(group='replay')
+def replay_score_hmm_time_resolved(bst, hmm, n_shuffles):
+    from nelpy.analysis import replay
+    replay.score_hmm_time_resolved(bst, hmm, n_shuffles=n_shuffles)
+
+@replay_score_hmm_time_resolved.setup
+def _(n_units, duration, n_events, n_states, n_shuffles):
+    _, _, _, bst = _place_cell_data(n_units, duration, n_events)
+    return {'bst': bst, 'hmm': _fit_hmm(bst, n_states),
+            'n_shuffles': n_shuffles}
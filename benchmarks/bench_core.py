@@ -0,0 +1,106 @@
+"""Benchmarks for the nelpy core objects."""
+
+import warnings
+
+import numpy as np
+
+import nelpy as nel
+
+from .registry import benchmark
+from .synthetic import (spike_times,
+                        make_spiketrainarray,
+                        make_epocharray,
+                        make_analogsignalarray)
+
+# SpikeTrainArray ------------------------------------------------------
+
+@benchmark(group='SpikeTrainArray')
+def spiketrainarray_construction(times, duration):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        nel.SpikeTrainArray(times, fs=30000,
+                            support=nel.EpochArray([0, duration]))
+
+@spiketrainarray_construction.setup
+def _(n_units, rate, duration):
+    np.random.seed(0)
+    times = [spike_times(rate=rate, duration=duration) for _ in range(n_units)]
+    return {'times': times, 'duration': duration}
+
+@benchmark(group='SpikeTrainArray')
+def spiketrainarray_bin(st, ds):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        st.bin(ds=ds)
+
+@spiketrainarray_bin.setup
+def _(n_units, rate, duration, ds):
+    return {'st': make_spiketrainarray(n_units=n_units, rate=rate,
+                                       duration=duration),
+            'ds': ds}
+
+@benchmark(group='SpikeTrainArray')
+def spiketrainarray_restrict(st, epochs):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        st[epochs]
+
+@spiketrainarray_restrict.setup
+def _(n_units, rate, duration, n_epochs):
+    return {'st': make_spiketrainarray(n_units=n_units, rate=rate,
+                                       duration=duration),
+            'epochs': make_epocharray(n_epochs=n_epochs,
+                                      duration=duration).merge()}
+
+# EpochArray -----------------------------------------------------------
+
+@benchmark(group='EpochArray')
+def epocharray_intersect(epa, epb):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        epa.intersect(epb)
+
+@epocharray_intersect.setup
+def _(n_epochs, duration):
+    return {'epa': make_epocharray(n_epochs=n_epochs, duration=duration,
+                                   seed=0).merge(),
+            'epb': make_epocharray(n_epochs=n_epochs, duration=duration,
+                                   seed=1).merge()}
+
+@benchmark(group='EpochArray')
+def epocharray_merge(ep):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        ep.merge()
+
+@epocharray_merge.setup
+def _(n_epochs, duration):
+    return {'ep': make_epocharray(n_epochs=n_epochs, duration=duration)}
+
+# AnalogSignalArray ----------------------------------------------------
+
+@benchmark(group='AnalogSignalArray')
+def analogsignalarray_asarray(asa, at):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        asa.asarray(at=at)
+
+@analogsignalarray_asarray.setup
+def _(n_signals, duration, fs):
+    asa = make_analogsignalarray(n_signals=n_signals, duration=duration,
+                                 fs=fs, n_epochs=10)
+    at = np.sort(np.random.RandomState(0).uniform(0, duration,
+                                                  int(duration*fs/10)))
+    return {'asa': asa, 'at': at}
+
+@benchmark(group='AnalogSignalArray')
+def analogsignalarray_smooth(asa):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        asa.smooth(sigma=0.01)
+
+@analogsignalarray_smooth.setup
+def _(n_signals, duration, fs):
+    return {'asa': make_analogsignalarray(n_signals=n_signals,
+                                          duration=duration,
+                                          fs=fs, n_epochs=10)}
@@ -0,0 +1,82 @@
+"""Import-time benchmark for nelpy.
+
+Each measurement is taken in a fresh interpreter, so that nothing is
+cached in sys.modules. Run as
+
+    python -m benchmarks.bench_import [--repeat 5] [--max-seconds 1.0]
+
+The results are printed as JSON. If --max-seconds is given, the script
+exits with a non-zero status when the median import time of `nelpy`
+exceeds it, which makes it usable as a regression guard in CI.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+# modules that should *not* be loaded by a plain `import nelpy`
+HEAVY_MODULES = ['matplotlib',
+                 'pandas',
+                 'hmmlearn',
+                 'sklearn',
+                 'scipy.signal',
+                 'scipy.stats',
+                 'scipy.interpolate']
+
+_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{'seconds': elapsed,
+                  'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def time_import(module='nelpy', repeat=5):
+    """Time `import module` in fresh interpreters.
+
+    Returns
+    -------
+    result : dict
+        With keys 'module', 'times', 'median' and 'loaded' (the heavy
+        modules that were loaded as a side-effect of the import).
+    """
+    # warm up the filesystem / bytecode cache so that the first run is not
+    # dominated by compilation
+    subprocess.check_output([sys.executable, '-c', 'import ' + module])
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        out = subprocess.check_output(
+            [sys.executable, '-c', _SNIPPET.format(module=module,
+                                                    heavy=HEAVY_MODULES)])
+        res = json.loads(out.decode().strip().splitlines()[-1])
+        times.append(res['seconds'])
+        loaded = res['loaded']
+    times.sort()
+    return {'module': module,
+            'times': times,
+            'median': times[len(times)//2],
+            'loaded': loaded}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    parser.add_argument('modules', nargs='*',
+                        default=['nelpy', 'nelpy.all', 'nelpy.min'])
+    args = parser.parse_args(argv)
+
+    results = [time_import(module, repeat=args.repeat) for module in args.modules]
+    print(json.dumps(results, indent=2))
+
+    if args.max_seconds is not None:
+        slow = [r for r in results
+                if r['module'] == 'nelpy' and r['median'] > args.max_seconds]
+        if slow:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Benchmark registry and measurement helpers.
+
+A benchmark is a pair of functions: a setup function that builds the
+(synthetic) input data, and the function under test. Both receive keyword
+arguments; the setup function is passed only those scale parameters that
+appear in its signature, and whatever it returns (a dict) is passed on to
+the function under test:
+
+    @benchmark(group='core')
+    def spiketrainarray_bin(st, ds):
+        st.bin(ds=ds)
+
+    @spiketrainarray_bin.setup
+    def _(n_units, rate, duration, ds):
+        return {'st': make_spiketrainarray(...), 'ds': ds}
+
+Only the function under test is timed. Peak memory is measured with
+tracemalloc in a separate (untimed) call, since tracing slows everything
+down.
+"""
+
+import gc
+import inspect
+import time
+import tracemalloc
+import traceback
+
+__all__ = ['SCALES', 'REGISTRY', 'Benchmark', 'benchmark']
+
+# parameterized workload sizes; individual values can be overridden from
+# the runner, e.g. --param n_units=500
+SCALES = {'small': {'n_units': 20,
+                    'rate': 5.0,
+                    'duration': 60.0,
+                    'n_epochs': 100,
+                    'n_signals': 4,
+                    'fs': 1000,
+                    'ds': 0.025,
+                    'n_events': 20,
+                    'n_states': 10,
+                    'n_shuffles': 10},
+          'medium': {'n_units': 100,
+                     'rate': 5.0,
+                     'duration': 600.0,
+                     'n_epochs': 1000,
+                     'n_signals': 16,
+                     'fs': 1000,
+                     'ds': 0.025,
+                     'n_events': 100,
+                     'n_states': 20,
+                     'n_shuffles': 50},
+          'large': {'n_units': 300,
+                    'rate': 10.0,
+                    'duration': 3600.0,
+                    'n_epochs': 10000,
+                    'n_signals': 64,
+                    'fs': 1250,
+                    'ds': 0.025,
+                    'n_events': 500,
+                    'n_states': 30,
+                    'n_shuffles': 250}}
+
+REGISTRY = []
+
+def _call_with_params(func, params):
+    """Call func with the subset of params that appear in its signature."""
+    sig = inspect.signature(func)
+    if any(p.kind == p.VAR_KEYWORD for p in sig.parameters.values()):
+        return func(**params)
+    return func(**{k: v for k, v in params.items() if k in sig.parameters})
+
+class Benchmark:
+    """A single registered benchmark."""
+
+    def __init__(self, func, *, name=None, group=None):
+        self.func = func
+        self.name = name if name is not None else func.__name__
+        self.group = group if group is not None else 'misc'
+        self._setup = None
+
+    def __repr__(self):
+        return "<Benchmark {}.{}>".format(self.group, self.name)
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def setup(self, func):
+        """Decorator to register the setup function of this benchmark."""
+        self._setup = func
+        return func
+
+    def run(self, params, *, repeat=3, measure_memory=True):
+        """Run the benchmark with the given scale parameters.
+
+        Returns
+        -------
+        result : dict
+            With keys 'name', 'group', 'params', 'times', 'min', 'median',
+            'peak_bytes', and 'error' (None on success).
+        """
+        result = {'name': self.name,
+                  'group': self.group,
+                  'params': {},
+                  'times': [],
+                  'min': None,
+                  'median': None,
+                  'peak_bytes': None,
+                  'error': None}
+        try:
+            if self._setup is not None:
+                sig = inspect.signature(self._setup)
+                result['params'] = {k: v for k, v in params.items()
+                                    if k in sig.parameters}
+                state = _call_with_params(self._setup, params)
+            else:
+                state = {}
+
+            times = []
+            for _ in range(repeat):
+                gc.collect()
+                t0 = time.perf_counter()
+                self.func(**state)
+                times.append(time.perf_counter() - t0)
+            times.sort()
+            result['times'] = times
+            result['min'] = times[0]
+            result['median'] = times[len(times)//2]
+
+            if measure_memory:
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    self.func(**state)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                result['peak_bytes'] = peak
+        except Exception as e:
+            result['error'] = '{}: {}'.format(type(e).__name__, e)
+            result['traceback'] = traceback.format_exc()
+        return result
+
+def benchmark(func=None, *, name=None, group=None):
+    """Register a function as a benchmark (usable with or without args)."""
+    def decorator(f):
+        bm = Benchmark(f, name=name, group=group)
+        REGISTRY.append(bm)
+        return bm
+    if func is not None:
+        return decorator(func)
+    return decorator
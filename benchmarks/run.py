@@ -0,0 +1,131 @@
+"""Run the nelpy benchmark suite and emit JSON timings and peak memory.
+
+Examples
+--------
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale medium --filter bin --repeat 5
+    python -m benchmarks.run --scale large --param n_units=500 -o out.json
+
+Each result records the scale parameters that were actually used by the
+benchmark, its sorted timings (s), min and median, and the peak traced
+memory (bytes). Benchmarks that fail (e.g. because an optional dependency
+such as hmmlearn is missing) are reported with an 'error' entry instead
+of aborting the whole run.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import re
+import sys
+
+import numpy as np
+
+from .registry import SCALES, REGISTRY
+from . import bench_core      # registers benchmarks
+from . import bench_analysis  # registers benchmarks
+
+def _parse_param(s):
+    """Parse 'key=value' into (key, number-or-string)."""
+    key, _, value = s.partition('=')
+    if not key or not _:
+        raise argparse.ArgumentTypeError("expected key=value, got {!r}".format(s))
+    for cast in (int, float):
+        try:
+            return key, cast(value)
+        except ValueError:
+            pass
+    return key, value
+
+def run(*, scale='small', params=None, pattern=None, repeat=3,
+        measure_memory=True, verbose=False):
+    """Run all (matching) registered benchmarks.
+
+    Parameters
+    ----------
+    scale : string, optional
+        One of SCALES. Default is 'small'.
+    params : dict, optional
+        Overrides for individual scale parameters.
+    pattern : string, optional
+        Regular expression; only benchmarks whose 'group.name' matches
+        are run.
+    repeat : int, optional
+        Number of timed repetitions. Default is 3.
+
+    Returns
+    -------
+    report : dict
+        JSON-serializable report with 'meta' and 'results' entries.
+    """
+    scale_params = dict(SCALES[scale])
+    if params:
+        scale_params.update(params)
+
+    results = []
+    for bm in REGISTRY:
+        fullname = '{}.{}'.format(bm.group, bm.name)
+        if pattern is not None and not re.search(pattern, fullname):
+            continue
+        if verbose:
+            print('running {} ...'.format(fullname), file=sys.stderr, end=' ', flush=True)
+        result = bm.run(scale_params, repeat=repeat, measure_memory=measure_memory)
+        if verbose:
+            if result['error'] is None:
+                print('{:.4f} s'.format(result['median']), file=sys.stderr)
+            else:
+                print(result['error'], file=sys.stderr)
+        results.append(result)
+
+    import nelpy
+    meta = {'scale': scale,
+            'params': scale_params,
+            'repeat': repeat,
+            'timestamp': datetime.datetime.now().isoformat(),
+            'nelpy': nelpy.__version__,
+            'numpy': np.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform()}
+    return {'meta': meta, 'results': results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--param', type=_parse_param, action='append',
+                        default=[], metavar='KEY=VALUE',
+                        help='override a scale parameter, e.g. n_units=500')
+    parser.add_argument('--filter', dest='pattern', default=None,
+                        help='regex on group.name of benchmarks to run')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', dest='measure_memory',
+                        action='store_false')
+    parser.add_argument('--list', action='store_true',
+                        help='list the registered benchmarks and exit')
+    parser.add_argument('-o', '--output', default=None,
+                        help='write JSON to this file instead of stdout')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bm in REGISTRY:
+            print('{}.{}'.format(bm.group, bm.name))
+        return 0
+
+    report = run(scale=args.scale,
+                 params=dict(args.param),
+                 pattern=args.pattern,
+                 repeat=args.repeat,
+                 measure_memory=args.measure_memory,
+                 verbose=args.verbose)
+
+    out = json.dumps(report, indent=2)
+    if args.output is None:
+        print(out)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(out)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
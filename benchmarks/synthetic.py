@@ -0,0 +1,142 @@
+"""Synthetic data generators for the nelpy benchmarks.
+
+All spike trains are generated with nelpy.synthesis.poisson.GenerateSpikes,
+either as homogeneous Poisson processes, or as place cells on a linear
+track, so that the benchmarks exercise realistic (inhomogeneous) data.
+"""
+
+import warnings
+
+import numpy as np
+
+import nelpy as nel
+from nelpy.synthesis.poisson import GenerateSpikes
+
+__all__ = ['track_position',
+           'spike_times',
+           'place_cell_spike_times',
+           'make_spiketrainarray',
+           'make_epocharray',
+           'make_analogsignalarray',
+           'make_position',
+           'make_position2D',
+           'make_place_cell_session']
+
+def track_position(t, *, track_length=100.0, lap_duration=10.0):
+    """Triangle-wave position on a linear track of track_length (cm)."""
+    phase = np.mod(t, 2*lap_duration) / lap_duration
+    return track_length * np.where(phase < 1, phase, 2 - phase)
+
+def spike_times(*, rate, duration, seed=None):
+    """Spike times (s) of a homogeneous Poisson process on [0, duration)."""
+    if seed is not None:
+        np.random.seed(seed)
+    return GenerateSpikes(lambda x, t: np.full(np.size(t), rate),
+                          rate,
+                          lambda t: t,
+                          duration)
+
+def place_cell_spike_times(*, centers, duration, peak_rate=20.0, width=8.0,
+                           bg_rate=0.5, track_length=100.0, lap_duration=10.0,
+                           seed=None):
+    """Spike times (s) for a population of Gaussian place cells.
+
+    Returns
+    -------
+    times : list of np.array
+        One array of spike times per place field center.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    def position(t):
+        return track_position(t, track_length=track_length,
+                              lap_duration=lap_duration)
+
+    times = []
+    for center in centers:
+        def intensity(x, t, center=center):
+            return bg_rate + peak_rate*np.exp(-0.5*((x - center)/width)**2)
+        times.append(GenerateSpikes(intensity, bg_rate + peak_rate,
+                                    position, duration))
+    return times
+
+def make_spiketrainarray(*, n_units, rate=5.0, duration=60.0, fs=30000,
+                         seed=0):
+    """SpikeTrainArray of n_units homogeneous Poisson units."""
+    np.random.seed(seed)
+    times = [spike_times(rate=rate, duration=duration) for _ in range(n_units)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return nel.SpikeTrainArray(times, fs=fs,
+                                   support=nel.EpochArray([0, duration]))
+
+def make_epocharray(*, n_epochs, duration=60.0, max_epoch_duration=None,
+                    seed=0):
+    """EpochArray with n_epochs random (possibly overlapping) epochs."""
+    rng = np.random.RandomState(seed)
+    if max_epoch_duration is None:
+        max_epoch_duration = 2*duration/n_epochs
+    starts = np.sort(rng.uniform(0, duration, n_epochs))
+    stops = starts + rng.uniform(0, max_epoch_duration, n_epochs)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return nel.EpochArray(np.vstack((starts, stops)).T)
+
+def make_analogsignalarray(*, n_signals, duration=60.0, fs=1000, n_epochs=1,
+                           seed=0):
+    """AnalogSignalArray of Gaussian noise, split over n_epochs epochs."""
+    rng = np.random.RandomState(seed)
+    n_samples = int(duration*fs)
+    ydata = rng.randn(n_signals, n_samples)
+    edges = np.linspace(0, duration, n_epochs + 1)
+    # leave a small gap between epochs so that they are not merged
+    support = np.vstack((edges[:-1], edges[1:] - 10/fs)).T
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return nel.AnalogSignalArray(ydata, fs=fs,
+                                     support=nel.EpochArray(support))
+
+def make_position(*, duration=60.0, fs=60, track_length=100.0,
+                  lap_duration=10.0):
+    """1D linear track position as an AnalogSignalArray."""
+    t = np.arange(0, duration, 1/fs)
+    x = track_position(t, track_length=track_length,
+                       lap_duration=lap_duration)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return nel.AnalogSignalArray(x, timestamps=t, fs=fs)
+
+def make_position2D(*, duration=60.0, fs=60, arena_size=100.0,
+                    lap_duration=10.0):
+    """2D (Lissajous) open field position as an AnalogSignalArray."""
+    t = np.arange(0, duration, 1/fs)
+    x = arena_size/2*(1 + 0.95*np.sin(2*np.pi*t/lap_duration))
+    y = arena_size/2*(1 + 0.95*np.sin(2*np.pi*t/(lap_duration*np.sqrt(2))))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return nel.AnalogSignalArray(np.vstack((x, y)), timestamps=t, fs=fs)
+
+def make_place_cell_session(*, n_units, duration=60.0, fs=30000,
+                            track_length=100.0, lap_duration=10.0, seed=0):
+    """Place cell SpikeTrainArray together with the matching position.
+
+    Returns
+    -------
+    st : SpikeTrainArray
+    pos : AnalogSignalArray
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(0, track_length, n_units)
+    times = place_cell_spike_times(centers=centers,
+                                   duration=duration,
+                                   track_length=track_length,
+                                   lap_duration=lap_duration,
+                                   seed=seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        st = nel.SpikeTrainArray(times, fs=fs,
+                                 support=nel.EpochArray([0, duration]))
+    pos = make_position(duration=duration, track_length=track_length,
+                        lap_duration=lap_duration)
+    return st, pos
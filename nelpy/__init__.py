@@ -5,6 +5,9 @@ nelpy default API
 based on the python-vdmlab project (https://github.com/mvdm/vandermeerlab),
 and inspired by the neuralensemble.org NEO project
 (see http://neo.readthedocs.io/en/0.4.0/core.html).
+
+Subpackages with heavy dependencies (e.g. plotting needs matplotlib) are
+imported lazily, on first attribute access such as ``nelpy.plotting``.
 """
 
 # from .objects import *  # NOTE: control exported symbols in objects.py
@@ -12,13 +15,21 @@ and inspired by the neuralensemble.org NEO project
 from .core import *
 from .auxiliary import *
 
-# from . import analysis
-from . import filtering
-from . import plotting
-from . import utils
-from . import utils_
-from .utils_ import metrics
-# from . import io
+from .utils_.lazy import lazy_submodules as _lazy_submodules
+
+# loaded on first access; see nelpy.utils_.lazy
+__getattr__, __dir__ = _lazy_submodules(__name__,
+                                        {'analysis': '.analysis',
+                                         'decoding': '.decoding',
+                                         'filtering': '.filtering',
+                                         'hmmutils': '.hmmutils',
+                                         'io': '.io',
+                                         'metrics': '.utils_.metrics',
+                                         'plotting': '.plotting',
+                                         'scoring': '.scoring',
+                                         'synthesis': '.synthesis',
+                                         'utils': '.utils',
+                                         'utils_': '.utils_'})
 
 from . version import __version__
 
@@ -6,16 +6,23 @@ nelpy full API
 based on the python-vdmlab project (https://github.com/mvdm/vandermeerlab),
 and inspired by the neuralensemble.org NEO project
 (see http://neo.readthedocs.io/en/0.4.0/core.html).
+
+Submodules (hmmutils needs hmmlearn, io needs pandas, plotting needs
+matplotlib) are imported lazily, on first attribute access.
 """
 
 from .core import *  # NOTE: control exported symbols in objects.py
 
-from . import filtering
-from . import hmmutils
-from . import io
-from . import decoding
-from . import scoring
-from . import plotting
-from . import utils
+from .utils_.lazy import lazy_submodules as _lazy_submodules
+
+# loaded on first access; see nelpy.utils_.lazy
+__getattr__, __dir__ = _lazy_submodules(__name__,
+                                        {'filtering': '.filtering',
+                                         'hmmutils': '.hmmutils',
+                                         'io': '.io',
+                                         'decoding': '.decoding',
+                                         'scoring': '.scoring',
+                                         'plotting': '.plotting',
+                                         'utils': '.utils'})
 
 from . version import __version__
@@ -9,6 +9,8 @@ nelpy.analysis provides several commonly used analyses.
 
 from .replay import *
 from .ergodic import *
+from .correlogram import *
+from .surrogates import *
 # from .ripple import *
 # from .decoding import *
 
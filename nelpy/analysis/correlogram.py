@@ -0,0 +1,316 @@
+"""Spike train auto- and cross-correlograms.
+
+The spikes of all units are merged into a single time-sorted buffer, and
+spike pairs are found by comparing each spike with the k-th next spike, for
+k = 1, 2, ... until no spike has a partner within the correlogram window
+anymore. This takes O(N k) operations, with N the total number of spikes and
+k the typical number of spikes within a window, for all unit pairs at once,
+instead of one histogram per pair of units.
+"""
+
+__all__ = ['correlograms',
+           'autocorrelograms',
+           'jitter_correlograms',
+           'PairCorrelograms']
+
+import numpy as np
+
+from itertools import repeat
+
+from .. import core
+
+def _lag_bins(bin_size, window_size):
+    """Number of lag bins on either side of zero lag."""
+    if bin_size <= 0:
+        raise ValueError("bin_size must be positive")
+    if window_size < bin_size:
+        raise ValueError("window_size must be at least bin_size")
+    return int(0.5 * window_size / bin_size)
+
+def _merged_spikes(st, unit_idx, epochs=None, by_unit=False):
+    """Merge spike times into a single buffer.
+
+    Parameters
+    ----------
+    st : SpikeTrainArray
+    unit_idx : list of int
+        Indices of the units to include.
+    epochs : EpochArray, optional
+        Only spikes (and pairs of spikes) within the same epoch are used.
+        Default is to use the support of st.
+    by_unit : bool, optional
+        If True, spikes are sorted by unit (and then by time) and grouped
+        per unit and epoch, so that only spikes of the same unit are
+        paired. Otherwise, spikes are sorted by time, and grouped per
+        epoch. Default is False.
+
+    Returns
+    -------
+    times : np.array of float, shape (n_spikes,)
+    units : np.array of int, shape (n_spikes,)
+        Position (in unit_idx) of the unit of each spike.
+    groups : np.array of int, shape (n_spikes,)
+        Spikes are only paired within the same (contiguous) group.
+    """
+    if epochs is None:
+        epochs = st.support
+    else:
+        epochs = st.support.intersect(epochs, boundaries=True)
+    bounds = np.atleast_2d(epochs.time)
+    n_epochs = 0 if epochs.isempty else len(bounds)
+
+    times = []
+    units = []
+    groups = []
+    for ii, uu in enumerate(unit_idx):
+        unit_times = np.asarray(st.time[uu], dtype=float).ravel()
+        if n_epochs:
+            epoch_ids = np.searchsorted(bounds[:, 0], unit_times, side='right') - 1
+            keep = (epoch_ids >= 0)
+            keep[keep] = unit_times[keep] <= bounds[epoch_ids[keep], 1]
+        else:
+            epoch_ids = np.zeros(unit_times.size, dtype=int)
+            keep = np.zeros(unit_times.size, dtype=bool)
+        times.append(unit_times[keep])
+        units.append(np.full(np.count_nonzero(keep), ii))
+        groups.append(epoch_ids[keep])
+
+    times = np.concatenate(times) if times else np.array([])
+    units = np.concatenate(units).astype(int) if units else np.array([], dtype=int)
+    groups = np.concatenate(groups).astype(int) if groups else np.array([], dtype=int)
+    if by_unit:
+        groups = units * max(n_epochs, 1) + groups
+    else:
+        order = np.argsort(times, kind='mergesort')
+        times, units, groups = times[order], units[order], groups[order]
+    return times, units, groups
+
+def _correlogram_counts(times, units, groups, n_units, n_half, bin_size,
+                        auto=False, start=0, stop=None):
+    """Count spike pairs per (unit, unit, lag) bin.
+
+    Every pair of spikes (i, j), i < j, with i in [start, stop) is counted
+    once in each direction, so that the work can be split over ranges of
+    reference spikes.
+
+    Returns
+    -------
+    counts : np.array of int, shape (n_units, n_units, n_lags), or
+        (n_units, n_lags) if auto is True.
+    """
+    n_lags = 2*n_half + 1
+    n_rows = n_units if auto else n_units * n_units
+    window = (n_half + 0.5) * bin_size
+    if stop is None:
+        stop = len(times)
+
+    counts = np.zeros(n_rows * n_lags, dtype=np.int64)
+    pending = []
+    n_pending = 0
+    idx = np.arange(start, stop)
+    shift = 1
+    while idx.size:
+        idx = idx[idx + shift < len(times)]
+        partner = idx + shift
+        dt = times[partner] - times[idx]
+        # times are sorted within groups, and groups are contiguous, so a
+        # spike without partner at this shift has none at larger shifts:
+        keep = (dt < window) & (groups[partner] == groups[idx])
+        idx, partner, dt = idx[keep], partner[keep], dt[keep]
+        lag = np.floor(dt / bin_size + 0.5).astype(int)
+        ua = units[idx]
+        ub = units[partner]
+        if auto:
+            pending.append(ua * n_lags + n_half + lag)
+            pending.append(ua * n_lags + n_half - lag)
+        else:
+            pending.append((ua * n_units + ub) * n_lags + n_half + lag)
+            pending.append((ub * n_units + ua) * n_lags + n_half - lag)
+        n_pending += 2*idx.size
+        if n_pending > 2**22 or not idx.size:
+            if pending:
+                counts += np.bincount(np.concatenate(pending), minlength=counts.size)
+            pending = []
+            n_pending = 0
+        shift += 1
+
+    if auto:
+        return counts.reshape(n_units, n_lags)
+    return counts.reshape(n_units, n_units, n_lags)
+
+def _counts(times, units, groups, n_units, n_half, bin_size, auto=False, n_workers=None):
+    """Count spike pairs, optionally split over worker processes."""
+    if n_workers is None or n_workers <= 1 or len(times) < 2:
+        return _correlogram_counts(times, units, groups, n_units, n_half,
+                                   bin_size, auto=auto)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    edges = np.linspace(0, len(times), n_workers + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        partial = executor.map(_correlogram_counts, repeat(times), repeat(units),
+                               repeat(groups), repeat(n_units), repeat(n_half),
+                               repeat(bin_size), repeat(auto), edges[:-1], edges[1:])
+        return sum(partial)
+
+def correlograms(st, *, bin_size, window_size, epochs=None, n_workers=None):
+    """Compute all pairwise cross-correlograms of a SpikeTrainArray.
+
+    ccgs[a, b, k] is the number of pairs of (distinct) spikes of units a
+    and b for which the spike of unit b follows the spike of unit a by
+    lags[k] (to within half a bin). The diagonal contains the
+    autocorrelograms.
+
+    Parameters
+    ----------
+    st : SpikeTrainArray
+    bin_size : float
+        Size of the lag bins, in seconds.
+    window_size : float
+        Total width of the correlogram window, in seconds. Lags from
+        -window_size/2 to window_size/2 are used, with a bin centered on
+        zero lag.
+    epochs : EpochArray, optional
+        Only pairs of spikes within the same epoch (of the support of st,
+        restricted to epochs) are counted. Default is to use the support
+        of st.
+    n_workers : int, optional
+        Number of processes to split the spikes over. Default is to count
+        the spike pairs in the current process.
+
+    Returns
+    -------
+    ccgs : np.array of int, shape (n_units, n_units, n_lags)
+    lags : np.array, shape (n_lags,)
+        Bin centers, in seconds.
+    """
+    n_half = _lag_bins(bin_size, window_size)
+    times, units, groups = _merged_spikes(st, range(st.n_units), epochs=epochs)
+    ccgs = _counts(times, units, groups, st.n_units, n_half, bin_size,
+                   n_workers=n_workers)
+    return ccgs, np.arange(-n_half, n_half + 1) * bin_size
+
+def autocorrelograms(st, *, bin_size, window_size, epochs=None, n_workers=None):
+    """Compute the autocorrelograms of all units of a SpikeTrainArray.
+
+    Only spikes of the same unit are paired, so this is faster than taking
+    the diagonal of correlograms(). See correlograms() for the parameters.
+
+    Returns
+    -------
+    acgs : np.array of int, shape (n_units, n_lags)
+    lags : np.array, shape (n_lags,)
+        Bin centers, in seconds.
+    """
+    n_half = _lag_bins(bin_size, window_size)
+    times, units, groups = _merged_spikes(st, range(st.n_units), epochs=epochs,
+                                          by_unit=True)
+    acgs = _counts(times, units, groups, st.n_units, n_half, bin_size,
+                   auto=True, n_workers=n_workers)
+    return acgs, np.arange(-n_half, n_half + 1) * bin_size
+
+def _triangular_lag_kernel(jitter, bin_size):
+    """Probability of each lag bin offset, when both spikes of a pair are
+    jittered independently and uniformly by +/- jitter."""
+    n_ext = int(np.ceil(2*jitter / bin_size + 0.5))
+    edges = (np.arange(-n_ext, n_ext + 2) - 0.5) * bin_size
+    x = np.clip(edges, -2*jitter, 2*jitter) / (2*jitter)
+    # CDF of the triangular distribution on [-1, 1]:
+    cdf = np.where(x < 0, 0.5*(1 + x)**2, 1 - 0.5*(1 - x)**2)
+    return n_ext, np.diff(cdf)
+
+def jitter_correlograms(st, *, bin_size, window_size, jitter, epochs=None,
+                        n_workers=None):
+    """Compute jitter-corrected cross-correlograms (JCCGs).
+
+    The expected correlograms under independent, uniform jitter of all
+    spike times by up to +/- jitter are obtained by convolving correlograms
+    over a wider window with the (triangular) distribution of the lag
+    change of a spike pair, and are subtracted from the correlograms.
+    Epoch boundaries are not taken into account for the expectation.
+
+    Parameters
+    ----------
+    jitter : float
+        Maximum jitter, in seconds.
+    See correlograms() for the other parameters.
+
+    Returns
+    -------
+    jccgs : np.array of float, shape (n_units, n_units, n_lags)
+        Correlograms, minus their expectation under jitter.
+    expected : np.array of float, shape (n_units, n_units, n_lags)
+        Expected correlograms under jitter.
+    lags : np.array, shape (n_lags,)
+        Bin centers, in seconds.
+    """
+    if jitter <= 0:
+        raise ValueError("jitter must be positive")
+    n_half = _lag_bins(bin_size, window_size)
+    n_ext, kernel = _triangular_lag_kernel(jitter, bin_size)
+    times, units, groups = _merged_spikes(st, range(st.n_units), epochs=epochs)
+    wide = _counts(times, units, groups, st.n_units, n_half + n_ext, bin_size,
+                   n_workers=n_workers)
+    n_lags = 2*n_half + 1
+    expected = np.zeros(wide.shape[:2] + (n_lags,))
+    for offset, weight in zip(range(-n_ext, n_ext + 1), kernel):
+        # counts at lag k - offset move to lag k with probability weight:
+        expected += weight * wide[:, :, n_ext - offset:n_ext - offset + n_lags]
+    ccgs = wide[:, :, n_ext:n_ext + n_lags]
+    return ccgs - expected, expected, np.arange(-n_half, n_half + 1) * bin_size
+
+class PairCorrelograms(object):
+    """Lazily computed cross-correlograms of pairs of units.
+
+    Correlograms are computed (and cached) on first access, by unit ID, so
+    that only the pairs of interest are computed, e.g.,
+
+    >>> ccgs = PairCorrelograms(st, bin_size=0.001, window_size=0.1)
+    >>> ccg = ccgs[3, 7]  # unit 7 relative to unit 3
+    >>> acg = ccgs[3, 3]
+
+    Parameters
+    ----------
+    st : SpikeTrainArray
+    bin_size : float
+        Size of the lag bins, in seconds.
+    window_size : float
+        Total width of the correlogram window, in seconds.
+    epochs : EpochArray, optional
+        Only pairs of spikes within the same epoch are counted.
+    """
+
+    def __init__(self, st, *, bin_size, window_size, epochs=None):
+        if not isinstance(st, core.SpikeTrainArray):
+            raise TypeError("st must be a nelpy.SpikeTrainArray")
+        self._st = st
+        self._bin_size = bin_size
+        self._n_half = _lag_bins(bin_size, window_size)
+        self._epochs = epochs
+        self._cache = {}
+
+    @property
+    def lags(self):
+        """(np.array) Bin centers, in seconds."""
+        return np.arange(-self._n_half, self._n_half + 1) * self._bin_size
+
+    def __getitem__(self, unit_ids):
+        unit_a, unit_b = unit_ids
+        key = (unit_a, unit_b)
+        if key not in self._cache:
+            try:
+                ia = self._st.unit_ids.index(unit_a)
+                ib = self._st.unit_ids.index(unit_b)
+            except ValueError:
+                raise KeyError("unit_ids {} could not be found in SpikeTrainArray!".format(unit_ids))
+            unit_idx = [ia] if ia == ib else [ia, ib]
+            times, units, groups = _merged_spikes(self._st, unit_idx, epochs=self._epochs)
+            counts = _correlogram_counts(times, units, groups, len(unit_idx),
+                                         self._n_half, self._bin_size)
+            self._cache[key] = counts[0, -1]
+        return self._cache[key]
+
+    def __repr__(self):
+        address_str = " at " + str(hex(id(self)))
+        return "<PairCorrelograms{}: {} units, {} lags ({} computed)>".format(
+            address_str, self._st.n_units, 2*self._n_half + 1, len(self._cache))
@@ -5,7 +5,7 @@
 
 __author__  = "Sergio J. Rey <srey@asu.edu> "
 
-__all__=['steady_state','fmpt']
+__all__=['steady_state','fmpt','var_fmpt']
 
 import numpy as np
 import numpy.linalg as la
@@ -14,18 +14,73 @@ def set_self_transition_zero(x):
     """Set cost/length of self-transition to zero."""
     np.fill_diagonal(x, 0.0)
 
+def _as_stack(P):
+    """Return P as an (n_models, k, k) float array, and whether P was 2D."""
+    P = np.asarray(P, dtype=float)
+    if P.ndim not in (2, 3) or P.shape[-1] != P.shape[-2]:
+        raise ValueError("P must be a (k, k) or an (n_models, k, k) array")
+    return (P if P.ndim == 3 else P[np.newaxis]), P.ndim == 2
+
+def _steady_state(P):
+    """Steady state distributions of an (n_models, k, k) stack.
+
+    Solves pi (I - P) = 0 subject to sum(pi) = 1, by replacing the last
+    of the (linearly dependent) balance equations by the normalization.
+    This system is singular for reducible chains (e.g., with absorbing
+    states), in which case the normalized left eigenvector of the largest
+    eigenvalue of P is returned instead, one matrix at a time.
+    """
+    n_models, k, _ = P.shape
+    A = np.identity(k) - P.transpose(0, 2, 1)
+    A[:, -1, :] = 1
+    b = np.zeros((n_models, k, 1))
+    b[:, -1] = 1
+    try:
+        return la.solve(A, b)[..., 0]
+    except la.LinAlgError:
+        pass
+    # at least one singular system; solve the others, and fall back on
+    # the eigenvector for the singular ones:
+    pi = np.empty((n_models, k))
+    for ii in range(n_models):
+        try:
+            pi[ii] = la.solve(A[ii], b[ii])[:, 0]
+        except la.LinAlgError:
+            pi[ii] = _steady_state_eig(P[ii])
+    return pi
+
+def _steady_state_eig(P):
+    """Steady state distribution of a single (possibly reducible) chain,
+    from the left eigenvector of the largest eigenvalue of P."""
+    v, d = la.eig(P.T)
+    i = np.argmax(v.real)
+    pi = d[:, i].real
+    return pi / pi.sum()
+
+def _fundamental(P, pi):
+    """Fundamental matrices Z = inv(I - P + 1 pi') of an (n_models, k, k) stack."""
+    k = P.shape[-1]
+    return la.inv(np.identity(k) - P + pi[:, np.newaxis, :])
+
+def _fmpt(Z, pi):
+    """First mean passage times M_ij = (delta_ij - Z_ij + Z_jj) / pi_j."""
+    k = Z.shape[-1]
+    Zdg = np.diagonal(Z, axis1=1, axis2=2)
+    return (np.identity(k) - Z + Zdg[:, np.newaxis, :]) / pi[:, np.newaxis, :]
+
 def steady_state(P):
     """
     Calculates the steady state probability vector for a regular Markov
     transition matrix P
     Parameters
     ----------
-    P        : matrix (kxk)
-               an ergodic Markov transition probability matrix
+    P        : array (kxk) or (n_models x k x k)
+               an ergodic Markov transition probability matrix, or a stack
+               of them
     Returns
     -------
-    implicit : matrix (kx1)
-               steady state distribution
+    implicit : array (k,) or (n_models x k)
+               steady state distribution(s)
     Examples
     --------
     Taken from Kemeny and Snell. [1]_ Land of Oz example where the states are
@@ -35,25 +90,17 @@ def steady_state(P):
     percent chance of a nice day (nice, like when the witch with the monkeys
     is melting).
     >>> import numpy as np
-    >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
+    >>> p=np.array([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> steady_state(p)
-    matrix([[ 0.4],
-            [ 0.2],
-            [ 0.4]])
+    array([0.4, 0.2, 0.4])
+
     Thus, the long run distribution for Oz is to have 40 percent of the
     days classified as Rain, 20 percent as Nice, and 40 percent as Snow
     (states are mutually exclusive).
     """
-
-    v,d=la.eig(np.transpose(P))
-
-    # for a regular P maximum eigenvalue will be 1
-    mv=max(v)
-    # find its position
-    i=v.tolist().index(mv)
-
-    # normalize eigenvector corresponding to the eigenvalue 1
-    return d[:,i]/sum(d[:,i])
+    P, single = _as_stack(P)
+    pi = _steady_state(P)
+    return pi[0] if single else pi
 
 def fmpt(P):
     """
@@ -61,11 +108,12 @@ def fmpt(P):
     ergodic transition probability matrix.
     Parameters
     ----------
-    P    : matrix (kxk)
-           an ergodic Markov transition probability matrix
+    P    : array (kxk) or (n_models x k x k)
+           an ergodic Markov transition probability matrix, or a stack of
+           them
     Returns
     -------
-    M    : matrix (kxk)
+    M    : array (kxk) or (n_models x k x k)
            elements are the expected value for the number of intervals
            required for  a chain starting in state i to first enter state j
            If i=j then this is the recurrence time.
@@ -74,12 +122,13 @@ def fmpt(P):
 
 
     >>> import numpy as np
-    >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
+    >>> p=np.array([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> fm=fmpt(p)
     >>> fm
-    matrix([[ 2.5       ,  4.        ,  3.33333333],
-            [ 2.66666667,  5.        ,  2.66666667],
-            [ 3.33333333,  4.        ,  2.5       ]])
+    array([[2.5       , 4.        , 3.33333333],
+           [2.66666667, 5.        , 2.66666667],
+           [3.33333333, 4.        , 2.5       ]])
+
     Thus, if it is raining today in Oz we can expect a nice day to come
     along in another 4 days, on average, and snow to hit in 3.33 days. We can
     expect another rainy day in 2.5 days. If it is nice today in Oz, we would
@@ -87,6 +136,12 @@ def fmpt(P):
     today. (That wicked witch can only die once so I reckon that is the
     ultimate absorbing state).
 
+    Null distributions over many (e.g. shuffled) transition matrices are
+    obtained with a single call, by stacking them:
+
+    >>> fmpt(np.stack([p, p.T])).shape
+    (2, 3, 3)
+
     Notes -----
     Uses formulation (and examples on p. 218) in Kemeny and Snell (1976) [1]_
     References
@@ -95,23 +150,10 @@ def fmpt(P):
     .. [1] Kemeny, John, G. and J. Laurie Snell (1976) Finite Markov
        Chains. Springer-Verlag. Berlin
     """
-    P=np.matrix(P)
-    A=np.zeros_like(P)
-    ss=steady_state(P)
-    k=ss.shape[0]
-    for i in range(k):
-        A[:,i]=ss
-    A=A.transpose()
-    I=np.identity(k)
-    Z=la.inv(I-P+A)
-    E=np.ones_like(Z)
-    D=np.diag(1./np.diag(A))
-    Zdg=np.diag(np.diag(Z))
-    M=(I-Z+E*Zdg)*D
-    return M
-
-
-
+    P, single = _as_stack(P)
+    pi = _steady_state(P)
+    M = _fmpt(_fundamental(P, pi), pi)
+    return M[0] if single else M
 
 def var_fmpt(P):
     """
@@ -119,22 +161,23 @@ def var_fmpt(P):
     probability matrix
     Parameters
     ----------
-    P    : matrix (kxk)
-           an ergodic Markov transition probability matrix
+    P    : array (kxk) or (n_models x k x k)
+           an ergodic Markov transition probability matrix, or a stack of
+           them
     Returns
     -------
-    implic : matrix (kxk)
+    implic : array (kxk) or (n_models x k x k)
              elements are the variances for the number of intervals
              required for  a chain starting in state i to first enter state j
     Examples
     --------
     >>> import numpy as np
-    >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
+    >>> p=np.array([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> vfm=var_fmpt(p)
     >>> vfm
-    matrix([[  5.58333333,  12.        ,   6.88888889],
-            [  6.22222222,  12.        ,   6.22222222],
-            [  6.88888889,  12.        ,   5.58333333]])
+    array([[ 5.58333333, 12.        ,  6.88888889],
+           [ 6.22222222, 12.        ,  6.22222222],
+           [ 6.88888889, 12.        ,  5.58333333]])
 
     Notes
     -----
@@ -145,18 +188,18 @@ def var_fmpt(P):
     .. [1] Kemeny, John, G. and J. Laurie Snell (1976) Finite Markov
        Chains. Springer-Verlag. Berlin
     """
-    A=P**1000
-    n,k=A.shape
-    I=np.identity(k)
-    Z=la.inv(I-P+A)
-    E=np.ones_like(Z)
-    D=np.diag(1./np.diag(A))
-    Zdg=np.diag(np.diag(Z))
-    M=(I-Z+E*Zdg)*D
-    ZM=Z*M
-    ZMdg=np.diag(np.diag(ZM))
-    W=M*(2*Zdg*D-I)+2*(ZM-E*ZMdg)
-    return W-np.multiply(M,M)
+    P, single = _as_stack(P)
+    pi = _steady_state(P)
+    Z = _fundamental(P, pi)
+    M = _fmpt(Z, pi)
+    k = P.shape[-1]
+    # W = M(2 Zdg D - I) + 2(ZM - E (ZM)dg), with D = diag(1/pi)
+    Zdg = np.diagonal(Z, axis1=1, axis2=2)
+    ZM = Z @ M
+    ZMdg = np.diagonal(ZM, axis1=1, axis2=2)
+    W = M * (2 * Zdg / pi)[:, np.newaxis, :] - M + 2 * (ZM - ZMdg[:, np.newaxis, :])
+    V = W - M * M
+    return V[0] if single else V
 
 
 def _test():
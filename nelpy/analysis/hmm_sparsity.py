@@ -9,6 +9,201 @@ from ..core import SpikeTrainArray
 from ..hmmutils import PoissonHMM
 from .ergodic import steady_state
 
+# largest number of states for which all 2**num_states subsets are evaluated
+_EXACT_MAX_STATES = 16
+
+def _stationary(P, pi=None):
+    """Stationary distribution of P, as a 1D array."""
+    if pi is None:
+        pi = steady_state(np.asarray(P)).real
+    return np.asarray(pi, dtype=float).ravel()
+
+def bottleneck_ratios(P, subsets, pi=None):
+    """Bottleneck ratios Phi(S) = Q(S, S^c) / pi(S) of a batch of subsets.
+
+    Parameters
+    ----------
+    P : array, shape (num_states, num_states)
+        Transition probability matrix.
+    subsets : boolean array, shape (n_subsets, num_states)
+        Membership masks, one row per subset S.
+    pi : array, shape (num_states,), optional
+        Stationary distribution of P. Computed if not given.
+
+    Returns
+    -------
+    Phi : array, shape (n_subsets,)
+        Bottleneck ratio of every subset.
+    pi_S : array, shape (n_subsets,)
+        Stationary probability mass of every subset.
+    """
+    P = np.asarray(P, dtype=float)
+    pi = _stationary(P, pi)
+    S = np.asarray(subsets, dtype=float)
+    # Q(S, S^c) = sum_{i in S, j not in S} pi_i P_ij
+    flow = ((S * pi) @ P * (1 - S)).sum(axis=1)
+    pi_S = S @ pi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Phi = flow / pi_S
+    return Phi, pi_S
+
+def _subsets_from_codes(codes, num_states):
+    """Boolean subset masks from the bits of integer codes."""
+    return (codes[:, np.newaxis] >> np.arange(num_states)) & 1 == 1
+
+def _random_subsets(pi, n_samples):
+    """Random subsets S with pi(S) <= 1/2.
+
+    As before, the subset size is drawn uniformly from [1, num_states-2]
+    and the members are drawn without replacement. Subsets that are too
+    heavy are shrunk to the longest prefix (in draw order) with pi(S) <= 1/2,
+    instead of being redrawn one at a time.
+    """
+    num_states = len(pi)
+    sizes = np.random.randint(1, max(num_states-1, 2), size=n_samples)
+    order = np.argsort(np.random.random_sample((n_samples, num_states)), axis=1)
+    in_prefix = np.arange(num_states) < sizes[:, np.newaxis]
+    light = np.cumsum(pi[order], axis=1) <= 0.5
+    light[:, 0] = True # singletons are kept, and discarded later if too heavy
+    subsets = np.zeros((n_samples, num_states), dtype=bool)
+    np.put_along_axis(subsets, order, in_prefix & light, axis=1)
+    return subsets
+
+def bottleneck_ratio(P, *, method='sample', n_samples=50000, pi=None,
+                     chunksize=None):
+    """Bottleneck ratio (conductance) Phi* = min_{pi(S) <= 1/2} Phi(S).
+
+    Parameters
+    ----------
+    P : array, shape (num_states, num_states)
+        Ergodic transition probability matrix.
+    method : string, optional
+        One of ['sample', 'exact', 'spectral']. 'sample' evaluates
+        n_samples random subsets, and returns an upper bound on Phi*.
+        'exact' evaluates all 2**num_states subsets, and is only feasible
+        for small numbers of states. 'spectral' returns Cheeger bounds
+        from the spectral gap. Default is 'sample'.
+    n_samples : int, optional
+        Number of random subsets for method='sample'. Default is 50000.
+    pi : array, shape (num_states,), optional
+        Stationary distribution of P. Computed if not given.
+    chunksize : int, optional
+        Number of subsets evaluated at once. Default is 2**16.
+
+    Returns
+    -------
+    Phi : float, or tuple (lower, upper) for method='spectral'
+    """
+    P = np.asarray(P, dtype=float)
+    num_states = P.shape[0]
+    if method == 'exact' and num_states > _EXACT_MAX_STATES:
+        raise ValueError("exact bottleneck ratio is only supported for up "
+                         "to {} states".format(_EXACT_MAX_STATES))
+    pi = _stationary(P, pi)
+    if chunksize is None:
+        chunksize = 2**16
+
+    if method == 'spectral':
+        gap = 1 - reversibilized_eigenvalues(P, pi=pi)[1]
+        return gap / 2, np.sqrt(2 * gap)
+
+    if method == 'exact':
+        n_codes = 2**num_states - 1 # all nonempty proper subsets
+        chunks = ((frm, min(frm + chunksize, n_codes))
+                  for frm in range(1, n_codes, chunksize))
+        get_subsets = lambda frm, to: _subsets_from_codes(np.arange(frm, to), num_states)
+    elif method == 'sample':
+        chunks = ((frm, min(frm + chunksize, n_samples))
+                  for frm in range(0, n_samples, chunksize))
+        get_subsets = lambda frm, to: _random_subsets(pi, to - frm)
+    else:
+        raise ValueError("method '{}' not understood!".format(method))
+
+    min_Phi = 1
+    for frm, to in chunks:
+        Phi, pi_S = bottleneck_ratios(P, get_subsets(frm, to), pi=pi)
+        Phi = Phi[pi_S <= 0.5]
+        if Phi.size:
+            min_Phi = min(min_Phi, Phi.min())
+    return min_Phi
+
+def reversibilized_eigenvalues(P, pi=None):
+    """Eigenvalues of the additive reversibilization (P + P*)/2 of P.
+
+    P* is the time reversal of P, P*_ij = pi_j P_ji / pi_i. The
+    reversibilization has the same bottleneck ratio as P, and real
+    eigenvalues, so that Cheeger's inequality gap/2 <= Phi* <= sqrt(2 gap)
+    applies to its spectral gap.
+
+    Returns
+    -------
+    eigenvalues : array, shape (num_states,)
+        Real eigenvalues, in decreasing order.
+    """
+    P = np.asarray(P, dtype=float)
+    pi = _stationary(P, pi)
+    sqrt_pi = np.sqrt(pi)
+    # D^(1/2) P D^(-1/2); symmetrizing it symmetrizes the reversibilization
+    A = sqrt_pi[:, np.newaxis] * P / sqrt_pi
+    return np.linalg.eigvalsh((A + A.T) / 2)[::-1]
+
+def spectrum(P):
+    """Eigenvalues of P, sorted by decreasing modulus, and the absolute
+    spectral gap 1 - max(|lambda|, lambda != 1)."""
+    eigenvalues = np.linalg.eigvals(np.asarray(P, dtype=float))
+    eigenvalues = eigenvalues[np.argsort(-np.abs(eigenvalues), kind='stable')]
+    gap = 1 - np.abs(eigenvalues[1]) if len(eigenvalues) > 1 else 1
+    return eigenvalues, gap
+
+def _tv_distance(Pt, pi):
+    """Worst-case total variation distance max_x ||Pt(x, .) - pi||_TV."""
+    return 0.5 * np.abs(Pt - pi).sum(axis=1).max()
+
+def mixing_time(P, eps=0.25, pi=None, t_max=2**20):
+    """Mixing time t_mix(eps) = min{t : max_x ||P^t(x, .) - pi||_TV <= eps}.
+
+    The distance is non-increasing in t, so t_mix is found by repeated
+    squaring followed by bisection, with O(log t_mix) matrix products.
+
+    Parameters
+    ----------
+    P : array, shape (num_states, num_states)
+        Transition probability matrix.
+    eps : float, optional
+        Total variation threshold. Default is 0.25.
+    pi : array, shape (num_states,), optional
+        Stationary distribution of P. Computed if not given.
+    t_max : int, optional
+        Largest mixing time considered. Default is 2**20.
+
+    Returns
+    -------
+    t_mix : int, or np.inf if the chain has not mixed by t_max
+    """
+    P = np.asarray(P, dtype=float)
+    pi = _stationary(P, pi)
+    if _tv_distance(np.eye(len(pi)), pi) <= eps:
+        return 0
+
+    # powers[j] = P^(2^j); find the first power of two that has mixed
+    powers = [P]
+    while _tv_distance(powers[-1], pi) > eps:
+        if 2**len(powers) > t_max:
+            return np.inf
+        powers.append(powers[-1] @ powers[-1])
+    if len(powers) == 1:
+        return 1
+
+    # bisection on (2^(J-1), 2^J], building t bit by bit from the top
+    t = 2**(len(powers) - 2)
+    Pt = powers[-2]
+    for j in range(len(powers) - 3, -1, -1):
+        candidate = Pt @ powers[j]
+        if _tv_distance(candidate, pi) > eps:
+            t += 2**j
+            Pt = candidate
+    return t + 1
+
 class HMMSurrogate():
 
     def __init__(self, *, kind, st, num_states=None, ds=None, test_size=None,
@@ -126,57 +321,42 @@ class HMMSurrogate():
                 gini_distr.append(self._gini(row))
             self.results['gini_lambda_across_units'].append(gini_distr)
 
-    def score_bottleneck_ratio(self, n_samples=50000):
-        def Qij(i, j, P, pi):
-            return pi[i] * P[i,j]
-
-        def QAB(A, B, P, pi):
-            sumQ = 0
-            for i in A:
-                for j in B:
-                    sumQ += Qij(i, j, P, pi)
-            return sumQ
-
-        def complement(S, Omega):
-            return Omega - S
-
-        def Pi(S, pi):
-            sumS = 0
-            for i in S:
-                sumS += pi[i]
-            return sumS
-
-        def Phi(S, P, pi, Omega):
-            Sc = complement(S, Omega)
-            return QAB(S, Sc, P, pi) / Pi(S, pi)
-
-        P = self.hmm.transmat_
-        num_states = self._num_states
-        Omega = set(range(num_states))
-        pi_ = steady_state(P).real
-
-        min_Phi = 1
-        for nn in range(n_samples):
-            n_samp_in_subset = np.random.randint(1, num_states-1)
-            S = set(np.random.choice(num_states, n_samp_in_subset, replace=False))
-            while Pi(S, pi_) > 0.5:
-                n_samp_in_subset -=1
-                if n_samp_in_subset < 1:
-                    n_samp_in_subset = 1
-                S = set(np.random.choice(num_states, n_samp_in_subset, replace=False))
-            candidate_Phi = Phi(S, P, pi_, Omega)
-            if candidate_Phi < min_Phi:
-                min_Phi = candidate_Phi
-                if self._verbose:
-                    print("{}: {} (|S| = {})".format(nn, min_Phi, len(S)))
-
-        self.results['bottleneck'].append(min_Phi)
+    def score_bottleneck_ratio(self, n_samples=50000, method=None):
+        """Calculate and record the bottleneck ratio of the transition matrix.
+
+        Parameters
+        ----------
+        n_samples : int, optional
+            Number of random state subsets for method='sample'. Default is 50000.
+        method : string, optional
+            One of ['sample', 'exact', 'spectral']; see bottleneck_ratio. By
+            default, 'exact' is used for up to 16 states, and 'sample'
+            otherwise. Spectral (Cheeger) bounds are recorded as
+            (lower, upper) under 'bottleneck_spectral'.
+        """
+        if method is None:
+            method = 'exact' if self._num_states <= _EXACT_MAX_STATES else 'sample'
+
+        min_Phi = bottleneck_ratio(self.hmm.transmat_, method=method,
+                                   n_samples=n_samples)
+        if self._verbose:
+            print("bottleneck ratio ({}): {}".format(method, min_Phi))
+
+        if method == 'spectral':
+            self.results['bottleneck_spectral'].append(min_Phi)
+        else:
+            self.results['bottleneck'].append(min_Phi)
 
     def score_mixing_time(self, eps=0.25):
-        raise NotImplementedError
+        """Calculate and record the mixing time t_mix(eps) of the transition matrix."""
+        self.results['mixing_time'].append(mixing_time(self.hmm.transmat_, eps=eps))
 
     def score_spectrum(self):
-        pass
+        """Calculate and record the eigenvalues (by decreasing modulus) and
+        the absolute spectral gap of the transition matrix."""
+        eigenvalues, gap = spectrum(self.hmm.transmat_)
+        self.results['spectrum'].append(eigenvalues)
+        self.results['spectral_gap'].append(gap)
 
     def _preprocess_PBEs(self, PBE_idx=None):
         """used for most types of shuffles"""
@@ -19,11 +19,14 @@ from scipy.ndimage import convolve
 from scipy import stats
 
 from .. import hmmutils
+from .. import scoring
+from .. import utils
 from ..core import SpikeTrainArray
 from .. import auxiliary
 from ..decoding import decode1D as decode
 from ..decoding import k_fold_cross_validation
 from ..decoding import get_mode_pth_from_array, get_mean_pth_from_array
+from ..utils_.decorators import instrumented
 
 def get_line_of_best_Davidson_score(bst, tuningcurve, w=3, n_samples=50000):
     tc = tuningcurve
@@ -243,6 +246,7 @@ def score_hmm_events_no_xval(bst, training=None, validation=None, num_states=30,
 
     return scores_hmm, scores_hmm_shuffled, scores_hmm_percentile
 
+@instrumented('shuffle')
 def score_Davidson_final_bst_fast(bst, tuningcurve, w=None, n_shuffles=2000, n_samples=35000, verbose=False):
     """Compute the trajectory scores from Davidson et al. 2009 for each event
     in the BinnedSpikeTrainArray. DO IT EVEN FASTER!!!
@@ -393,6 +397,7 @@ def score_Davidson_final_bst_fast(bst, tuningcurve, w=None, n_shuffles=2000, n_s
         return scores_bayes, scores_bayes_shuffled, scores_bayes_percentile
     return scores_bayes
 
+@instrumented('shuffle')
 def score_Davidson_final_bst(bst, tuningcurve, w=None, n_shuffles=2000, n_samples=35000, verbose=False):
     """Compute the trajectory scores from Davidson et al. 2009 for each event
     in the BinnedSpikeTrainArray. DO IT FAST!!!
@@ -525,6 +530,7 @@ def score_Davidson_final_bst(bst, tuningcurve, w=None, n_shuffles=2000, n_sample
         return scores_bayes, scores_bayes_shuffled, scores_bayes_percentile
     return scores_bayes
 
+@instrumented('shuffle')
 def linregress_ting(bst, tuningcurve, n_shuffles=250):
     """perform linear regression on all the events in bst, and return the R^2 values"""
 
@@ -798,6 +804,7 @@ def trajectory_score_array(posterior, slope=None, intercept=None, w=None, weight
     return np.nansum(temp[:2*w+1,:])/num_non_nan_bins
 
 
+@instrumented('shuffle')
 def trajectory_score_bst(bst, tuningcurve, w=None, n_shuffles=250,
                          weights=None, normalize=False):
     """Compute the trajectory scores from Davidson et al. for each event
@@ -984,6 +991,7 @@ def score_hmm_logprob(bst, hmm, normalize=False):
 
     return logprob
 
+@instrumented('shuffle')
 def score_hmm_transmat_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Score sequences using a hidden Markov model, and a model where
     the transition probability matrix has been shuffled.BaseException
@@ -1026,6 +1034,7 @@ def score_hmm_transmat_shuffle(bst, hmm, n_shuffles=250, normalize=False):
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_timeswap_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Score sequences using a hidden Markov model, and a model where
     the transition probability matrix has been shuffled.
@@ -1062,6 +1071,7 @@ def score_hmm_timeswap_shuffle(bst, hmm, n_shuffles=250, normalize=False):
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_pooled_timeswap_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Description goes here.
 
@@ -1097,6 +1107,7 @@ def score_hmm_pooled_timeswap_shuffle(bst, hmm, n_shuffles=250, normalize=False)
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_incoherent_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Docstring goes here.
 
@@ -1119,6 +1130,7 @@ def score_hmm_incoherent_shuffle(bst, hmm, n_shuffles=250, normalize=False):
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_poisson_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Docstring goes here.
 
@@ -1141,6 +1153,7 @@ def score_hmm_poisson_shuffle(bst, hmm, n_shuffles=250, normalize=False):
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_spike_id_shuffle(bst, hmm, st_flat, n_shuffles=250, normalize=False):
     """Docstring goes here.
 
@@ -1163,6 +1176,7 @@ def score_hmm_spike_id_shuffle(bst, hmm, st_flat, n_shuffles=250, normalize=Fals
 
     return scores, shuffled
 
+@instrumented('shuffle')
 def score_hmm_unit_id_shuffle(bst, hmm, n_shuffles=250, normalize=False):
     """Docstring goes here.
 
@@ -1247,6 +1261,7 @@ def score_hmm_logprob_cumulative(bst, hmm, normalize=False):
 
     return logprob
 
+@instrumented('shuffle')
 def score_hmm_time_resolved(bst, hmm, n_shuffles=250, normalize=False):
     """Score sequences using a hidden Markov model, and a model where
     the transition probability matrix has been shuffled.BaseException
@@ -1275,91 +1290,65 @@ def score_hmm_time_resolved(bst, hmm, n_shuffles=250, normalize=False):
     else:
         raise ValueError("n_shuffles must be an integer!")
 
-    hmm_shuffled = copy.deepcopy(hmm)
-    Lbraw = score_hmm_logprob_cumulative(bst=bst,
-                               hmm=hmm,
-                               normalize=normalize)
-
-    # per event, compute L(:b|raw) - L(:b-1|raw)
-    Lb = copy.deepcopy(Lbraw)
-
-    cumLengths = np.cumsum(bst.lengths)
-    cumLengths = np.insert(cumLengths, 0, 0)
-
-    for ii in range(bst.n_epochs):
-        LE = cumLengths[ii]
-        RE = cumLengths[ii+1]
-        Lb[LE+1:RE] -= Lbraw[LE:RE-1]
-
-    n_bins = bst.n_bins
-    shuffled = np.zeros((n_shuffles, n_bins))
+    # the original transition matrix, followed by the shuffled ones (each
+    # shuffle is applied to the previously shuffled matrix):
+    transmats = np.empty((n_shuffles + 1,) + hmm.transmat_.shape)
+    transmats[0] = hmm.transmat_
     for ii in range(n_shuffles):
-        hmm_shuffled.transmat_ = shuffle_transmat(hmm_shuffled.transmat_)
-        Lbtmat = score_hmm_logprob_cumulative(bst=bst,
-                               hmm=hmm_shuffled,
-                               normalize=normalize)
+        transmats[ii+1] = shuffle_transmat(transmats[ii])
 
-        # per event, compute L(:b|tmat) - L(:b-1|raw)
-        NL = copy.deepcopy(Lbtmat)
-        for jj in range(bst.n_epochs):
-            LE = cumLengths[jj]
-            RE = cumLengths[jj+1]
-            NL[LE+1:RE] -= Lbraw[LE:RE-1]
+    # a single (batched) forward pass gives the cumulative log probability
+    # L(:b) of every bin b under every transition matrix
+    lengths = bst.lengths
+    log_normalizers = hmm.forward_filter_transmats(bst, transmats)
+    Lb_all = hmmutils._cumsum_per_sequence(log_normalizers, lengths)
+    if normalize:
+        starts = np.cumsum(lengths) - lengths
+        cumlengths = np.arange(1, bst.n_bins + 1) - np.repeat(starts, lengths)
+        Lb_all = Lb_all / cumlengths
 
-        shuffled[ii,:] = NL
+    # per event, compute L(:b|raw) - L(:b-1|raw), and L(:b|tmat) - L(:b-1|raw)
+    Lbraw = Lb_all[0]
+    Lbraw_prev = np.zeros(bst.n_bins)
+    Lbraw_prev[1:] = Lbraw[:-1]
+    Lbraw_prev[np.cumsum(lengths) - lengths] = 0
 
-    scores = Lb
+    scores = Lbraw - Lbraw_prev
+    shuffled = Lb_all[1:] - Lbraw_prev
 
     return scores, shuffled
 
 def three_consecutive_bins_above_q(pvals, lengths, q=0.75, n_consecutive=3):
-    cumLengths = np.cumsum(lengths)
-    cumLengths = np.insert(cumLengths, 0, 0)
-
-    above_thresh = 100*(1 - pvals) > q
-    idx = []
-    for ii in range(len(lengths)):
-        LE = cumLengths[ii]
-        RE = cumLengths[ii+1]
-        temp = 0
-        for b in above_thresh[LE:RE]:
-            if b:
-                temp +=1
-            else:
-                temp = 0 # reset
-        if temp >= n_consecutive:
-            idx.append(ii)
+    """Return the indices of events with at least n_consecutive consecutive
+    bins above the q-th percentile, i.e., with 100*(1 - pvals) > q.
 
-    return np.array(idx)
+    Parameters
+    ----------
+    pvals : array of size (n_bins,)
+        Per-bin p-values of all events, concatenated.
+    lengths : array of size (n_events,)
+        Number of bins in each event.
+    q : float, optional (default is 0.75)
+    n_consecutive : int, optional (default is 3)
 
+    Returns
+    -------
+    idx : array
+        Indices of events with a run of at least n_consecutive bins.
+    """
+    above_thresh = 100*(1 - np.asarray(pvals)) > q
+    max_runs = utils.get_max_run_lengths(above_thresh, lengths=lengths)
+    return np.flatnonzero(max_runs >= n_consecutive)
+
+@instrumented('shuffle')
 def _scoreOrderD_time_swap(hmm, state_sequences, lengths, n_shuffles=250, normalize=False):
     """Compute order score of state sequences
 
     A score of 0 means there's only one state.
     """
 
-    scoresD = [] # scores with no adjacent duplicates
-    n_sequences = len(state_sequences)
-    shuffled = np.zeros((n_shuffles, n_sequences))
-
-    for seqid in range(n_sequences):
-        logP = np.log(hmm.transmat_)
-        pth = state_sequences[seqid]
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq - np.log(plen)
-        scoresD.append(score)
-        for nn in range(n_shuffles):
-            logPseq = 0
-            pth = np.random.permutation(pth)
-            for ii in range(plen-1):
-                logPseq += logP[pth[ii],pth[ii+1]]
-            score = logPseq - np.log(plen)
-            shuffled[nn, seqid] = score
-
-    scoresD = np.array(scoresD)
+    scoresD, shuffled = scoring.scoreOrderD_time_swap(hmm, state_sequences,
+                                                      n_shuffles=n_shuffles)
 
     if normalize:
         scoresD = scoresD/lengths
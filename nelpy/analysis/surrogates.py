@@ -0,0 +1,201 @@
+"""Spike time surrogates of SpikeTrainArrays.
+
+All surrogates are generated on the flat spike buffer, i.e., the spike times
+of all units concatenated (unit after unit, as in st.time), and K surrogates
+are written into a single (K, n_spikes) array, so that the random numbers
+for all spikes and all surrogates are drawn at once. The surrogate spike
+times of unit u are in columns [cumsum(n_spikes)[u-1], cumsum(n_spikes)[u]),
+sorted in time. Use bin_surrogates() to bin all surrogates at once.
+"""
+
+__all__ = ['uniform_jitter_st',
+           'interval_jitter_st',
+           'isi_shuffle_st',
+           'bin_surrogates']
+
+import numpy as np
+
+from .. import utils
+from ..core import SpikeTrainArray, BinnedSpikeTrainArray
+
+def _spike_buffer(st):
+    """Flat spike buffer of st, and the edges of each unit in the buffer."""
+    if not isinstance(st, SpikeTrainArray):
+        raise TypeError("st must be a nelpy.SpikeTrainArray")
+    times = [np.asarray(unit_times, dtype=float).ravel() for unit_times in st.time]
+    lengths = np.array([len(unit_times) for unit_times in times], dtype=int)
+    edges = np.insert(np.cumsum(lengths), 0, 0)
+    if len(times):
+        times = np.concatenate(times)
+    else:
+        times = np.array([])
+    return times, edges
+
+def _surrogate_buffer(out, n_surrogates, n_spikes):
+    """Validate (or allocate) the (n_surrogates, n_spikes) output buffer."""
+    if out is None:
+        return np.empty((n_surrogates, n_spikes))
+    if out.shape != (n_surrogates, n_spikes):
+        raise ValueError("out must have shape ({}, {})".format(n_surrogates, n_spikes))
+    return out
+
+def _sort_units(out, edges):
+    """Sort the surrogate spike times of each unit, in place."""
+    for start, stop in zip(edges[:-1], edges[1:]):
+        out[:, start:stop].sort(axis=1)
+    return out
+
+def uniform_jitter_st(st, jitter, *, n_surrogates=1, random_state=None, out=None):
+    """Jitter every spike time independently and uniformly by +/- jitter.
+
+    Jittered spikes may fall outside of the support of st; they are ignored
+    by bin_surrogates().
+
+    Parameters
+    ----------
+    st : SpikeTrainArray
+    jitter : float
+        Maximum jitter, in seconds.
+    n_surrogates : int, optional
+        Number of surrogates. Default is 1.
+    random_state : None, int or np.random.Generator, optional
+        See utils._check_random_state. Default is to use np.random.
+    out : np.array, shape (n_surrogates, n_spikes), optional
+        Preallocated buffer for the surrogates.
+
+    Returns
+    -------
+    out : np.array, shape (n_surrogates, n_spikes)
+        Surrogate spike times.
+    """
+    rng = utils._check_random_state(random_state)
+    times, edges = _spike_buffer(st)
+    out = _surrogate_buffer(out, n_surrogates, len(times))
+    out[:] = rng.uniform(-jitter, jitter, size=out.shape)
+    out += times
+    return _sort_units(out, edges)
+
+def interval_jitter_st(st, interval, *, n_surrogates=1, random_state=None, out=None):
+    """Move every spike uniformly within its jitter interval.
+
+    Time is divided into consecutive intervals of fixed width, starting at
+    the start of the support of st, and every spike is placed uniformly
+    within the interval that contains it, so that the number of spikes of
+    each unit in each interval is preserved.
+
+    Parameters
+    ----------
+    st : SpikeTrainArray
+    interval : float
+        Width of the jitter intervals, in seconds.
+    See uniform_jitter_st() for the other parameters.
+
+    Returns
+    -------
+    out : np.array, shape (n_surrogates, n_spikes)
+        Surrogate spike times.
+    """
+    rng = utils._check_random_state(random_state)
+    times, edges = _spike_buffer(st)
+    out = _surrogate_buffer(out, n_surrogates, len(times))
+    t0 = st.support.start if not st.support.isempty else 0
+    interval_starts = t0 + np.floor((times - t0) / interval) * interval
+    out[:] = rng.uniform(0, interval, size=out.shape)
+    out += interval_starts
+    return _sort_units(out, edges)
+
+def isi_shuffle_st(st, *, n_surrogates=1, random_state=None, out=None):
+    """Shuffle the inter-spike intervals of each unit.
+
+    The first spike of every unit is kept in place, and the inter-spike
+    intervals that follow it are randomly permuted, so that the ISI
+    distribution, the number of spikes and the time span of each unit are
+    preserved.
+
+    Parameters
+    ----------
+    See uniform_jitter_st().
+
+    Returns
+    -------
+    out : np.array, shape (n_surrogates, n_spikes)
+        Surrogate spike times.
+    """
+    rng = utils._check_random_state(random_state)
+    times, edges = _spike_buffer(st)
+    out = _surrogate_buffer(out, n_surrogates, len(times))
+    n_spikes = len(times)
+    units = np.repeat(np.arange(len(edges) - 1), np.diff(edges))
+    first = np.zeros(n_spikes, dtype=bool)
+    first[edges[:-1][np.diff(edges) > 0]] = True
+
+    isis = np.empty(n_spikes)
+    isis[1:] = np.diff(times)
+    isis[first] = times[first]
+    # permute the ISIs within each unit (excluding first spikes), for all
+    # surrogates at once, by sorting random keys offset by the unit index:
+    rest = np.flatnonzero(~first)
+    keys = rng.random((n_surrogates, rest.size)) + units[rest]
+    perm = rest[np.argsort(keys, axis=1)]
+    out[:, first] = isis[first]
+    out[:, rest] = isis[perm]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        np.cumsum(out[:, start:stop], axis=1, out=out[:, start:stop])
+    return out
+
+def bin_surrogates(surrogates, st, bst):
+    """Bin surrogate spike times, for all surrogates at once.
+
+    Parameters
+    ----------
+    surrogates : np.array, shape (n_surrogates, n_spikes)
+        Surrogate spike times of st, e.g., from uniform_jitter_st().
+    st : SpikeTrainArray
+        The spike train that the surrogates were generated from.
+    bst : BinnedSpikeTrainArray
+        Binned spike train whose bins are used, e.g., st.bin(ds=0.01).
+        Spikes outside of the bins are ignored.
+
+    Returns
+    -------
+    counts : np.array of int, shape (n_surrogates, n_units, n_bins)
+    """
+    if not isinstance(bst, BinnedSpikeTrainArray):
+        raise TypeError("bst must be a nelpy.BinnedSpikeTrainArray")
+    _, edges = _spike_buffer(st)
+    surrogates = np.atleast_2d(surrogates)
+    n_surrogates, n_spikes = surrogates.shape
+    if n_spikes != edges[-1]:
+        raise ValueError("surrogates must have one column per spike of st")
+    if bst.n_units != st.n_units:
+        raise ValueError("st and bst must have the same units")
+
+    n_units = st.n_units
+    n_bins = bst.n_bins
+    # row of each (surrogate, spike) in the (n_surrogates * n_units) output:
+    rows = (np.arange(n_surrogates)[:, np.newaxis] * n_units
+            + np.repeat(np.arange(n_units), np.diff(edges)))
+    rows = np.broadcast_to(rows, surrogates.shape)
+
+    # bst.bins holds the bin edges of all epochs, one epoch after another;
+    # map each edge to the (global) index of the bin that it starts, or to
+    # -1 for the last edge of an epoch:
+    bins = bst.bins
+    n_edges = bst.lengths + 1
+    last_edges = np.cumsum(n_edges) - 1
+    edge_bins = np.arange(len(bins)) - np.repeat(np.arange(len(n_edges)), n_edges)
+    edge_bins[last_edges] = -1
+
+    idx = np.searchsorted(bins, surrogates, side='right') - 1
+    valid = idx >= 0
+    binidx = np.full(surrogates.shape, -1)
+    binidx[valid] = edge_bins[idx[valid]]
+    # the last bin of each epoch is closed, as in np.histogram:
+    at_last = valid & (binidx < 0)
+    at_last[at_last] = surrogates[at_last] == bins[idx[at_last]]
+    binidx[at_last] = edge_bins[idx[at_last] - 1]
+
+    inside = binidx >= 0
+    counts = np.bincount(rows[inside] * n_bins + binidx[inside],
+                         minlength=n_surrogates * n_units * n_bins)
+    return counts.reshape(n_surrogates, n_units, n_bins)
@@ -12,5 +12,6 @@ suite.
 from ._tuningcurve import *
 from ._session import Session
 from ._results import *
+from ._pipeline import *
 from ._imu import IMUSensorArray
 from ._position import PositionArray
\ No newline at end of file
@@ -0,0 +1,454 @@
+"""Batch analysis pipelines with on-disk result caching.
+
+A Pipeline is a chain of named stages (e.g., binning, tuning curves, PBE
+detection, HMM fitting, scoring) that is run on one or more sessions. The
+result of every stage is stored in a content-addressed ResultCache, keyed by
+the stage function, its parameters, and the keys of the stages it depends on,
+so that changing (the parameters or code of) one stage only recomputes that
+stage and the stages downstream of it.
+
+Example
+-------
+>>> cache = ResultCache('~/nelpy_cache', max_size=2**32)
+>>> pipeline = Pipeline([Stage('bst', bin_session, params=dict(ds=0.02)),
+...                      Stage('tc', make_tuningcurve, requires=['session', 'bst']),
+...                      Stage('score', score_replay, requires=['bst', 'tc'])],
+...                     cache=cache)
+>>> results = pipeline.map(sessions, n_workers=4)
+>>> results[0].score
+"""
+
+__all__ = ['ResultCache', 'Stage', 'Pipeline']
+
+import functools
+import hashlib
+import os
+import tempfile
+import types
+
+import dill as pickle
+import numpy as np
+
+from ._results import ResultsContainer
+
+_MISSING = object()
+
+# objects with a __dict__ that are hashed by their pickle nonetheless:
+_BY_PICKLE = (type, types.FunctionType, types.MethodType, types.ModuleType,
+              functools.partial)
+
+def _code_token(code):
+    """Bytecode and constants of a code object, without memory addresses."""
+    consts = [_code_token(c) if hasattr(c, 'co_code') else repr(c)
+              for c in code.co_consts]
+    return (code.co_code, tuple(consts), code.co_names)
+
+def _cell_token(cell):
+    """Content of a closure cell; functions are represented by their token."""
+    try:
+        value = cell.cell_contents
+    except ValueError:
+        return ('empty cell',)
+    if isinstance(value, types.FunctionType):
+        return _func_token(value)
+    return value
+
+def _func_token(func):
+    """Identity of a (stage) function: its qualified name, its code, its
+    default arguments and the values of its closure.
+
+    The code of the functions that func calls is not part of the token; see
+    the version argument of Stage.
+    """
+    if isinstance(func, functools.partial):
+        return ('partial', _func_token(func.func), func.args, func.keywords)
+    token = (getattr(func, '__module__', None),
+             getattr(func, '__qualname__', repr(func)))
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        token += _code_token(code)
+        token += (getattr(func, '__defaults__', None),
+                  getattr(func, '__kwdefaults__', None),
+                  tuple(_cell_token(cell) for cell in func.__closure__ or ()))
+    return token
+
+def _update_hash(h, obj, seen=None):
+    """Feed the content of obj into the hash object h.
+
+    Arrays are hashed by dtype, shape and buffer, containers element by
+    element (sets in the order of the hashes of their elements, since their
+    iteration order depends on PYTHONHASHSEED), and (nelpy) objects by their
+    attributes, except for the iteration counter _index. Anything else is
+    hashed by its pickle.
+    """
+    if seen is None:
+        seen = {}
+    if obj is None or isinstance(obj, (bool, int, float, complex, str)):
+        h.update('{}:{!r};'.format(type(obj).__name__, obj).encode())
+    elif isinstance(obj, bytes):
+        h.update(b'bytes:' + obj + b';')
+    elif isinstance(obj, np.ndarray):
+        h.update('ndarray:{}:{};'.format(obj.dtype.str, obj.shape).encode())
+        if obj.dtype == object:
+            for item in obj.ravel():
+                _update_hash(h, item, seen)
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update('{}:{};'.format(type(obj).__name__, len(obj)).encode())
+        for item in obj:
+            _update_hash(h, item, seen)
+    elif isinstance(obj, (set, frozenset)):
+        h.update('{}:{};'.format(type(obj).__name__, len(obj)).encode())
+        for item_key in sorted(hash_key(item) for item in obj):
+            h.update(item_key.encode())
+    elif isinstance(obj, dict):
+        h.update('dict:{};'.format(len(obj)).encode())
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key, seen)
+            _update_hash(h, obj[key], seen)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, _BY_PICKLE):
+        # objects refer to each other (e.g., obj.loc._obj is obj):
+        if id(obj) in seen:
+            h.update('ref:{};'.format(seen[id(obj)]).encode())
+            return
+        seen[id(obj)] = len(seen)
+        h.update('{}.{};'.format(type(obj).__module__, type(obj).__qualname__).encode())
+        _update_hash(h, {key: val for key, val in vars(obj).items()
+                         if key != '_index'}, seen)
+    else:
+        h.update(b'pickle:')
+        h.update(pickle.dumps(obj, protocol=4))
+
+def hash_key(*objs):
+    """Content hash (hex string) of one or more objects."""
+    h = hashlib.sha1()
+    for obj in objs:
+        _update_hash(h, obj)
+    return h.hexdigest()
+
+########################################################################
+# class ResultCache
+########################################################################
+class ResultCache(object):
+    """Content-addressed on-disk cache of (pickled) results.
+
+    Every result is stored in its own file, named after its key, in
+    cachedir. Files are written atomically, so that a cache can be shared by
+    several worker processes. Reading an entry marks it as recently used, and
+    when the total size of the cache exceeds max_size, the least recently
+    used entries are evicted.
+
+    Parameters
+    ----------
+    cachedir : string
+        Cache directory; created if it does not exist.
+    max_size : int, optional
+        Maximum total size of the cache, in bytes. Default is no limit.
+    """
+
+    _suffix = '.pkl'
+
+    def __init__(self, cachedir, max_size=None):
+        self.cachedir = os.path.abspath(os.path.expanduser(cachedir))
+        self.max_size = max_size
+        os.makedirs(self.cachedir, exist_ok=True)
+
+    def __repr__(self):
+        return "<ResultCache at '{}': {} entries, {} bytes>".format(
+            self.cachedir, len(self), self.size)
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key + self._suffix)
+
+    def _entries(self):
+        """(path, size, last use) of all entries."""
+        entries = []
+        for fname in os.listdir(self.cachedir):
+            if not fname.endswith(self._suffix):
+                continue
+            path = os.path.join(self.cachedir, fname)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # evicted by another process
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    @property
+    def size(self):
+        """(int) Total size of the cache, in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key, default=None):
+        """Cached result with the given key, or default if there is none."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fid:
+                value = pickle.load(fid)
+            os.utime(path)  # mark as recently used
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        return value
+
+    def set(self, key, value):
+        """Store a result in the cache, and evict entries if needed."""
+        fd, tmpname = tempfile.mkstemp(dir=self.cachedir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fid:
+                pickle.dump(value, fid, protocol=4)
+            os.replace(tmpname, self._path(key))
+        except BaseException:
+            os.remove(tmpname)
+            raise
+        self.evict()
+
+    def evict(self, max_size=None):
+        """Remove least recently used entries until the total size of the
+        cache is at most max_size (default is self.max_size).
+
+        Returns
+        -------
+        n_evicted : int
+            Number of entries removed.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return 0
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        n_evicted = 0
+        for path, size, _ in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(path)
+                n_evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return n_evicted
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        return self.evict(max_size=0)
+
+    def memoize(self, func):
+        """Decorator that caches the results of func, keyed by func (see
+        Stage for what is tracked) and the content of its arguments."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # closure values may change between calls:
+            key = hash_key(_func_token(func), args, kwargs)
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                self.set(key, value)
+            return value
+        return wrapper
+
+#----------------------------------------------------------------------#
+#======================================================================#
+
+########################################################################
+# class Stage
+########################################################################
+class Stage(object):
+    """A named step of a Pipeline.
+
+    The stage is computed as func(*inputs, **params), where inputs are the
+    results of the stages listed in requires, in that order.
+
+    Parameters
+    ----------
+    name : string
+        Name of the stage, and of its result in the pipeline output.
+    func : callable
+        Stage function. Must be picklable (e.g., defined at module level) to
+        be run in worker processes.
+    requires : list of string, optional
+        Names of the stages whose results are passed to func. 'session' is
+        the session itself. Default is the previous stage of the pipeline
+        (or 'session' for the first stage).
+    params : dict, optional
+        Keyword arguments of func.
+    cache : bool, optional
+        Whether to cache the result of this stage. Default is True.
+    version : object, optional
+        Part of the cache key of the stage. The cache key tracks the code,
+        default arguments and closure of func, but not the code of the
+        functions that func calls, so bump the version when those change.
+        Default is None.
+    """
+
+    def __init__(self, name, func, requires=None, params=None, cache=True,
+                 version=None):
+        if name == 'session':
+            raise ValueError("'session' is reserved for the pipeline input")
+        if not callable(func):
+            raise TypeError("func must be callable")
+        if isinstance(requires, str):
+            requires = [requires]
+        self.name = name
+        self.func = func
+        self.requires = None if requires is None else list(requires)
+        self.params = dict(params) if params is not None else {}
+        self.cache = cache
+        self.version = version
+
+    def __repr__(self):
+        return "<Stage '{}': {}({})>".format(
+            self.name, getattr(self.func, '__name__', self.func),
+            ', '.join(self.requires or []))
+
+#----------------------------------------------------------------------#
+#======================================================================#
+
+########################################################################
+# class Pipeline
+########################################################################
+class Pipeline(object):
+    """Chain of analysis stages, run on one or many sessions with cached
+    intermediate results.
+
+    The cache key of a stage is a hash of the stage function (its name, code,
+    default arguments and closure), its version, its parameters, and the keys
+    of the stages it requires; the key of a session is a hash of its content.
+    Keys can therefore be computed without running any stage, and only the
+    stages that are needed for the requested outputs, and that are not in the
+    cache, are computed.
+
+    Parameters
+    ----------
+    stages : list of Stage
+    cache : ResultCache or string, optional
+        Cache, or cache directory. Default is to not cache results.
+    """
+
+    def __init__(self, stages, cache=None):
+        stages = list(stages)
+        names = ['session']
+        for stage in stages:
+            if not isinstance(stage, Stage):
+                raise TypeError("stages must be nelpy Stage objects")
+            if stage.name in names:
+                raise ValueError("duplicate stage name '{}'".format(stage.name))
+            if stage.requires is None:
+                stage.requires = [names[-1]]
+            for req in stage.requires:
+                if req not in names:
+                    raise ValueError("stage '{}' requires '{}', which is not an "
+                                     "earlier stage".format(stage.name, req))
+            names.append(stage.name)
+        if isinstance(cache, str):
+            cache = ResultCache(cache)
+        self.stages = stages
+        self.cache = cache
+
+    def __repr__(self):
+        return "<Pipeline: {}>".format(' -> '.join(stage.name for stage in self.stages))
+
+    @property
+    def stage_names(self):
+        """(list) Names of the stages, in order."""
+        return [stage.name for stage in self.stages]
+
+    def keys(self, session):
+        """Cache keys of all stages for a session.
+
+        Returns
+        -------
+        keys : dict
+            Cache key of 'session' and of every stage.
+        """
+        keys = {'session': hash_key(session)}
+        for stage in self.stages:
+            keys[stage.name] = hash_key(_func_token(stage.func), stage.version,
+                                        stage.params,
+                                        [keys[req] for req in stage.requires])
+        return keys
+
+    def run(self, session, outputs=None):
+        """Run the pipeline on a single session.
+
+        Parameters
+        ----------
+        session : object
+            Pipeline input, e.g., a nelpy Session, or the arguments of a
+            loading stage.
+        outputs : list of string, optional
+            Names of the stages whose results are returned. Default is all
+            stages.
+
+        Returns
+        -------
+        results : ResultsContainer
+            With one attribute per output stage.
+        """
+        if outputs is None:
+            outputs = self.stage_names
+        elif isinstance(outputs, str):
+            outputs = [outputs]
+        stages = {stage.name: stage for stage in self.stages}
+        for name in outputs:
+            if name not in stages:
+                raise KeyError("no stage named '{}'".format(name))
+        keys = self.keys(session)
+        values = {'session': session}
+
+        def evaluate(name):
+            if name in values:
+                return values[name]
+            stage = stages[name]
+            value = _MISSING
+            if self.cache is not None and stage.cache:
+                value = self.cache.get(keys[name], _MISSING)
+            if value is _MISSING:
+                inputs = [evaluate(req) for req in stage.requires]
+                value = stage.func(*inputs, **stage.params)
+                if self.cache is not None and stage.cache:
+                    self.cache.set(keys[name], value)
+            values[name] = value
+            return value
+
+        results = {name: evaluate(name) for name in outputs}
+        return ResultsContainer(**results)
+
+    def map(self, sessions, outputs=None, n_workers=None):
+        """Run the pipeline on many sessions, in parallel.
+
+        Parameters
+        ----------
+        sessions : iterable
+            Pipeline inputs; see run().
+        outputs : list of string, optional
+            See run().
+        n_workers : int, optional
+            Number of worker processes. Default is os.cpu_count(). With
+            n_workers=1, sessions are run one after another in this process.
+
+        Returns
+        -------
+        results : list of ResultsContainer
+            One per session, in order.
+        """
+        sessions = list(sessions)
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(n_workers, len(sessions)))
+        if n_workers == 1:
+            return [self.run(session, outputs=outputs) for session in sessions]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(self.run, sessions,
+                                     [outputs] * len(sessions)))
+
+#----------------------------------------------------------------------#
+#======================================================================#
@@ -6,6 +6,197 @@ import numpy as np
 from ..core import _analogsignalarray, _epocharray
 from .. import utils
 
+# constant velocity model of a single position coordinate, with state
+# (x, dx), where dx is the displacement per sample:
+_CV_TRANSITION = np.array([[1., 1.], [0., 1.]])
+_CV_OBSERVATION = np.array([[1., 0.]])
+
+def _steady_state_kalman_gains(Q, R):
+    """Steady-state gains of the constant velocity Kalman filter and RTS
+    smoother.
+
+    Parameters
+    ----------
+    Q : array, shape (2, 2)
+        Transition covariance.
+    R : float
+        Observation variance.
+
+    Returns
+    -------
+    K : array, shape (2,)
+        Kalman gain.
+    J : array, shape (2, 2)
+        RTS smoother gain.
+    Pp, Pf, Ps : arrays, shape (2, 2)
+        Predicted, filtered and smoothed state covariances.
+    """
+    from scipy import linalg
+
+    F, H = _CV_TRANSITION, _CV_OBSERVATION
+    Pp = linalg.solve_discrete_are(F.T, H.T, Q, np.atleast_2d(R))
+    K = (Pp @ H.T / (H @ Pp @ H.T + R)).ravel()
+    Pf = (np.identity(2) - np.outer(K, H)) @ Pp
+    J = Pf @ F.T @ linalg.inv(Pp)
+    Ps = linalg.solve_discrete_lyapunov(J, Pf - J @ Pp @ J.T)
+    return K, J, Pp, Pf, Ps
+
+def _adjugate_fir(A, u):
+    """Apply the FIR numerator adj(I - A z^-1) to u, of shape (n_dims, 2, n_samples)."""
+    (a00, a01), (a10, a11) = A
+    v = u.copy()
+    v[:, 0, 1:] += -a11*u[:, 0, :-1] + a01*u[:, 1, :-1]
+    v[:, 1, 1:] += a10*u[:, 0, :-1] - a00*u[:, 1, :-1]
+    return v
+
+def _determinant_iir(A):
+    """Coefficients of the all-pole denominator det(I - A z^-1)."""
+    (a00, a01), (a10, a11) = A
+    return np.array([1, -(a00 + a11), a00*a11 - a01*a10])
+
+def _linear_recursion(A, u):
+    """Return x, with x[..., t] = A x[..., t-1] + u[..., t] and x[..., -1] = 0.
+
+    The 2-state recursion is written as the FIR numerator adj(I - A z^-1),
+    applied to u, followed by the shared all-pole denominator
+    det(I - A z^-1), so that it runs in a single scipy.signal.lfilter call.
+
+    Parameters
+    ----------
+    A : array, shape (2, 2)
+    u : array, shape (n_dims, 2, n_samples)
+    """
+    from scipy import signal
+
+    return signal.lfilter([1.], _determinant_iir(A), _adjugate_fir(A, u), axis=-1)
+
+def _extrapolate(x, frm, to, out):
+    """Constant velocity predictions F^k x, for k=1..(to-frm), into out[..., frm:to]."""
+    k = np.arange(1, to - frm + 1)
+    out[:, 0, frm:to] = x[:, 0, np.newaxis] + k*x[:, 1, np.newaxis]
+    out[:, 1, frm:to] = x[:, 1, np.newaxis]
+
+def _cv_kalman_filter(ydata, runs, run_epochs, epoch_bounds, K):
+    """Steady-state constant velocity Kalman filter over all epochs.
+
+    Every run of observed samples is filtered with one IIR filter, starting
+    from the constant velocity prediction across the preceding dropout (or
+    from the first observation, at the start of an epoch). Missing samples
+    are filled with the predictions.
+    """
+    from scipy import signal
+
+    n_dims, n_samples = ydata.shape
+    I_KH = np.identity(2) - np.outer(K, _CV_OBSERVATION)
+    A = I_KH @ _CV_TRANSITION
+    # the FIR part of the recursion is computed once for all samples, and
+    # only corrected at the first two samples of every run:
+    u = K[:, np.newaxis] * ydata[:, np.newaxis, :]
+    v = _adjugate_fir(A, u)
+    den = _determinant_iir(A)
+    (a00, a01), (a10, a11) = A
+    xf = np.full((n_dims, 2, n_samples), np.nan)
+
+    prev_epoch, prev_stop, x_last = -1, None, None
+    for (start, stop), epoch in zip(runs, run_epochs):
+        x_pred = np.empty((n_dims, 2))
+        if epoch != prev_epoch:
+            if prev_epoch >= 0:
+                _extrapolate(x_last, prev_stop, epoch_bounds[prev_epoch, 1], xf)
+            # initialize to the first observation, at rest:
+            x_pred[:, 0], x_pred[:, 1] = ydata[:, start], 0
+            xf[:, :, epoch_bounds[epoch, 0]:start] = x_pred[..., np.newaxis]
+        else:
+            _extrapolate(x_last, prev_stop, start, xf)
+            gap = start - prev_stop + 1
+            x_pred[:, 0] = x_last[:, 0] + gap*x_last[:, 1]
+            x_pred[:, 1] = x_last[:, 1]
+        c = x_pred @ I_KH.T
+        v_run = v[:, :, start:stop].copy()
+        v_run[:, :, 0] = u[:, :, start] + c
+        if stop - start > 1:
+            v_run[:, 0, 1] += -a11*c[:, 0] + a01*c[:, 1]
+            v_run[:, 1, 1] += a10*c[:, 0] - a00*c[:, 1]
+        xf[:, :, start:stop] = signal.lfilter([1.], den, v_run, axis=-1)
+        prev_epoch, prev_stop, x_last = epoch, stop, xf[:, :, stop-1]
+    if prev_epoch >= 0:
+        _extrapolate(x_last, prev_stop, epoch_bounds[prev_epoch, 1], xf)
+    return xf
+
+def _cv_rts_smoother(xf, epoch_bounds, J):
+    """Steady-state RTS smoother, run backwards within each epoch."""
+    xs = np.full_like(xf, np.nan)
+    I_JF = np.identity(2) - J @ _CV_TRANSITION
+    for start, stop in epoch_bounds:
+        if stop == start or np.isnan(xf[0, 0, start]):
+            continue # epoch without observations
+        w = np.einsum('ij,djt->dit', I_JF, xf[:, :, start:stop])
+        w[:, :, -1] = xf[:, :, stop-1]
+        xs[:, :, start:stop] = _linear_recursion(J, w[:, :, ::-1])[:, :, ::-1]
+    return xs
+
+def _cv_kalman_smooth(ydata, lengths, *, Q, R, n_iter=0):
+    """Constant velocity Kalman/RTS smoother for concatenated epochs.
+
+    Each coordinate is smoothed independently with the same parameters,
+    using the steady-state Kalman and RTS gains. Epochs are smoothed
+    independently. Missing (nan) observations are predicted from the
+    constant velocity model.
+
+    Parameters
+    ----------
+    ydata : array, shape (n_dims, n_samples)
+        Concatenated observations of all epochs.
+    lengths : array-like of int
+        Number of samples in each epoch.
+    Q : float or array, shape (2, 2)
+        Transition covariance, or its scale (Q*I).
+    R : float
+        Observation variance.
+    n_iter : int, optional
+        Number of EM iterations used to re-estimate Q and R, with
+        sufficient statistics pooled across all epochs and coordinates.
+        Default is 0 (no re-estimation).
+
+    Returns
+    -------
+    xs : array, shape (n_dims, 2, n_samples)
+        Smoothed positions (xs[:, 0]) and displacements per sample (xs[:, 1]).
+    Q : array, shape (2, 2)
+    R : float
+    """
+    ydata = np.atleast_2d(np.asarray(ydata, dtype=float))
+    lengths = np.asarray(lengths, dtype=int)
+    Q = Q*np.identity(2) if np.isscalar(Q) else np.asarray(Q, dtype=float)
+    R = float(R)
+
+    stops = np.cumsum(lengths)
+    epoch_bounds = np.column_stack((stops - lengths, stops))
+    observed = np.all(np.isfinite(ydata), axis=0)
+    runs, run_epochs = utils.get_run_boundaries(observed, lengths=lengths,
+                                                return_epochs=True)
+
+    F = _CV_TRANSITION
+    for iteration in range(n_iter + 1):
+        K, J, Pp, Pf, Ps = _steady_state_kalman_gains(Q, R)
+        xf = _cv_kalman_filter(ydata, runs, run_epochs, epoch_bounds, K)
+        xs = _cv_rts_smoother(xf, epoch_bounds, J)
+        if iteration == n_iter:
+            break
+        # M-step, with the steady-state smoothed covariances:
+        resid = ydata[:, observed] - xs[:, 0, observed]
+        R = np.mean(resid**2) + Ps[0, 0]
+        within = np.ones(ydata.shape[1], dtype=bool)
+        within[stops - 1] = False # no transitions across epochs
+        within &= ~np.isnan(xs[0, 0])
+        within = within[:-1]
+        d = xs[:, :, 1:][:, :, within] - np.einsum('ij,djt->dit', F, xs[:, :, :-1][:, :, within])
+        C = Ps @ J.T # Cov(x_t, x_{t-1})
+        Q = np.einsum('dit,djt->ij', d, d) / (d.shape[0]*d.shape[2]) \
+            + Ps + F @ Ps @ F.T - C @ F.T - F @ C.T
+        Q = (Q + Q.T) / 2
+    return xs, Q, R
+
 class PositionArray(_analogsignalarray.AnalogSignalArray):
 
     __attributes__ = ['_kalmanfilter'] # PositionArray-specific attributes
@@ -187,7 +378,8 @@ class PositionArray(_analogsignalarray.AnalogSignalArray):
             Larger values of R put higher trust in the model than in the [noisy]
             observations, leading to smoother estimates.
         recompute : bool, optional
-            If True, recompute the filter parameters using EM. Default is False.
+            If True, recompute the filter parameters using EM, shared across
+            all epochs. Default is False.
         n_iter : int, optional
             Number of iterations to use in EM when finding filter parameters.
             Default is 5.
@@ -196,7 +388,7 @@ class PositionArray(_analogsignalarray.AnalogSignalArray):
         ----------
         position : array with shape (ndim, n_samples), where ndim is 1D or 2D.
             Array of smoothed position estimates.
-        speed : array with shape (ndim, n_samples), where ndim is 1D or 2D.
+        speed : array with shape (n_samples,)
             Array of smoothed speed estimates.
 
         General information
@@ -236,10 +428,19 @@ class PositionArray(_analogsignalarray.AnalogSignalArray):
 
         NOTE: multi-epoch smoothing
         ===========================
-            Currently each epoch is smoothed INDEPENDENTLY (and if parameters are
-            recomputed, they are recomputed within each epoch). The alternative
-            would have been to use masked arrays, but there are downsides to that
-            approach, as well.
+            Each epoch is smoothed INDEPENDENTLY, but all epochs are processed
+            in one pass, and if parameters are recomputed, the EM statistics
+            are pooled across epochs (and across x and y, which share Q and R).
+
+        NOTE: steady-state gains
+        ========================
+            The Kalman and RTS gains are the steady-state gains (obtained
+            from the discrete algebraic Riccati equation), so that every run
+            of observed samples is filtered with a single IIR filter. Missing
+            (nan) samples are predicted with the constant velocity model.
+            This differs from the exact (time-varying) smoother only in the
+            transients at the start of epochs and after dropouts. EM uses the
+            steady-state covariances as well.
 
         NOTE: uniform sampling
         ======================
@@ -248,35 +449,10 @@ class PositionArray(_analogsignalarray.AnalogSignalArray):
 
         """
 
-        # TODO: implement masking within epochs
-
-        # >>> from numpy import ma
-        # >>> X = ma.array([1,2,3])
-        # >>> X[1] = ma.masked  # hide measurement at time step 1
-        # >>> kf.em(X).smooth(X)
-
-        from pykalman import KalmanFilter
-
-        # assert self.n_epochs == 1, 'multi-epoch Kalman smoothing not supported yet!'
-
         if not n_iter:
             n_iter = 5
 
-        if self.is_1d:
-            ss = 2 # state size (x, dx)
-            os = 1 # observation size, (x)
-            # transition matrix:
-            F = [[1, 1], [0, 1]]
-            # observation matrix:
-            H = [[1, 0]]
-        elif self.is_2d:
-            ss = 4 # state size (x, y, dx, dy)
-            os = 2 # observation size, (x, y)
-            # transition matrix:
-            F = [[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]]
-            # observation matrix:
-            H = [[1, 0, 0, 0], [0, 1, 0, 0]]
-        else:
+        if not (self.is_1d or self.is_2d):
             raise ValueError('Only 1D or 2D PositionArrays supported!')
 
         if Q is None:
@@ -284,42 +460,15 @@ class PositionArray(_analogsignalarray.AnalogSignalArray):
         if R is None:
             R = 10*self.fs #TODO: maybe a better default is self.fs * 10 ???
 
-        if self.is_1d:
-            posdata = np.zeros((1,0))
-            speeddata = np.zeros((1,0))
-        elif self.is_2d:
-            posdata = np.zeros((2,0))
-            speeddata = np.zeros((2,0))
-
-        for snippet in self:
-            measurements = snippet.ydata.T
-
-            if recompute:
-                kf = KalmanFilter(transition_matrices=F, observation_matrices=H)
-                kf = kf.em(measurements, n_iter=n_iter)
-                snippet._kalmanfilter = kf
-            else:
-                if self._kalmanfilter is None:
-                    kf = KalmanFilter(transition_matrices=F, observation_matrices=H)
-                    self._kalmanfilter = kf
-                self._kalmanfilter.transition_covariance = Q*np.eye(ss)
-                self._kalmanfilter.observation_covariance = R*np.eye(os)
-
-            if self.is_1d:
-                self._kalmanfilter.initial_state_mean = np.append(snippet.ydata[0,0], 0)
-            elif self.is_2d:
-                self._kalmanfilter.initial_state_mean = np.append(snippet.ydata[:,0], (0, 0))
-
-            kf = self._kalmanfilter
-
-            smoothed_state_means, smoothed_state_covariances = kf.smooth(measurements)
-
-            position = smoothed_state_means[:,:os].T
-            speed = smoothed_state_means[:,os:].T
-
-            posdata = np.hstack((posdata, position))
-            speeddata = np.hstack((speeddata, speed))
+        if recompute:
+            xs, Q, R = _cv_kalman_smooth(self.ydata, self.lengths, Q=Q, R=R,
+                                         n_iter=n_iter)
+        else:
+            xs, Q, R = _cv_kalman_smooth(self.ydata, self.lengths, Q=Q, R=R)
+        self._kalmanfilter = {'transition_covariance': Q,
+                              'observation_covariance': R}
 
-        speeddata = self.fs*np.sqrt(np.sum(speeddata**2, axis=0))
+        posdata = xs[:, 0, :]
+        speeddata = self.fs*np.sqrt(np.sum(xs[:, 1, :]**2, axis=0))
 
         return posdata, speeddata
@@ -3,7 +3,6 @@ __all__ = ['TuningCurve1D', 'TuningCurve2D', 'DirectionalTuningCurve1D']
 import copy
 import numpy as np
 import numbers
-import scipy.ndimage.filters
 import warnings
 
 from .. import utils
@@ -23,6 +22,97 @@ warnings.formatwarning = lambda message, category, filename, lineno, \
         message, category, filename, lineno, line='')
 
 
+def _shifted_spike_counts(counts, bin_idx, n_bins, shifts, chunksize=None):
+    """Spike counts per spatial bin, for circularly shifted spike counts.
+
+    For every shift s, the counts in time bin t are assigned to the
+    spatial bin of time bin (t + s) mod n_time. Only the nonzero counts
+    are used, and all units and shifts (in chunks) are accumulated with a
+    single np.bincount.
+
+    Parameters
+    ----------
+    counts : array of shape (n_units, n_time)
+        Binned spike counts.
+    bin_idx : array of int, shape (n_time,)
+        (Flat) spatial bin index of each time bin.
+    n_bins : int
+        Number of spatial bins.
+    shifts : array of int, shape (n_shifts,)
+    chunksize : int, optional
+        Number of shifts to process at once. By default, chunks of roughly
+        4 million spikes are used.
+
+    Returns
+    -------
+    out : array of shape (n_shifts, n_units, n_bins)
+    """
+    counts = np.asarray(counts)
+    bin_idx = np.asarray(bin_idx)
+    shifts = np.asarray(shifts, dtype=int)
+    n_units, n_time = counts.shape
+    uu, tt = np.nonzero(counts)
+    weights = counts[uu, tt]
+    if chunksize is None:
+        chunksize = max(1, 2**22 // max(len(tt), 1))
+
+    out = np.zeros((len(shifts), n_units*n_bins))
+    for frm in range(0, len(shifts), chunksize):
+        to = min(frm + chunksize, len(shifts))
+        n_chunk = to - frm
+        idx = bin_idx[(tt + shifts[frm:to, np.newaxis]) % n_time]
+        keys = (np.arange(n_chunk)[:, np.newaxis]*n_units + uu)*n_bins + idx
+        out[frm:to] = np.bincount(keys.ravel(), weights=np.tile(weights, n_chunk),
+                                  minlength=n_chunk*n_units*n_bins
+                                  ).reshape(n_chunk, n_units*n_bins)
+    return out.reshape(len(shifts), n_units, n_bins)
+
+def _shuffle_significance(counts, bin_idx, occupancy, ds, *, n_shuffles=None,
+                          min_shift=None, metric=None, min_duration=None,
+                          sigma=None, bw=None, random_state=None):
+    """Circular-shift significance of the spatial metric of each unit.
+
+    See TuningCurve1D.shuffle_significance.
+
+    Returns
+    -------
+    pvalues : array of shape (n_units,)
+    observed : array of shape (n_units,)
+    null : array of shape (n_shuffles, n_units)
+    """
+    if n_shuffles is None:
+        n_shuffles = 1000
+    if metric is None:
+        metric = 'information'
+    if min_duration is None:
+        min_duration = 0
+    n_time = counts.shape[1]
+    min_bins = 1 if not min_shift else max(1, int(np.ceil(min_shift / ds)))
+    if n_time - min_bins < min_bins:
+        raise ValueError("min_shift is too large for the duration of the data")
+
+    # the unshifted counts are evaluated first, exactly like the shuffles
+    rng = utils._check_random_state(random_state)
+    # np.random.Generator has integers(), RandomState (and np.random) randint()
+    randint = rng.integers if hasattr(rng, 'integers') else rng.randint
+    shifts = np.r_[0, randint(min_bins, n_time - min_bins + 1, n_shuffles)]
+    ratemaps = _shifted_spike_counts(counts, bin_idx, occupancy.size, shifts) / ds
+    ratemaps = ratemaps.reshape(ratemaps.shape[:2] + occupancy.shape)
+    ratemaps[..., occupancy*ds < min_duration] = 0
+    denom = np.where(occupancy == 0, 1, occupancy)
+    ratemaps /= denom
+    if sigma is not None and np.any(np.asarray(sigma) > 0):
+        from scipy.ndimage import gaussian_filter
+        if bw is None:
+            bw = 4
+        sigma = (0, 0) + tuple(np.broadcast_to(sigma, (occupancy.ndim,)))
+        ratemaps = gaussian_filter(ratemaps, sigma=sigma, truncate=bw)
+
+    values = utils.spatial_metrics(ratemaps, occupancy, metrics=[metric])[metric]
+    observed, null = values[0], values[1:]
+    pvalues = (1 + np.sum(null >= observed, axis=0)) / (1 + n_shuffles)
+    return pvalues, observed, null
+
 ########################################################################
 # class TuningCurve2D
 ########################################################################
@@ -248,6 +338,115 @@ class TuningCurve2D:
         """
         return utils.spatial_sparsity(ratemap=self.ratemap)
 
+    def spatial_metrics(self, metrics=None):
+        """Compute occupancy-weighted spatial information, information rate,
+        sparsity, selectivity and coherence of all units.
+
+        See utils.spatial_metrics for the definitions.
+
+        Parameters
+        ----------
+        metrics : list of str, optional
+            Metrics to compute. Default is all.
+
+        Returns
+        -------
+        out : dict
+            Maps each metric to an array of shape (n_units,).
+        """
+        return utils.spatial_metrics(self.ratemap, self.occupancy, metrics=metrics)
+
+    def _ext_bin_indices(self, bst, extern):
+        """Flat spatial bin index of every time bin of bst, and occupancy."""
+        if bst.n_units != self.n_units:
+            raise ValueError("bst must have the same number of units as the tuning curve")
+        self._bst = bst
+        self._extern = extern
+        if not hasattr(self, 'trans_func'):
+            self.trans_func = self._trans_func
+        try:
+            occupancy = self._compute_occupancy()
+            x, y = self.trans_func(self._extern, at=bst.bin_centers)
+        finally:
+            self._detach()
+
+        ext_bin_idx_x = np.digitize(x, self.xbins, right=True)
+        ext_bin_idx_y = np.digitize(y, self.ybins, right=True)
+        if ext_bin_idx_x.max() > self.n_xbins:
+            raise ValueError("ext values greater than 'ext_xmax'")
+        if ext_bin_idx_x.min() == 0:
+            raise ValueError("ext values less than 'ext_xmin'")
+        if ext_bin_idx_y.max() > self.n_ybins:
+            raise ValueError("ext values greater than 'ext_ymax'")
+        if ext_bin_idx_y.min() == 0:
+            raise ValueError("ext values less than 'ext_ymin'")
+        return (ext_bin_idx_x - 1)*self.n_ybins + ext_bin_idx_y - 1, occupancy
+
+    def shuffle_significance(self, bst, extern, *, n_shuffles=None, min_shift=None,
+                             metric=None, sigma=None, bw=None, return_null=False,
+                             random_state=None):
+        """Test the significance of a spatial metric of each unit, against
+        circularly shifted spike trains.
+
+        The spike counts of bst are circularly shifted (over all time bins
+        of bst, for all units together) relative to the precomputed
+        spatial bin of each time bin, and the ratemaps of all shifts and
+        units are accumulated at once, so that no tuning curves need to be
+        rebuilt. The observed metric is computed in the same way (without
+        the minimum background rate of the tuning curve).
+
+        Parameters
+        ----------
+        bst : BinnedSpikeTrainArray
+            Binned spike trains, with the same units as the tuning curve.
+        extern : AnalogSignalArray
+            External correlate (e.g., position), as used to compute the
+            tuning curve.
+        n_shuffles : int, optional
+            Number of circular shifts. Default is 1000.
+        min_shift : float, optional
+            Minimum shift (in seconds) in either direction. Default is one
+            time bin.
+        metric : string, optional
+            Spatial metric to test, see utils.spatial_metrics. Default is
+            'information'.
+        sigma : float, optional
+            Standard deviation (in units of extern) of the Gaussian kernel
+            used to smooth the ratemaps. Default is no smoothing.
+        bw : float, optional
+            Bandwidth outside of which the filter value will be zero.
+            Default is 4.0
+        return_null : bool, optional
+            If True, also return the observed metric, and the metric of all
+            shuffles. Default is False.
+        random_state : None, int or np.random.Generator, optional
+            Random number generator for the shifts, see
+            utils._check_random_state. Default is to use np.random.
+
+        Returns
+        -------
+        pvalues : array of shape (n_units,)
+            Fraction of shuffles (including the observed data) with a
+            metric at least as large as observed.
+        observed : array of shape (n_units,)
+            Only returned if return_null is True.
+        null : array of shape (n_shuffles, n_units)
+            Only returned if return_null is True.
+        """
+        bin_idx, occupancy = self._ext_bin_indices(bst, extern)
+        if sigma is not None:
+            ds_x = (self.xbins[-1] - self.xbins[0])/self.n_xbins
+            ds_y = (self.ybins[-1] - self.ybins[0])/self.n_ybins
+            sigma = (sigma / ds_x, sigma / ds_y)
+        pvalues, observed, null = _shuffle_significance(
+            bst.data, bin_idx, occupancy, bst.ds, n_shuffles=n_shuffles,
+            min_shift=min_shift, metric=metric,
+            min_duration=getattr(self, '_min_duration', None), sigma=sigma, bw=bw,
+            random_state=random_state)
+        if return_null:
+            return pvalues, observed, null
+        return pvalues
+
     def _initialize_mask_from_extern(self, extern):
         """Attached a mask from extern.
         TODO: improve docstring, add example.
@@ -569,6 +768,8 @@ class TuningCurve2D:
         cval : scalar, optional
             Value to fill past edges of input if mode is ‘constant’. Default is 0.0
         """
+        import scipy.ndimage.filters
+
         if sigma is None:
             sigma = 0.1 # in units of extern
         if bw is None:
@@ -932,6 +1133,108 @@ class TuningCurve1D:
         """
         return utils.spatial_sparsity(ratemap=self.ratemap)
 
+    def spatial_metrics(self, metrics=None):
+        """Compute occupancy-weighted spatial information, information rate,
+        sparsity, selectivity and coherence of all units.
+
+        See utils.spatial_metrics for the definitions.
+
+        Parameters
+        ----------
+        metrics : list of str, optional
+            Metrics to compute. Default is all.
+
+        Returns
+        -------
+        out : dict
+            Maps each metric to an array of shape (n_units,).
+        """
+        return utils.spatial_metrics(self.ratemap, self.occupancy, metrics=metrics)
+
+    def _ext_bin_indices(self, bst, extern):
+        """Spatial bin index of every time bin of bst, and occupancy."""
+        if bst.n_units != self.n_units:
+            raise ValueError("bst must have the same number of units as the tuning curve")
+        self._bst = bst
+        self._extern = extern
+        if not hasattr(self, 'trans_func'):
+            self.trans_func = self._trans_func
+        try:
+            occupancy = self._compute_occupancy()
+            ext = self.trans_func(self._extern, at=bst.bin_centers)
+        finally:
+            self._detach()
+
+        ext_bin_idx = np.digitize(ext, self.bins, right=True)
+        if ext_bin_idx.max() > self.n_bins:
+            raise ValueError("ext values greater than 'ext_max'")
+        if ext_bin_idx.min() == 0:
+            raise ValueError("ext values less than 'ext_min'")
+        return ext_bin_idx - 1, occupancy
+
+    def shuffle_significance(self, bst, extern, *, n_shuffles=None, min_shift=None,
+                             metric=None, sigma=None, bw=None, return_null=False,
+                             random_state=None):
+        """Test the significance of a spatial metric of each unit, against
+        circularly shifted spike trains.
+
+        The spike counts of bst are circularly shifted (over all time bins
+        of bst, for all units together) relative to the precomputed
+        spatial bin of each time bin, and the ratemaps of all shifts and
+        units are accumulated at once, so that no tuning curves need to be
+        rebuilt. The observed metric is computed in the same way (without
+        the minimum background rate of the tuning curve).
+
+        Parameters
+        ----------
+        bst : BinnedSpikeTrainArray
+            Binned spike trains, with the same units as the tuning curve.
+        extern : AnalogSignalArray
+            External correlate (e.g., position), as used to compute the
+            tuning curve.
+        n_shuffles : int, optional
+            Number of circular shifts. Default is 1000.
+        min_shift : float, optional
+            Minimum shift (in seconds) in either direction. Default is one
+            time bin.
+        metric : string, optional
+            Spatial metric to test, see utils.spatial_metrics. Default is
+            'information'.
+        sigma : float, optional
+            Standard deviation (in units of extern) of the Gaussian kernel
+            used to smooth the ratemaps. Default is no smoothing.
+        bw : float, optional
+            Bandwidth outside of which the filter value will be zero.
+            Default is 4.0
+        return_null : bool, optional
+            If True, also return the observed metric, and the metric of all
+            shuffles. Default is False.
+        random_state : None, int or np.random.Generator, optional
+            Random number generator for the shifts, see
+            utils._check_random_state. Default is to use np.random.
+
+        Returns
+        -------
+        pvalues : array of shape (n_units,)
+            Fraction of shuffles (including the observed data) with a
+            metric at least as large as observed.
+        observed : array of shape (n_units,)
+            Only returned if return_null is True.
+        null : array of shape (n_shuffles, n_units)
+            Only returned if return_null is True.
+        """
+        bin_idx, occupancy = self._ext_bin_indices(bst, extern)
+        if sigma is not None:
+            sigma = sigma / ((self.bins[-1] - self.bins[0])/self.n_bins)
+        pvalues, observed, null = _shuffle_significance(
+            bst.data, bin_idx, occupancy, bst.ds, n_shuffles=n_shuffles,
+            min_shift=min_shift, metric=metric,
+            min_duration=getattr(self, '_min_duration', None), sigma=sigma, bw=bw,
+            random_state=random_state)
+        if return_null:
+            return pvalues, observed, null
+        return pvalues
+
     def _init_from_ratemap(self, ratemap, occupancy=None, extmin=0, extmax=1, extlabels=None, unit_ids=None, unit_labels=None, unit_tags=None, label=None):
         """Initialize a TuningCurve1D object from a ratemap.
 
@@ -1252,6 +1555,8 @@ class TuningCurve1D:
         cval : scalar, optional
             Value to fill past edges of input if mode is ‘constant’. Default is 0.0
         """
+        import scipy.ndimage.filters
+
         if sigma is None:
             sigma = 0.1 # in units of extern
         if bw is None:
@@ -6,8 +6,6 @@ import copy
 import numbers
 
 from functools import wraps
-from scipy import interpolate
-from scipy.stats import zscore
 from sys import float_info
 from collections import namedtuple
 
@@ -15,6 +13,7 @@ from .. import core
 from .. import auxiliary
 from .. import utils
 from .. import version
+from ..utils_.decorators import instrumented
 
 # Force warnings.warn() to omit the source code line in the message
 formatwarning_orig = warnings.formatwarning
@@ -530,6 +529,8 @@ class AnalogSignalArray:
 
     def zscore(self):
         """Returns an object where each signal has been normalized using z scores."""
+        from scipy.stats import zscore
+
         out = copy.deepcopy(self)
         out._ydata = zscore(out._ydata, axis=1)
         return out
@@ -562,8 +563,10 @@ class AnalogSignalArray:
             data = self.time
         return 1.0/np.median(np.diff(data))
 
-    def downsample(self, *, fs_out, aafilter=True, inplace=False):
-        out = utils.downsample_analogsignalarray(self, fs_out=fs_out, aafilter=aafilter, inplace=inplace)
+    def downsample(self, *, fs_out, aafilter=True, inplace=False, method=None):
+        """Downsample to fs_out. See utils.downsample_analogsignalarray."""
+        out = utils.downsample_analogsignalarray(self, fs_out=fs_out, aafilter=aafilter,
+                                                 inplace=inplace, method=method)
         out.__renew__()
         return out
 
@@ -587,6 +590,7 @@ class AnalogSignalArray:
         self._labels = np.append(self._labels,label)
         return self
 
+    @instrumented('restriction')
     def _restrict_to_epoch_array_fast(self, *, epocharray=None, update=True):
         """Restrict self._time and self._ydata to an EpochArray. If no
         EpochArray is specified, self._support is used.
@@ -645,6 +649,7 @@ class AnalogSignalArray:
         if update:
             self._support = epocharray
 
+    @instrumented('restriction')
     def _restrict_to_epoch_array(self, *, epocharray=None, update=True):
         """Restrict self._time and self._ydata to an EpochArray. If no
         EpochArray is specified, self._support is used.
@@ -1142,6 +1147,7 @@ class AnalogSignalArray:
         """returns skinny-format ydata s.t. each column is a signal."""
         return self._ydata.T
 
+    @instrumented('interpolation')
     def _get_interp1d(self,* , kind='linear', copy=True, bounds_error=False,
                       fill_value=np.nan, assume_sorted=None):
         """returns a scipy interp1d object, extended to have values at all epoch
@@ -1188,6 +1194,8 @@ class AnalogSignalArray:
             time, unique_idx = np.unique(time, return_index=True)
             yvals = yvals[:,unique_idx]
 
+        from scipy import interpolate
+
         f = interpolate.interp1d(x=time,
                                  y=yvals,
                                  kind=kind,
@@ -1198,6 +1206,7 @@ class AnalogSignalArray:
                                  assume_sorted=assume_sorted)
         return f
 
+    @instrumented('interpolation')
     def asarray(self,*, where=None, at=None, kind='linear', copy=True,
                 bounds_error=False, fill_value=np.nan, assume_sorted=None,
                 recalculate=False, store_interp=True, n_points=None,
@@ -9,6 +9,7 @@ from sys import float_info
 
 from .. import utils
 from .. import version
+from ..utils_.decorators import instrumented
 
 # Force warnings.warn() to omit the source code line in the message
 formatwarning_orig = warnings.formatwarning
@@ -572,6 +573,7 @@ class EpochArray:
         keep_epoch_ids = np.argwhere(self.durations).squeeze().tolist()
         return self[keep_epoch_ids]
 
+    @instrumented('restriction')
     def intersect(self, epoch, *, boundaries=True):
         """Returns intersection (overlap) between current EpochArray (self) and 
            other epoch array ('epoch').
@@ -1,4 +1,4 @@
-__all__ = ['EventArray']
+__all__ = ['EventArray', 'ValueEventArray']
 
 """EventArray
 
@@ -24,6 +24,7 @@ from abc import ABC, abstractmethod
 from .. import core
 from .. import utils
 from .. import version
+from ..utils_.decorators import instrumented
 
 # TODO: EpochArray from EventArray
 # TODO: casting any nelpy obj to EpochArray returns its support with
@@ -35,6 +36,236 @@ warnings.formatwarning = lambda message, category, filename, lineno, \
     line=None: formatwarning_orig(
         message, category, filename, lineno, line='')
 
+def _concatenate_sources(time):
+    """Concatenate per-source arrays into one array, and return the number
+    of elements in each source."""
+    counts = np.array([len(source) for source in time], dtype=int)
+    if counts.sum():
+        flat = np.concatenate([np.asarray(source).ravel() for source in time])
+    else:
+        flat = np.array([])
+    return flat, counts
+
+def _split_sources(flat, counts):
+    """Inverse of _concatenate_sources.
+
+    A single source is returned as a 2D array of shape (1, n_events), and
+    multiple sources as an object array of per-source arrays.
+    """
+    if len(counts) == 1:
+        return np.array(flat, ndmin=2)
+    # the trailing None prevents numpy from broadcasting equal length
+    # sources into a 2D array:
+    return np.array(np.split(flat, np.cumsum(counts)[:-1]) + [None],
+                    dtype=object)[:-1]
+
+def _in_epochs(epocharray, flat_time):
+    """Boolean mask of times inside an EpochArray, with one searchsorted.
+
+    The epoch boundaries of a merged EpochArray are sorted, so that a time
+    lies inside an epoch [start, stop) exactly when the number of
+    boundaries that are <= time is odd.
+    """
+    if not epocharray.ismerged:
+        epocharray = epocharray.merge()
+    bounds = epocharray.time.ravel()
+    return np.searchsorted(bounds, flat_time, side='right') % 2 == 1
+
+def _restrict_events(epocharray, time, values=None):
+    """Restrict all sources (and their values) to an EpochArray at once.
+
+    Event times are concatenated across sources, tested for inclusion with
+    a single searchsorted against the epoch boundaries, and split back into
+    sources. Event order within each source is preserved.
+
+    Parameters
+    ----------
+    epocharray : EpochArray
+    time : array-like
+        Array of length n_sources, each entry with shape (n_events,)
+    values : array-like, optional
+        Event values, with the same layout as time.
+
+    Returns
+    -------
+    time : array
+        Restricted event times.
+    values : array
+        Restricted event values; only returned if values is not None.
+    """
+    n_sources = len(time)
+    if epocharray.isempty:
+        time = np.zeros((n_sources,0))
+        if values is None:
+            return time
+        return time, np.zeros((n_sources,0))
+
+    flat_time, counts = _concatenate_sources(time)
+    keep = _in_epochs(epocharray, flat_time)
+    if np.count_nonzero(keep) < flat_time.size:
+        warnings.warn(
+            'ignoring events outside of eventtrain support')
+    source_idx = np.repeat(np.arange(n_sources), counts)
+    new_counts = np.bincount(source_idx[keep], minlength=n_sources)
+    time = _split_sources(flat_time[keep], new_counts)
+    if values is None:
+        return time
+    flat_values, _ = _concatenate_sources(values)
+    return time, _split_sources(flat_values[keep], new_counts)
+
+def _get_epoch_bins(epocharray, ds):
+    """Bin edges of all epochs, for bins that lie entirely inside an epoch.
+
+    The edges are the same as those of
+    BinnedSpikeTrainArray._get_bins_inside_epoch, but are computed for all
+    epochs at once.
+
+    Returns
+    -------
+    edges : array
+        Concatenated bin edges of all epochs with at least one bin.
+    n_bins : array of int
+        Number of bins in each of those epochs.
+    """
+    starts = epocharray.starts
+    durations = epocharray.durations
+    n_bins = np.floor(durations / ds).astype(int)
+    if np.any(n_bins == 0):
+        warnings.warn(
+            "epoch duration is less than bin size: ignoring...")
+    starts, n_bins = starts[n_bins > 0], n_bins[n_bins > 0]
+    # same arithmetic as np.linspace(start, start + n*ds, n+1):
+    stops = starts + n_bins*ds
+    step = np.repeat((stops - starts) / n_bins, n_bins + 1)
+    k = np.arange(np.sum(n_bins + 1)) - np.repeat(np.cumsum(n_bins + 1) - (n_bins + 1), n_bins + 1)
+    edges = np.repeat(starts, n_bins + 1) + k*step
+    edges[np.cumsum(n_bins + 1) - 1] = stops
+    return edges, n_bins
+
+_BIN_METHODS = ('count', 'sum', 'mean', 'min', 'max', 'first', 'last')
+
+def _bin_events(epocharray, ds, time, values=None, method='count'):
+    """Bin the events of all sources at once.
+
+    Every event is assigned to a bin with one searchsorted over all bin
+    edges, and the events of each (source, bin) pair, which are contiguous,
+    are aggregated with np.add.reduceat (or the corresponding ufunc). As
+    for np.histogram, the last bin of every epoch includes its right edge.
+
+    Parameters
+    ----------
+    epocharray : EpochArray
+        Epochs to bin.
+    ds : float
+        Bin width, in seconds.
+    time : array-like
+        Array of length n_sources, each entry with shape (n_events,)
+    values : array-like, optional
+        Event values, with the same layout as time. Required by all methods
+        except 'count'.
+    method : string, optional
+        One of ['count', 'sum', 'mean', 'min', 'max', 'first', 'last'].
+        Default is 'count'. Bins without events are 0 for 'count' and 'sum',
+        and nan otherwise.
+
+    Returns
+    -------
+    data : array, shape (n_sources, n_bins)
+    edges : array
+        Concatenated bin edges of all epochs with at least one bin.
+    n_bins : array of int
+        Number of bins in each of those epochs.
+    """
+    if method not in _BIN_METHODS:
+        raise ValueError("method must be one of {}".format(_BIN_METHODS))
+    if values is None and method != 'count':
+        raise ValueError("method '{}' requires event values".format(method))
+
+    n_sources = len(time)
+    edges, n_bins = _get_epoch_bins(epocharray, ds)
+    n_total = n_bins.sum()
+    if n_total == 0:
+        fill = 0 if method in ('count', 'sum') else np.nan
+        return np.full((n_sources, 0), fill), edges, n_bins
+
+    flat_time, counts = _concatenate_sources(time)
+    source_idx = np.repeat(np.arange(n_sources), counts)
+
+    # locate the last edge <= t, and map edges to bins:
+    epoch_of_edge = np.repeat(np.arange(len(n_bins)), n_bins + 1)
+    is_last_edge = np.zeros(edges.size, dtype=bool)
+    is_last_edge[np.cumsum(n_bins + 1) - 1] = True
+    pos = np.searchsorted(edges, flat_time, side='right') - 1
+    valid = pos >= 0
+    pos[~valid] = 0
+    bin_idx = pos - epoch_of_edge[pos]
+    on_last_edge = is_last_edge[pos]
+    # the right edge of an epoch belongs to its last bin:
+    bin_idx[on_last_edge] -= 1
+    valid &= ~on_last_edge | (flat_time == edges[pos])
+
+    flat_idx = source_idx[valid] * n_total + bin_idx[valid]
+    if method == 'count':
+        data = np.bincount(flat_idx, minlength=n_sources*n_total)
+        return data.reshape(n_sources, n_total), edges, n_bins
+
+    flat_values, _ = _concatenate_sources(values)
+    flat_values = flat_values[valid].astype(float)
+    if not np.all(flat_idx[1:] >= flat_idx[:-1]):
+        order = np.argsort(flat_idx, kind='mergesort') # stable: keep time order
+        flat_idx, flat_values = flat_idx[order], flat_values[order]
+
+    if method == 'sum':
+        data = np.zeros(n_sources*n_total)
+    else:
+        data = np.full(n_sources*n_total, np.nan)
+    if flat_idx.size:
+        group_starts = np.flatnonzero(np.r_[True, flat_idx[1:] != flat_idx[:-1]])
+        group_stops = np.r_[group_starts[1:], flat_idx.size]
+        groups = flat_idx[group_starts]
+        if method in ('sum', 'mean'):
+            data[groups] = np.add.reduceat(flat_values, group_starts)
+            if method == 'mean':
+                data[groups] /= group_stops - group_starts
+        elif method == 'min':
+            data[groups] = np.minimum.reduceat(flat_values, group_starts)
+        elif method == 'max':
+            data[groups] = np.maximum.reduceat(flat_values, group_starts)
+        elif method == 'first':
+            data[groups] = flat_values[group_starts]
+        else:
+            data[groups] = flat_values[group_stops - 1]
+    return data.reshape(n_sources, n_total), edges, n_bins
+
+def _get_bin_centers_and_support(edges, n_bins, ds):
+    """Bin centers, and the EpochArray covered by the bins of every epoch."""
+    last_edges = np.cumsum(n_bins + 1) - 1
+    is_last_edge = np.zeros(edges.size, dtype=bool)
+    is_last_edge[last_edges] = True
+    bin_centers = edges[~is_last_edge] + ds/2
+    supportdata = np.vstack([edges[last_edges - n_bins], edges[last_edges]]).T
+    return bin_centers, core.EpochArray(supportdata)
+
+def _binned_from_events(eventarray, data, edges, n_bins, ds):
+    """Assemble a BinnedSpikeTrainArray from the output of _bin_events."""
+    bin_centers, support = _get_bin_centers_and_support(edges, n_bins, ds)
+    stops = np.cumsum(n_bins) - 1
+    bst = core.BinnedSpikeTrainArray(empty=True)
+    bst._ds = ds
+    bst._bins = edges
+    bst._bin_centers = bin_centers
+    bst._binnedSupport = np.vstack([stops - n_bins + 1, stops]).T
+    bst._support = support
+    bst._data = data
+    bst._event_centers = None
+    bst._fs = eventarray.fs
+    bst._unit_ids = list(eventarray.source_ids)
+    bst._unit_labels = list(eventarray.source_labels)
+    bst._unit_tags = eventarray.source_tags
+    bst._label = eventarray.label
+    bst.__renew__()
+    return bst
+
 class EpochSourceSlicer(object):
     def __init__(self, obj):
         self.obj = obj
@@ -887,106 +1118,36 @@ class EventArray(EventBase):
         return flattened
 
     @staticmethod
+    @instrumented('restriction')
     def _restrict_to_epoch_array_fast(epocharray, time, copyover=True):
         """Return time restricted to an EpochArray.
 
-        This function assumes sorted event times, so that binary search can
-        be used to quickly identify slices that should be kept in the
-        restriction. It does not check every event time.
+        All sources are restricted at once (see _restrict_events), which
+        does not require sorted event times, but preserves their order.
 
         Parameters
         ----------
         epocharray : EpochArray
         time : array-like
+        copyover : bool, optional
+            Unused; the restricted times are always a new array.
         """
-        if epocharray.isempty:
-            n_sources = len(time)
-            time = np.zeros((n_sources,0))
-            return time
-
-        singlesource = len(time)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            time = copy.copy(time)
-
-        # NOTE: this used to assume multiple sources for the enumeration to work
-        for source, st_time in enumerate(time):
-            indices = []
-            for eptime in epocharray.time:
-                t_start = eptime[0]
-                t_stop = eptime[1]
-                frm, to = np.searchsorted(st_time, (t_start, t_stop))
-                indices.append((frm, to))
-            indices = np.array(indices, ndmin=2)
-            if np.diff(indices).sum() < len(st_time):
-                warnings.warn(
-                    'ignoring events outside of eventtrain support')
-            if singlesource:
-                time_list = []
-                for start, stop in indices:
-                    time_list.extend(st_time[start:stop])
-                time = np.array(time_list, ndmin=2)
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                time_list = []
-                for start, stop in indices:
-                    time_list.extend(st_time[start:stop])
-                time_ = time.tolist()
-                time_[source] = np.array(time_list)
-                time = np.array(time_)
-        return time
+        return _restrict_events(epocharray, time)
 
     @staticmethod
+    @instrumented('restriction')
     def _restrict_to_epoch_array(epocharray, time, copyover=True):
         """Return time restricted to an EpochArray.
 
-        This function is quite slow, as it checks each event time for inclusion.
-        It does this in a vectorized form, which is fast for small or moderately
-        sized objects, but the memory penalty can be large, and it becomes very
-        slow for large objects. Consequently, _restrict_to_epoch_array_fast
-        should be used when possible.
+        Equivalent to _restrict_to_epoch_array_fast, which no longer
+        assumes sorted event times.
 
         Parameters
         ----------
         epocharray : EpochArray
         time : array-like
         """
-        if epocharray.isempty:
-            n_sources = len(time)
-            time = np.zeros((n_sources,0))
-            return time
-
-        singlesource = len(time)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            time = copy.copy(time)
-
-        # NOTE: this used to assume multiple sources for the enumeration to work
-        for source, st_time in enumerate(time):
-            indices = []
-            for eptime in epocharray.time:
-                t_start = eptime[0]
-                t_stop = eptime[1]
-                indices.append((st_time >= t_start) & (st_time < t_stop))
-            indices = np.any(np.column_stack(indices), axis=1)
-            if np.count_nonzero(indices) < len(st_time):
-                warnings.warn(
-                    'ignoring events outside of eventtrain support')
-            if singlesource:
-                time = np.array([time[0][indices]], ndmin=2)
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                time_ = time.tolist()
-                time_[source] = np.array(time_[source])
-                time_[source] = time_[source][indices]
-                time = np.array(time_)
-        return time
+        return _restrict_events(epocharray, time)
 
     def __repr__(self):
         address_str = " at " + str(hex(id(self)))
@@ -1010,8 +1171,25 @@ class EventArray(EventBase):
         return "<EventArray%s:%s%s>%s%s" % (address_str, numstr, epstr, fsstr, labelstr)
 
     def bin(self, *, ds=None):
-        """Return a binned eventtrain array."""
-        return BinnedEventArray(self, ds=ds)
+        """Return the binned event counts, as a BinnedSpikeTrainArray.
+
+        Sources become units, and bins are contained wholly inside the
+        epochs of the support, as for SpikeTrainArray.bin.
+
+        Parameters
+        ----------
+        ds : float, optional
+            Bin width, in seconds. Default is 0.0625 (62.5 ms).
+
+        Returns
+        -------
+        out : BinnedSpikeTrainArray
+        """
+        if ds is None:
+            warnings.warn('no bin size was given, assuming 62.5 ms')
+            ds = 0.0625
+        data, edges, n_bins = _bin_events(self.support, ds, self.time)
+        return _binned_from_events(self, data, edges, n_bins, ds)
 
     @property
     def time(self):
@@ -1259,17 +1437,21 @@ class ValueEventArray(EventBase):
 
         time = standardize_to_2d(timestamps)
 
+        _, counts = _concatenate_sources(time)
         if eventvalues is not None:
             values = standardize_to_2d(eventvalues)
-            if values.shape != time.shape:
+            if len(values) != len(time) or np.any(
+                    _concatenate_sources(values)[1] != counts):
                 raise ValueError('timestamps and eventvalues must have the same size!')
         else:
-            values = np.ones(time.shape)*default_val
+            values = _split_sources(np.full(counts.sum(), default_val, dtype=float), counts)
 
-        #sort event trains, but only if necessary:
+        #sort event trains (and their values), but only if necessary:
         for ii, train in enumerate(time):
             if not utils.is_sorted(train):
-                time[ii] = np.sort(train)
+                order = np.argsort(train, kind='mergesort')
+                time[ii] = np.asarray(train)[order]
+                values[ii] = np.asarray(values[ii])[order]
 
         kwargs = {"fs": fs,
                   "source_ids": source_ids,
@@ -1305,7 +1487,6 @@ class ValueEventArray(EventBase):
             # array's support:
             self._support = support
 
-        # TODO: if sorted, we may as well use the fast restrict here as well?
         time, values = self._restrict_to_epoch_array(
             epocharray=self._support,
             time=time, values=values)
@@ -1375,112 +1556,58 @@ class ValueEventArray(EventBase):
         return self
 
     def __next__(self):
-        """EventArray iterator advancer."""
-        raise NotImplementedError
+        """ValueEventArray iterator advancer."""
         index = self._index
         if index > self.support.n_epochs - 1:
             raise StopIteration
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            support = self.support[index]
-            time = self._restrict_to_epoch_array_fast(
+            eventarray = self._restricted_copy(self.support[index])
+        self._index += 1
+        return eventarray
+
+    def _restricted_copy(self, support):
+        """Return a ValueEventArray restricted to support, which must be
+        contained in self.support."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            time, values = self._restrict_to_epoch_array_fast(
                 epocharray=support,
                 time=self.time,
-                copyover=True
+                values=self.values
                 )
-            eventtrain = EventArray(empty=True)
-            exclude = ["_time", "_support"]
-            attrs = (x for x in self.__attributes__ if x not in exclude)
-            for attr in attrs:
-                exec("eventtrain." + attr + " = self." + attr)
-            eventtrain._time = time
-            eventtrain._support = support
-            eventtrain.loc = ItemGetter_loc(eventtrain)
-            eventtrain.iloc = ItemGetter_iloc(eventtrain)
-        self._index += 1
-        return eventtrain
+        eventarray = ValueEventArray(empty=True)
+        exclude = ["_time", "_values", "_support"]
+        attrs = (x for x in self.__attributes__ if x not in exclude)
+        for attr in attrs:
+            exec("eventarray." + attr + " = self." + attr)
+        eventarray._time = time
+        eventarray._values = values
+        eventarray._support = support
+        eventarray.loc = ItemGetter_loc(eventarray)
+        eventarray.iloc = ItemGetter_iloc(eventarray)
+        return eventarray
 
     def _epochslicer(self, idx):
         """Helper function to restrict object to EpochArray."""
-        # if self.isempty:
-        #     return self
-        raise NotImplementedError
-
         if isinstance(idx, core.EpochArray):
             if idx.isempty:
-                return EventArray(empty=True)
+                return ValueEventArray(empty=True)
             support = self.support.intersect(
                     epoch=idx,
                     boundaries=True
                     ) # what if fs of slicing epoch is different?
             if support.isempty:
-                return EventArray(empty=True)
-
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                time = self._restrict_to_epoch_array_fast(
-                    epocharray=support,
-                    time=self.time,
-                    copyover=True
-                    )
-                eventtrain = EventArray(empty=True)
-                exclude = ["_time", "_support"]
-                attrs = (x for x in self.__attributes__ if x not in exclude)
-                for attr in attrs:
-                    exec("eventtrain." + attr + " = self." + attr)
-                eventtrain._time = time
-                eventtrain._support = support
-                eventtrain.loc = ItemGetter_loc(eventtrain)
-                eventtrain.iloc = ItemGetter_iloc(eventtrain)
-            return eventtrain
-        elif isinstance(idx, int):
-            eventtrain = EventArray(empty=True)
-            exclude = ["_time", "_support"]
+                return ValueEventArray(empty=True)
+            return self._restricted_copy(support)
+        try:
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                attrs = (x for x in self.__attributes__ if x not in exclude)
-                for attr in attrs:
-                    exec("eventtrain." + attr + " = self." + attr)
                 support = self.support[idx]
-                eventtrain._support = support
-            if (idx >= self.support.n_epochs) or idx < (-self.support.n_epochs):
-                eventtrain.loc = ItemGetter_loc(eventtrain)
-                eventtrain.iloc = ItemGetter_iloc(eventtrain)
-                return eventtrain
-            else:
-                time = self._restrict_to_epoch_array_fast(
-                        epocharray=support,
-                        time=self.time,
-                        copyover=True
-                        )
-                eventtrain._time = time
-                eventtrain._support = support
-                eventtrain.loc = ItemGetter_loc(eventtrain)
-                eventtrain.iloc = ItemGetter_iloc(eventtrain)
-                return eventtrain
-        else:  # most likely slice indexing
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    support = self.support[idx]
-                    time = self._restrict_to_epoch_array_fast(
-                        epocharray=support,
-                        time=self.time,
-                        copyover=True
-                        )
-                    eventtrain = EventArray(empty=True)
-                    exclude = ["_time", "_support"]
-                    attrs = (x for x in self.__attributes__ if x not in exclude)
-                    for attr in attrs:
-                        exec("eventtrain." + attr + " = self." + attr)
-                    eventtrain._time = time
-                    eventtrain._support = support
-                    eventtrain.loc = ItemGetter_loc(eventtrain)
-                    eventtrain.iloc = ItemGetter_iloc(eventtrain)
-                return eventtrain
-            except Exception:
-                raise TypeError(
-                    'unsupported subsctipting type {}'.format(type(idx)))
+        except Exception:
+            raise TypeError(
+                'unsupported subsctipting type {}'.format(type(idx)))
+        return self._restricted_copy(support)
 
 
     def __getitem__(self, idx):
@@ -1526,117 +1653,45 @@ class ValueEventArray(EventBase):
         return out
 
     @staticmethod
-    def _restrict_to_epoch_array_fast(epocharray, time, value, copyover=True):
+    @instrumented('restriction')
+    def _restrict_to_epoch_array_fast(epocharray, time, values, copyover=True):
         """Return time and values restricted to an EpochArray.
 
-        This function assumes sorted event times, so that binary search can
-        be used to quickly identify slices that should be kept in the
-        restriction. It does not check every event time.
+        All sources are restricted at once (see _restrict_events), which
+        does not require sorted event times, but preserves their order.
 
         Parameters
         ----------
         epocharray : EpochArray
         time : array-like
         values : array-like
+        copyover : bool, optional
+            Unused; the restricted times and values are always new arrays.
         """
-        raise NotImplementedError
-        if epocharray.isempty:
-            n_sources = len(time)
-            time = np.zeros((n_sources,0))
-            return time
-
-        singlesource = len(time)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            time = copy.copy(time)
-
-        # NOTE: this used to assume multiple sources for the enumeration to work
-        for source, st_time in enumerate(time):
-            indices = []
-            for eptime in epocharray.time:
-                t_start = eptime[0]
-                t_stop = eptime[1]
-                frm, to = np.searchsorted(st_time, (t_start, t_stop))
-                indices.append((frm, to))
-            indices = np.array(indices, ndmin=2)
-            if np.diff(indices).sum() < len(st_time):
-                warnings.warn(
-                    'ignoring events outside of eventtrain support')
-            if singlesource:
-                time_list = []
-                for start, stop in indices:
-                    time_list.extend(st_time[start:stop])
-                time = np.array(time_list, ndmin=2)
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                time_list = []
-                for start, stop in indices:
-                    time_list.extend(st_time[start:stop])
-                time_ = time.tolist()
-                time_[source] = np.array(time_list)
-                time = np.array(time_)
-        return time
+        return _restrict_events(epocharray, time, values)
 
     @staticmethod
-    def _restrict_to_epoch_array(epocharray, time, copyover=True):
-        """Return time restricted to an EpochArray.
+    @instrumented('restriction')
+    def _restrict_to_epoch_array(epocharray, time, values, copyover=True):
+        """Return time and values restricted to an EpochArray.
 
-        This function is quite slow, as it checks each event time for inclusion.
-        It does this in a vectorized form, which is fast for small or moderately
-        sized objects, but the memory penalty can be large, and it becomes very
-        slow for large objects. Consequently, _restrict_to_epoch_array_fast
-        should be used when possible.
+        Equivalent to _restrict_to_epoch_array_fast, which no longer
+        assumes sorted event times.
 
         Parameters
         ----------
         epocharray : EpochArray
         time : array-like
+        values : array-like
         """
-        raise NotImplementedError
-        if epocharray.isempty:
-            n_sources = len(time)
-            time = np.zeros((n_sources,0))
-            return time
-
-        singlesource = len(time)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            time = copy.copy(time)
-
-        # NOTE: this used to assume multiple sources for the enumeration to work
-        for source, st_time in enumerate(time):
-            indices = []
-            for eptime in epocharray.time:
-                t_start = eptime[0]
-                t_stop = eptime[1]
-                indices.append((st_time >= t_start) & (st_time < t_stop))
-            indices = np.any(np.column_stack(indices), axis=1)
-            if np.count_nonzero(indices) < len(st_time):
-                warnings.warn(
-                    'ignoring events outside of eventtrain support')
-            if singlesource:
-                time = np.array([time[0][indices]], ndmin=2)
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                time_ = time.tolist()
-                time_[source] = np.array(time_[source])
-                time_[source] = time_[source][indices]
-                time = np.array(time_)
-        return time
+        return _restrict_events(epocharray, time, values)
 
     def __repr__(self):
-        raise NotImplementedError
         address_str = " at " + str(hex(id(self)))
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             if self.isempty:
-                return "<empty EventArray" + address_str + ">"
+                return "<empty ValueEventArray" + address_str + ">"
             if self.support.n_epochs > 1:
                 epstr = " ({} segments)".format(self.support.n_epochs)
             else:
@@ -1650,13 +1705,51 @@ class ValueEventArray(EventBase):
             else:
                 labelstr = ""
             numstr = " %s sources" % self.n_sources
-        return "<EventArray%s:%s%s>%s%s" % (address_str, numstr, epstr, fsstr, labelstr)
+        return "<ValueEventArray%s:%s%s>%s%s" % (address_str, numstr, epstr, fsstr, labelstr)
+
+    def bin(self, *, ds=None, method='mean'):
+        """Return the event values aggregated in bins, as an AnalogSignalArray.
+
+        Bins are contained wholly inside the epochs of the support, as for
+        EventArray.bin, and are sampled at their centers.
+
+        Parameters
+        ----------
+        ds : float, optional
+            Bin width, in seconds. Default is 0.0625 (62.5 ms).
+        method : string, optional
+            Aggregation of the values within each bin, one of ['count',
+            'sum', 'mean', 'min', 'max', 'first', 'last']. Default is
+            'mean'. Bins without events are 0 for 'count' and 'sum', and
+            nan otherwise.
+
+        Returns
+        -------
+        out : AnalogSignalArray
+            One signal per source, with fs = 1/ds.
+        """
+        if ds is None:
+            warnings.warn('no bin size was given, assuming 62.5 ms')
+            ds = 0.0625
+        data, edges, n_bins = _bin_events(self.support, ds, self.time,
+                                          values=self.values, method=method)
+        bin_centers, support = _get_bin_centers_and_support(edges, n_bins, ds)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            out = core.AnalogSignalArray(data, timestamps=bin_centers,
+                                         fs=1/ds, support=support)
+        return out
 
     @property
     def time(self):
         """Event times in seconds."""
         return self._time
 
+    @property
+    def values(self):
+        """Event values."""
+        return self._values
+
     @property
     def n_events(self):
         """(np.array) The number of events in each source."""
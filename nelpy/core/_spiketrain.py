@@ -1,5 +1,6 @@
 __all__ = ['SpikeTrainArray',
-           'BinnedSpikeTrainArray']
+           'BinnedSpikeTrainArray',
+           'SpikeTrainPlan']
 
 import warnings
 import numpy as np
@@ -10,6 +11,7 @@ from abc import ABC, abstractmethod
 from .. import core
 from .. import utils
 from .. import version
+from ..utils_.decorators import instrumented
 
 # Force warnings.warn() to omit the source code line in the message
 formatwarning_orig = warnings.formatwarning
@@ -299,6 +301,20 @@ class SpikeTrain(ABC):
         """(int) The number of underlying epochs."""
         return self.support.n_epochs
 
+    def lazy(self):
+        """Returns a SpikeTrainPlan, recording (instead of executing)
+        subsequent indexing, bin, smooth and flatten operations.
+
+        The recorded chain is fused and executed on first data access, or
+        when calling .compute() explicitly.
+
+        Examples
+        --------
+        >>> bst = st.lazy()[epochs].bin(ds=0.02).smooth(sigma=0.05).flatten()
+        >>> bst.data  # restriction, binning and smoothing happen here
+        """
+        return SpikeTrainPlan(self)
+
     @property
     def unit_ids(self):
         """Unit IDs contained in the SpikeTrain."""
@@ -663,7 +679,14 @@ class SpikeTrainArray(SpikeTrain):
         """Return a copy of self, without event times."""
         out = copy.copy(self) # shallow copy
         out._time = None
-        out = copy.deepcopy(self) # just to be on the safe side, but at least now we are not copying the data!
+        # the indexers still refer to self, and would drag its data along:
+        out._slicer = None
+        out.loc = None
+        out.iloc = None
+        out = copy.deepcopy(out) # just to be on the safe side, but at least now we are not copying the data!
+        out._slicer = EpochUnitSlicer(out)
+        out.loc = ItemGetter_loc(out)
+        out.iloc = ItemGetter_iloc(out)
 
         return out
 
@@ -863,16 +886,18 @@ class SpikeTrainArray(SpikeTrain):
         flattened._unit_labels = [unit_label]
         flattened._unit_tags = None
 
-        alltimes = self.time[0]
-        for unit in range(1,self.n_units):
-            alltimes = utils.linear_merge(alltimes, self.time[unit])
+        # a stable sort of the concatenated (sorted) spike trains gives
+        # the same result as merging them pairwise:
+        alltimes = np.sort(np.concatenate([np.ravel(st) for st in self.time]),
+                           kind='mergesort')
 
-        flattened._time = np.array(list(alltimes), ndmin=2)
+        flattened._time = np.array(alltimes, ndmin=2)
         flattened.loc = ItemGetter_loc(flattened)
         flattened.iloc = ItemGetter_iloc(flattened)
         return flattened
 
     @staticmethod
+    @instrumented('restriction')
     def _restrict_to_epoch_array_fast(epocharray, time, copyover=True):
         """Return time restricted to an EpochArray.
 
@@ -926,6 +951,7 @@ class SpikeTrainArray(SpikeTrain):
         return time
 
     @staticmethod
+    @instrumented('restriction')
     def _restrict_to_epoch_array(epocharray, time, copyover=True):
         """Return time restricted to an EpochArray.
 
@@ -995,9 +1021,13 @@ class SpikeTrainArray(SpikeTrain):
             numstr = " %s units" % self.n_units
         return "<SpikeTrainArray%s:%s%s>%s%s" % (address_str, numstr, epstr, fsstr, labelstr)
 
-    def bin(self, *, ds=None):
-        """Return a binned spiketrain array."""
-        return BinnedSpikeTrainArray(self, ds=ds)
+    def bin(self, *, ds=None, sparse=False):
+        """Return a binned spiketrain array.
+
+        If sparse is True, spike counts are stored in a scipy.sparse matrix
+        (see BinnedSpikeTrainArray).
+        """
+        return BinnedSpikeTrainArray(self, ds=ds, sparse=sparse)
 
     @property
     def time(self):
@@ -1126,6 +1156,12 @@ class BinnedSpikeTrainArray(SpikeTrain):
     fs : float, optional
         Sampling rate in Hz. If fs is passed as a parameter, then time
         is assumed to be in sample numbers instead of actual time.
+    sparse : bool, optional
+        If True, spike counts are stored in a scipy.sparse CSR matrix
+        instead of a dense array, which is much smaller for fine bins.
+        Sparse storage is converted to a dense array automatically when
+        more than max_sparse_density of the bins are non-zero. Default is
+        False.
 
     Attributes
     ----------
@@ -1137,7 +1173,9 @@ class BinnedSpikeTrainArray(SpikeTrain):
                       "_binnedSupport", "_spiketrainarray"]
     __attributes__.extend(SpikeTrain.__attributes__)
 
-    def __init__(self, spiketrainarray=None, *, ds=None, empty=False):
+    max_sparse_density = 0.1
+
+    def __init__(self, spiketrainarray=None, *, ds=None, empty=False, sparse=False):
 
         super().__init__(empty=True)
 
@@ -1213,7 +1251,8 @@ class BinnedSpikeTrainArray(SpikeTrain):
         self._bin_spikes(
             spiketrainarray=spiketrainarray,
             epochArray=spiketrainarray.support,
-            ds=ds
+            ds=ds,
+            sparse=sparse
             )
 
     def partition(self, ds=None, n_epochs=None):
@@ -1451,7 +1490,7 @@ class BinnedSpikeTrainArray(SpikeTrain):
     def n_units(self):
         """(int) The number of units."""
         try:
-            return utils.PrettyInt(self.data.shape[0])
+            return utils.PrettyInt(self._data.shape[0])
         except AttributeError:
             return 0
 
@@ -1497,9 +1536,48 @@ class BinnedSpikeTrainArray(SpikeTrain):
     def data(self):
         """(np.array) The spike counts in all the bins.
         See also BinnedSpikeTrain.centers
+
+        Sparse data are returned as a (new) dense array.
         """
+        if self.issparse:
+            return self._data.toarray()
         return self._data
 
+    @property
+    def issparse(self):
+        """(bool) Whether the spike counts are stored in a sparse matrix."""
+        return utils._issparse(self._data)
+
+    def tosparse(self):
+        """Returns a BinnedSpikeTrainArray with sparse (CSR) spike counts.
+
+        The data are not converted back to a dense array automatically,
+        irrespective of max_sparse_density.
+        """
+        from scipy import sparse
+
+        out = copy.copy(self)
+        out._data = sparse.csr_matrix(self._data)
+        out.__renew__()
+        return out
+
+    def todense(self):
+        """Returns a BinnedSpikeTrainArray with dense spike counts."""
+        if not self.issparse:
+            return self
+        out = copy.copy(self)
+        out._data = self._data.toarray()
+        out.__renew__()
+        return out
+
+    def _densify_if_needed(self):
+        """Convert sparse data to a dense array if too many bins are non-zero."""
+        if not self.issparse:
+            return
+        n_values = self._data.shape[0] * self._data.shape[1]
+        if n_values and self._data.nnz > self.max_sparse_density * n_values:
+            self._data = self._data.toarray()
+
     @property
     def bins(self):
         """(np.array) The bin edges (in seconds)."""
@@ -1595,12 +1673,15 @@ class BinnedSpikeTrainArray(SpikeTrain):
         centers = bins[:-1] + (ds / 2)
         return bins, centers
 
-    def _bin_spikes(self, spiketrainarray, epochArray, ds):
+    @instrumented('binning')
+    def _bin_spikes(self, spiketrainarray, epochArray, ds, sparse=False):
         """
         Docstring goes here. TBD. For use with bins that are contained
         wholly inside the epochs.
 
         """
+        if sparse:
+            return self._bin_spikes_sparse(spiketrainarray, epochArray, ds)
         b = []  # bin list
         c = []  # centers list
         s = []  # data list
@@ -1639,6 +1720,59 @@ class BinnedSpikeTrainArray(SpikeTrain):
         supportdata = np.vstack([support_starts, support_stops]).T
         self._support = core.EpochArray(supportdata) # set support to TRUE bin support
 
+    def _bin_spikes_sparse(self, spiketrainarray, epochArray, ds):
+        """Bin spikes into a sparse (CSR) count matrix.
+
+        Each spike is assigned to its bin directly, so that the dense
+        (n_units, n_bins) array is never allocated. Counts are identical to
+        those of np.histogram in _bin_spikes.
+        """
+        from scipy import sparse
+
+        b = []  # bin list
+        c = []  # centers list
+        rows = []
+        cols = []
+        left_edges = []
+        right_edges = []
+        counter = 0
+        for epoch in epochArray:
+            bins, centers = self._get_bins_inside_epoch(epoch, ds)
+            if bins is not None:
+                for uu, spiketraintimes in enumerate(spiketrainarray.time):
+                    spiketraintimes = np.asarray(spiketraintimes, dtype=float)
+                    lo = np.searchsorted(spiketraintimes, bins[0], side='left')
+                    hi = np.searchsorted(spiketraintimes, bins[-1], side='right')
+                    binidx = np.searchsorted(bins, spiketraintimes[lo:hi], side='right') - 1
+                    # the last bin is closed, as in np.histogram:
+                    binidx[binidx == len(centers)] = len(centers) - 1
+                    rows.append(np.full(len(binidx), uu))
+                    cols.append(binidx + counter)
+                left_edges.append(counter)
+                counter += len(centers) - 1
+                right_edges.append(counter)
+                counter += 1
+                b.extend(bins.tolist())
+                c.extend(centers.tolist())
+        self._bins = np.array(b)
+        self._bin_centers = np.array(c)
+        rows = np.concatenate(rows) if rows else np.array([], dtype=int)
+        cols = np.concatenate(cols) if cols else np.array([], dtype=int)
+        # duplicate (row, col) entries are summed into counts:
+        self._data = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=int), (rows, cols)),
+            shape=(spiketrainarray.n_units, counter))
+        self._densify_if_needed()
+        le = np.array(left_edges)
+        le = le[:, np.newaxis]
+        re = np.array(right_edges)
+        re = re[:, np.newaxis]
+        self._binnedSupport = np.hstack((le, re))
+        support_starts = self.bins[np.insert(np.cumsum(self.lengths+1),0,0)[:-1]]
+        support_stops = self.bins[np.insert(np.cumsum(self.lengths+1)-1,0,0)[1:]]
+        supportdata = np.vstack([support_starts, support_stops]).T
+        self._support = core.EpochArray(supportdata) # set support to TRUE bin support
+
     def smooth(self, *, sigma=None, inplace=False,  bw=None):
         """Smooth BinnedSpikeTrainArray by convolving with a Gaussian kernel.
 
@@ -1762,6 +1896,7 @@ class BinnedSpikeTrainArray(SpikeTrain):
         return self._rebin_binnedspiketrain(bst, w=w)
 
     @staticmethod
+    @instrumented('binning')
     def _rebin_binnedspiketrain(bst, w=None):
         """Rebin a BinnedSpikeTrainArray into a coarser bin size.
 
@@ -1895,7 +2030,7 @@ class BinnedSpikeTrainArray(SpikeTrain):
         newbst._bins = bins
         newbst._binnedSupport = binnedSupport
         newbst._support = support
-        newbst._data = newbst.data[:,all_timestamps]
+        newbst._data = newbst._data[:,all_timestamps]
 
         newbst.loc = ItemGetter_loc(newbst)
         newbst.iloc = ItemGetter_iloc(newbst)
@@ -1951,6 +2086,8 @@ class BinnedSpikeTrainArray(SpikeTrain):
         """Number of active units per time bin with shape (n_bins,)."""
         if self.isempty:
             return 0
+        if self.issparse:
+            return np.asarray((self._data > 0).sum(axis=0)).ravel()
         # TODO: profile several alternatves. Could use data > 0, or
         # other numpy methods to get a more efficient implementation:
         return self.data.clip(max=1).sum(axis=0)
@@ -1960,6 +2097,8 @@ class BinnedSpikeTrainArray(SpikeTrain):
         """(np.array) The number of spikes in each unit."""
         if self.isempty:
             return 0
+        if self.issparse:
+            return np.asarray(self._data.sum(axis=1)).ravel()
         return self.data.sum(axis=1)
 
     def flatten(self, *, unit_id=None, unit_label=None):
@@ -1992,7 +2131,12 @@ class BinnedSpikeTrainArray(SpikeTrain):
             warnings.simplefilter("ignore")
             for attr in attrs:
                 exec("binnedspiketrainarray." + attr + " = self." + attr)
-        binnedspiketrainarray._data = np.array(self.data.sum(axis=0), ndmin=2)
+        if self.issparse:
+            from scipy import sparse
+            binnedspiketrainarray._data = sparse.csr_matrix(self._data.sum(axis=0))
+            binnedspiketrainarray._densify_if_needed()
+        else:
+            binnedspiketrainarray._data = np.array(self.data.sum(axis=0), ndmin=2)
         binnedspiketrainarray._unit_ids = [unit_id]
         binnedspiketrainarray._unit_labels = [unit_label]
         binnedspiketrainarray._unit_tags = None
@@ -2002,3 +2146,161 @@ class BinnedSpikeTrainArray(SpikeTrain):
 
 #----------------------------------------------------------------------#
 #======================================================================#
+
+class SpikeTrainPlan(object):
+    """Deferred chain of SpikeTrainArray / BinnedSpikeTrainArray operations.
+
+    A SpikeTrainPlan is obtained from SpikeTrainArray.lazy() or from
+    BinnedSpikeTrainArray.lazy(). Indexing, bin(), smooth() and flatten()
+    return a new plan with the operation appended, and nothing is computed
+    until the data are first accessed (any other attribute is delegated to
+    the computed result), or until compute() is called.
+
+    When the plan is executed, it is fused as follows:
+        - consecutive EpochArray restrictions of a SpikeTrainArray are
+          intersected into a single support, so that spike times are
+          restricted only once, and always before binning;
+        - flatten() commutes with epoch restriction, binning and smoothing,
+          so (unless units are indexed) it is moved to the front of the
+          chain, and only a single unit is binned and smoothed;
+        - smooth() is applied in place on the binned data that the plan
+          owns, instead of on a deep copy; float data is not copied again.
+    Operations that cannot be fused are executed eagerly, in order. The
+    source object is never modified.
+
+    Parameters
+    ----------
+    source : SpikeTrainArray or BinnedSpikeTrainArray
+        Object to which the operations are applied.
+    ops : tuple, optional
+        Recorded operations, as (name, args, kwargs) tuples.
+    """
+
+    def __init__(self, source, ops=()):
+        self._source = source
+        self._ops = tuple(ops)
+        self._result = None
+
+    def _append(self, name, *args, **kwargs):
+        """Return a new plan, with the operation appended."""
+        return SpikeTrainPlan(self._source, self._ops + ((name, args, kwargs),))
+
+    def __getitem__(self, idx):
+        return self._append('__getitem__', idx)
+
+    def bin(self, *, ds=None):
+        """Record binning; see SpikeTrainArray.bin()."""
+        return self._append('bin', ds=ds)
+
+    def smooth(self, *, sigma=None, bw=None):
+        """Record smoothing; see BinnedSpikeTrainArray.smooth()."""
+        return self._append('smooth', sigma=sigma, bw=bw)
+
+    def flatten(self, *, unit_id=None, unit_label=None):
+        """Record flattening; see SpikeTrainArray.flatten()."""
+        return self._append('flatten', unit_id=unit_id, unit_label=unit_label)
+
+    def lazy(self):
+        return self
+
+    def compute(self):
+        """Execute the (fused) plan, and return the result.
+
+        The result is cached, so that the plan is executed only once.
+        """
+        if self._result is None:
+            self._result = self._execute()
+        return self._result
+
+    def _execute(self):
+        obj = self._source
+        ops = list(self._ops)
+
+        # flatten can be hoisted to the front, unless units are indexed:
+        flatten = None
+        flatten_ops = [op for op in ops if op[0] == 'flatten']
+        if flatten_ops and all(isinstance(args[0], core.EpochArray)
+                               for name, args, _ in ops if name == '__getitem__'):
+            flatten = flatten_ops[0][2]
+            ops = [op for op in ops if op[0] != 'flatten']
+
+        owned = False   # whether obj._data may be modified in place
+        if flatten is not None and not isinstance(obj, SpikeTrainArray):
+            flattened = obj.flatten(**flatten)
+            owned = flattened is not obj
+            obj, flatten = flattened, None
+
+        support = None  # fused support of pending restrictions
+        for name, args, kwargs in ops:
+            if isinstance(obj, SpikeTrainArray):
+                if name == '__getitem__' and isinstance(args[0], core.EpochArray):
+                    if support is None:
+                        support = obj.support
+                    support = support.intersect(epoch=args[0], boundaries=True)
+                    continue
+                obj = self._restrict(obj, support, flatten)
+                support, flatten = None, None
+
+            if name == 'bin':
+                obj = obj.bin(**kwargs)
+                owned = True
+            elif name == 'smooth':
+                if not owned:
+                    # smooth a shallow copy with its own (float) data, so that
+                    # the source is left intact
+                    obj = copy.copy(obj)
+                    obj.__renew__()
+                    if not obj.issparse:
+                        obj._data = obj._data.astype(float)
+                obj.smooth(inplace=True, **kwargs)
+                owned = True
+            elif name == 'flatten':
+                flattened = obj.flatten(**kwargs)
+                owned = owned or flattened is not obj
+                obj = flattened
+            elif name == '__getitem__':
+                obj = obj[args[0]]
+                owned = False
+            else:
+                obj = getattr(obj, name)(*args, **kwargs)
+                owned = False
+
+        if isinstance(obj, SpikeTrainArray):
+            obj = self._restrict(obj, support, flatten)
+        return obj
+
+    @staticmethod
+    def _restrict(st, support, flatten):
+        """Apply the pending (fused) restriction and flatten to st."""
+        if support is not None:
+            st = st[support]
+        if flatten is not None:
+            st = st.flatten(**flatten)
+        return st
+
+    def __getattr__(self, attr):
+        # private and special attributes are not delegated, so that the
+        # plan can be copied and pickled without being executed:
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.compute(), attr)
+
+    def __iter__(self):
+        return iter(self.compute())
+
+    def __repr__(self):
+        address_str = " at " + str(hex(id(self)))
+        ops = []
+        for name, args, kwargs in self._ops:
+            if name == '__getitem__':
+                ops.append('[{}]'.format(type(args[0]).__name__))
+            else:
+                params = ', '.join('{}={}'.format(key, val)
+                                   for key, val in kwargs.items() if val is not None)
+                ops.append('.{}({})'.format(name, params))
+        status = 'computed' if self._result is not None else 'pending'
+        return "<SpikeTrainPlan{}: {}{} ({})>".format(
+            address_str, type(self._source).__name__, ''.join(ops), status)
+
+#----------------------------------------------------------------------#
+#======================================================================#
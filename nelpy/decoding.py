@@ -10,6 +10,7 @@ __all__ = ['decode1D',
 
 import numpy as np
 from . import auxiliary
+from .utils_.decorators import instrumented
 
 def get_mode_pth_from_array(posterior, tuningcurve=None):
     """If tuningcurve is provided, then we map it back to the external coordinates / units.
@@ -58,6 +59,7 @@ def get_mean_pth_from_array(posterior, tuningcurve=None):
 
     return mean_pth
 
+@instrumented('decoding')
 def decode1D(bst, ratemap, xmin=0, xmax=100, w=1, nospk_prior=None, _skip_empty_bins=True):
     """Decodes binned spike trains using a ratemap with shape (n_units, n_ext)
 
@@ -109,7 +111,7 @@ def decode1D(bst, ratemap, xmin=0, xmax=100, w=1, nospk_prior=None, _skip_empty_
     assert float(w).is_integer(), "w must be a positive integer!"
     assert w > 0, "w must be a positive integer!"
 
-    n_units, t_bins = bst.data.shape
+    n_units, t_bins = bst._data.shape
     _, n_xbins = ratemap.shape
 
     # if we pass a TuningCurve1D object, extract the ratemap and re-order
@@ -157,7 +159,10 @@ def decode1D(bst, ratemap, xmin=0, xmax=100, w=1, nospk_prior=None, _skip_empty_
     cum_posterior_lengths = np.insert(np.cumsum(posterior_lengths),0,0)
     prev_idx = 0
     for ii, to_idx in enumerate(cumlengths):
-        data = bst.data[:,prev_idx:to_idx]
+        data = bst._data[:,prev_idx:to_idx]
+        if bst.issparse:
+            # sparse counts are only made dense one epoch at a time:
+            data = data.toarray()
         prev_idx = to_idx
         datacum = np.cumsum(data, axis=1) # ii'th data segment, with column of zeros prepended
         datacum = np.hstack((np.zeros((n_units,1)), datacum))
@@ -195,6 +200,7 @@ def decode1D(bst, ratemap, xmin=0, xmax=100, w=1, nospk_prior=None, _skip_empty_
     mean_pth = (bin_centers * posterior.T).sum(axis=1)
     return posterior, cum_posterior_lengths, mode_pth, mean_pth
 
+@instrumented('decoding')
 def decode2D(bst, ratemap, xmin=0, xmax=100, ymin=0, ymax=100, w=1, nospk_prior=None, _skip_empty_bins=True):
     """Decodes binned spike trains using a ratemap with shape (n_units, ext_nx, ext_ny)
 
@@ -253,7 +259,7 @@ def decode2D(bst, ratemap, xmin=0, xmax=100, ymin=0, ymax=100, w=1, nospk_prior=
     assert float(w).is_integer(), "w must be a positive integer!"
     assert w > 0, "w must be a positive integer!"
 
-    n_units, t_bins = bst.data.shape
+    n_units, t_bins = bst._data.shape
 
     xbins = None
     ybins = None
@@ -303,7 +309,10 @@ def decode2D(bst, ratemap, xmin=0, xmax=100, ymin=0, ymax=100, w=1, nospk_prior=
     cum_posterior_lengths = np.insert(np.cumsum(posterior_lengths),0,0)
     prev_idx = 0
     for ii, to_idx in enumerate(cumlengths):
-        data = bst.data[:,prev_idx:to_idx]
+        data = bst._data[:,prev_idx:to_idx]
+        if bst.issparse:
+            # sparse counts are only made dense one epoch at a time:
+            data = data.toarray()
         prev_idx = to_idx
         datacum = np.cumsum(data, axis=1) # ii'th data segment, with column of zeros prepended
         datacum = np.hstack((np.zeros((n_units,1)), datacum))
@@ -12,14 +12,14 @@ from hmmlearn.hmm import PoissonHMM as PHMM
 from warnings import warn
 import numpy as np
 from pandas import unique
-from matplotlib.pyplot import subplots
 import copy
 
 from . core import BinnedSpikeTrainArray # may have to be from . import core, and then core.BinnedSpikeTrainArray
+from . import utils
 from . utils import swap_cols, swap_rows
-from . import plotting
 from . decoding import decode1D
 from . analysis import replay
+from . utils_.decorators import instrumented
 
 __all__ = ['PoissonHMM',
            'estimate_model_quality']
@@ -89,6 +89,106 @@ def estimate_model_quality(bst, *, hmm=None, n_states=None, n_shuffles=1000, k_f
 
     return quality, scores, shuffled
 
+def _poisson_log_emissions(X, means):
+    """Log probability of each observation under each state, for
+    independent Poisson emissions.
+
+    Parameters
+    ----------
+    X : array or scipy.sparse matrix, shape (n_samples, n_features)
+    means : array, shape (n_components, n_features)
+
+    Returns
+    -------
+    framelogprob : array, shape (n_samples, n_components)
+    """
+    from scipy.special import gammaln
+
+    means = np.asarray(means, dtype=float)
+    # log(0) is only a problem when multiplied by zero counts, which should
+    # contribute nothing (as in scipy.stats.poisson.logpmf):
+    zero = means <= 0
+    logmeans = np.log(np.where(zero, 1, means))
+    if utils._issparse(X):
+        # gammaln(0 + 1) == 0, so only the non-zero counts contribute:
+        X = X.tocsr().astype(float)
+        lgammas = X.copy()
+        lgammas.data = gammaln(lgammas.data + 1)
+        lgammas = np.asarray(lgammas.sum(axis=1)).ravel()
+    else:
+        X = np.asarray(X, dtype=float)
+        lgammas = gammaln(X + 1).sum(axis=1)
+    framelogprob = np.asarray(X @ logmeans.T) - means.sum(axis=1) \
+        - lgammas[:, np.newaxis]
+    if np.any(zero):
+        framelogprob[((X > 0).astype(float) @ zero.T) > 0] = -np.inf
+    return framelogprob
+
+def _forward_log_normalizers(framelogprob, startprob, transmats, lengths=None):
+    """Scaled forward algorithm for a stack of transition matrices.
+
+    All sequences are filtered simultaneously, so that the number of
+    (vectorized) steps is the length of the longest sequence, and the
+    emission probabilities are shared by all transition matrices.
+
+    Parameters
+    ----------
+    framelogprob : array, shape (n_samples, n_components)
+        Log emission probabilities.
+    startprob : array, shape (n_components,)
+    transmats : array, shape (n_transmats, n_components, n_components)
+    lengths : array-like of integers, shape (n_sequences,), optional
+        Lengths of the individual sequences. Default is a single sequence.
+
+    Returns
+    -------
+    log_normalizers : array, shape (n_transmats, n_samples)
+        log p(x_t | x_1, ..., x_{t-1}) for each sample within its sequence.
+    """
+    framelogprob = np.asarray(framelogprob, dtype=float)
+    transmats = np.asarray(transmats, dtype=float)
+    n_samples, n_components = framelogprob.shape
+    if lengths is None:
+        lengths = [n_samples]
+    lengths = np.asarray(lengths, dtype=int)
+    if lengths.sum() != n_samples:
+        raise ValueError("lengths must sum to the number of samples")
+    starts = np.cumsum(lengths) - lengths
+    n_transmats = transmats.shape[0]
+
+    # emissions, scaled per sample for numerical stability:
+    with np.errstate(invalid='ignore'):
+        logmax = np.max(framelogprob, axis=1, keepdims=True)
+        logmax[~np.isfinite(logmax)] = 0
+        emissions = np.exp(framelogprob - logmax)
+
+    log_normalizers = np.empty((n_transmats, n_samples))
+    alpha = np.zeros((n_transmats, len(lengths), n_components))
+    for tt in range(lengths.max() if len(lengths) else 0):
+        active = np.flatnonzero(lengths > tt)
+        idx = starts[active] + tt
+        if tt == 0:
+            pred = np.broadcast_to(startprob, (n_transmats, len(active), n_components))
+        else:
+            pred = np.matmul(alpha[:, active, :], transmats)
+        a = pred * emissions[idx]
+        c = a.sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alpha[:, active, :] = np.where(c[..., np.newaxis] > 0,
+                                           a / c[..., np.newaxis], 0)
+            log_normalizers[:, idx] = np.log(c) + logmax[idx, 0]
+    return log_normalizers
+
+def _cumsum_per_sequence(x, lengths):
+    """Cumulative sum along the last axis, restarting at each sequence."""
+    x = np.asarray(x, dtype=float)
+    lengths = np.asarray(lengths, dtype=int)
+    starts = np.cumsum(lengths) - lengths
+    out = np.cumsum(x, axis=-1)
+    # subtract the running total at the start of each sequence:
+    offsets = out[..., starts] - x[..., starts]
+    return out - np.repeat(offsets, lengths, axis=-1)
+
 class PoissonHMM(PHMM):
     """Nelpy extension of PoissonHMM: Hidden Markov Model with
     independent Poisson emissions.
@@ -406,7 +506,7 @@ class PoissonHMM(PHMM):
                 return False
         return True
 
-    def _sliding_window_array(self, bst, w=1):
+    def _sliding_window_array(self, bst, w=1, sparse=False):
         """Returns an unwrapped data array by sliding w bins one bin at a time.
 
         If w==1, then bins are non-overlapping.
@@ -414,6 +514,9 @@ class PoissonHMM(PHMM):
         Parameters
         ----------
         bst : BinnedSpikeTrainArray, with data array of shape (n_units, n_bins)
+        sparse : bool, optional
+            If True (and w==1), sparse spike counts are returned as a
+            scipy.sparse matrix, instead of a dense array. Default is False.
 
         Returns
         -------
@@ -435,6 +538,8 @@ class PoissonHMM(PHMM):
             self._reorder_units_by_ids(bst.unit_ids)
 
         if w == 1:
+            if sparse and bst.issparse:
+                return bst._data.T.tocsr(), bst.lengths
             return bst.data.T, bst.lengths
 
         n_units, t_bins = bst.data.shape
@@ -480,6 +585,7 @@ class PoissonHMM(PHMM):
 
         return unwrapped.T, lengths
 
+    @instrumented('hmm')
     def decode(self, X, lengths=None, w=None, algorithm=None):
         """Find most likely state sequence corresponding to ``X``.
 
@@ -592,6 +698,7 @@ class PoissonHMM(PHMM):
 
             return posteriors, state_sequences
 
+    @instrumented('hmm')
     def predict_proba(self, X, lengths=None, w=None, returnLengths=False):
         """Compute the posterior probability for each state in the model.
 
@@ -681,6 +788,7 @@ class PoissonHMM(PHMM):
         # raise NotImplementedError(
         #     "PoissonHMM.sample() has not been implemented yet.")
 
+    @instrumented('hmm')
     def score_samples(self, X, lengths=None, w=None):
         """Compute the log probability under the model and compute posteriors.
 
@@ -728,6 +836,7 @@ class PoissonHMM(PHMM):
                 posteriors.append(posterior.T)
             return logprobs, posteriors
 
+    @instrumented('hmm')
     def score(self, X, lengths=None, w=None):
         """Compute the log probability under the model.
 
@@ -769,6 +878,7 @@ class PoissonHMM(PHMM):
                 logprobs.append(logprob)
         return logprobs
 
+    @instrumented('hmm')
     def _cum_score_per_bin(self, X, lengths=None, w=None):
         """Compute the log probability under the model, cumulatively for each bin per event."""
 
@@ -777,17 +887,115 @@ class PoissonHMM(PHMM):
             if w is not None:
                 raise NotImplementedError ("sliding window decoding for feature matrices not yet implemented!")
             return self._score(self, X, lengths=lengths)
+        else:
+            # we have a BinnedSpikeTrainArray; a single forward pass gives
+            # the log probabilities of all prefixes of each event
+            log_normalizers, lengths = self._forward_filter(X, w=w)
+            return _cumsum_per_sequence(log_normalizers[0], lengths)
+
+    def _forward_filter(self, X, lengths=None, w=None, transmats=None):
+        """Forward filter X for a stack of transition matrices.
+
+        Returns
+        -------
+        log_normalizers : array, shape (n_transmats, n_samples)
+        lengths : array of sequence lengths
+        """
+        if not isinstance(X, BinnedSpikeTrainArray):
+            # assume we have a feature matrix
+            if w is not None:
+                raise NotImplementedError ("sliding window decoding for feature matrices not yet implemented!")
+            X = np.asarray(X)
+            if lengths is None:
+                lengths = [len(X)]
         else:
             # we have a BinnedSpikeTrainArray
-            logprobs = []
-            for seq in X:
-                windowed_arr, lengths = self._sliding_window_array(bst=seq, w=w)
-                n_bins, _ = windowed_arr.shape
-                for ii in range(1, n_bins+1):
-                    logprob = self._score(self, X=windowed_arr[:ii,:])
-                    logprobs.append(logprob)
-        return logprobs
+            X, lengths = self._sliding_window_array(bst=X, w=w, sparse=True)
+        if transmats is None:
+            transmats = self.transmat_
+        transmats = np.asarray(transmats, dtype=float)
+        if transmats.ndim == 2:
+            transmats = transmats[np.newaxis]
+
+        framelogprob = _poisson_log_emissions(X, self.means_)
+        log_normalizers = _forward_log_normalizers(framelogprob,
+                                                   self.startprob_,
+                                                   transmats,
+                                                   lengths)
+        return log_normalizers, np.asarray(lengths)
+
+    @instrumented('hmm')
+    def forward_filter(self, X, lengths=None, w=None):
+        """Run the (scaled) forward algorithm, and return the per-bin log
+        normalizers.
+
+        The log normalizer of bin t is log p(x_t | x_1, ..., x_{t-1}), so
+        that its cumulative sum over a sequence gives the log probability of
+        every prefix of the sequence, and its total is the log probability of
+        the whole sequence (as returned by score).
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Feature matrix of individual samples.
+            OR
+            nelpy.BinnedSpikeTrainArray
+        lengths : array-like of integers, shape (n_sequences, ), optional
+            Lengths of the individual sequences in ``X``. The sum of
+            these should be ``n_samples``. This is not used when X is
+            a nelpy.BinnedSpikeTrainArray, in which case the lenghts are
+            automatically inferred.
+
+        Returns
+        -------
+        log_normalizers : array, shape (n_samples,)
+            Per-bin log normalizers; when X is a BinnedSpikeTrainArray,
+            these are concatenated over all events.
+
+        See Also
+        --------
+        forward_filter_transmats : Forward filter for many transition
+            matrices at once.
+        """
+        log_normalizers, _ = self._forward_filter(X, lengths=lengths, w=w)
+        return log_normalizers[0]
+
+    @instrumented('hmm')
+    def forward_filter_transmats(self, X, transmats, lengths=None, w=None):
+        """Run the (scaled) forward algorithm for many transition matrices at
+        once, and return the per-bin log normalizers.
+
+        The emission probabilities are computed only once, and all
+        transition matrices (and sequences) are filtered simultaneously,
+        which makes this much faster than re-scoring X with one model per
+        transition matrix, e.g., when scoring transition matrix shuffles.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Feature matrix of individual samples.
+            OR
+            nelpy.BinnedSpikeTrainArray
+        transmats : array, shape (n_transmats, n_components, n_components)
+            Transition probability matrices.
+        lengths : array-like of integers, shape (n_sequences, ), optional
+            Lengths of the individual sequences in ``X``. Not used when X is
+            a nelpy.BinnedSpikeTrainArray.
+
+        Returns
+        -------
+        log_normalizers : array, shape (n_transmats, n_samples)
+            Per-bin log normalizers, one row per transition matrix.
+
+        See Also
+        --------
+        forward_filter : Forward filter with the model's transition matrix.
+        """
+        log_normalizers, _ = self._forward_filter(X, lengths=lengths, w=w,
+                                                  transmats=transmats)
+        return log_normalizers
 
+    @instrumented('hmm')
     def fit(self, X, lengths=None, w=None):
         """Estimate model parameters using nelpy objects.
 
@@ -1088,6 +1296,8 @@ class PoissonHMM(PHMM):
         WARNING! This function is not complete, and hence 'private',
         and may be moved somewhere else later on.
         """
+        from matplotlib.pyplot import subplots
+        from . import plotting
 
         if labelstates is None:
             labelstates = [1, self.n_components]
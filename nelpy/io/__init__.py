@@ -3,18 +3,24 @@ nelpy.io
 ========
 
 This is the nelpy IO module.
+
+The individual readers are imported lazily, on first attribute access, so
+that e.g. pandas is only loaded when nelpy.io.hc3 is actually used.
 """
 
 # TODO: add file IO utils such as mkdir, getwd, load, save, glob, etc.
 # also possibly have examples and support for Jagular
 # also add hdf5 support, especially for pandas
 
-from . import hc3
-from . import matlab
-from . import neuralynx
-from . import neo
-from . import miniscopy
-from . import brian
-# from . import jagular
+from ..utils_.lazy import lazy_submodules as _lazy_submodules
+
+__getattr__, __dir__ = _lazy_submodules(__name__,
+                                        {'hc3': '.hc3',
+                                         'matlab': '.matlab',
+                                         'neuralynx': '.neuralynx',
+                                         'neo': '.neo',
+                                         'miniscopy': '.miniscopy',
+                                         'brian': '.brian'})
+                                        # 'jagular': '.jagular'
 
-__version__ = '0.0.3'
\ No newline at end of file
+__version__ = '0.0.3'
@@ -0,0 +1,101 @@
+"""Helpers shared by the nelpy readers."""
+
+import warnings
+import numpy as np
+
+from ..core import SpikeTrainArray, EpochArray
+
+__all__ = ['spiketrainarray_from_sorted',
+           'spiketrainarray_from_labels']
+
+def spiketrainarray_from_sorted(times, counts, *, fs, unit_ids, label=None,
+                                support=None):
+    """Build a SpikeTrainArray from spike times that are sorted by unit
+    (and by time within each unit), without any per-unit processing.
+
+    Parameters
+    ----------
+    times : np.array
+        Concatenated spike times (in seconds) of all units.
+    counts : np.array of int
+        Number of spikes of each unit.
+    fs : float
+        Sampling rate (Hz).
+    unit_ids : array-like
+        One unit ID per unit.
+    label : string, optional
+    support : EpochArray, optional
+        Support of the SpikeTrainArray. All spikes must lie within it.
+        Default is [first spike, last spike + 1/fs].
+
+    Returns
+    -------
+    st : SpikeTrainArray
+    """
+    # appending None forces a 1D object array, even if all units happen to
+    # have the same number of spikes:
+    time = np.array(np.split(times, np.cumsum(counts)[:-1]) + [None],
+                    dtype=object)[:-1]
+
+    st = SpikeTrainArray(empty=True)
+    st.fs = fs
+    st._time = time
+    # the setters validate and standardize the unit ids and labels
+    st.unit_ids = unit_ids
+    st.unit_labels = unit_ids
+    st.label = label
+    if support is not None:
+        st._support = support
+    elif times.size == 0:
+        warnings.warn("no spikes; cannot automatically determine support")
+        st._support = EpochArray(empty=True)
+    else:
+        st._support = EpochArray(np.array([times.min(), times.max() + 1/fs]))
+    return st
+
+def spiketrainarray_from_labels(times, labels, *, fs, unit_ids=None,
+                                label=None, support=None):
+    """Build a SpikeTrainArray from spike times and per-spike unit labels,
+    using a single sort instead of one boolean mask per unit.
+
+    Parameters
+    ----------
+    times : np.array
+        Spike times (in seconds).
+    labels : np.array of int
+        Unit label of each spike.
+    fs : float
+        Sampling rate (Hz).
+    unit_ids : array-like, optional
+        Labels of the units to include, in order. Spikes with other labels
+        are discarded. Default is all labels present, in increasing order.
+    label : string, optional
+    support : EpochArray, optional
+
+    Returns
+    -------
+    st : SpikeTrainArray
+    """
+    times = np.asarray(times)
+    labels = np.asarray(labels)
+    if unit_ids is None:
+        unit_ids = np.unique(labels)
+    unit_ids = np.asarray(unit_ids)
+
+    # index of each spike's unit in unit_ids (or -1 if not included)
+    sorter = np.argsort(unit_ids, kind='mergesort')
+    pos = np.searchsorted(unit_ids, labels, sorter=sorter)
+    pos = np.clip(pos, 0, max(unit_ids.size - 1, 0))
+    if unit_ids.size:
+        units = sorter[pos]
+        units[unit_ids[units] != labels] = -1
+    else:
+        units = np.full(labels.shape, -1)
+    keep = units >= 0
+    units, times = units[keep], times[keep]
+
+    order = np.lexsort((times, units))
+    counts = np.bincount(units, minlength=unit_ids.size)
+    return spiketrainarray_from_sorted(times[order], counts, fs=fs,
+                                       unit_ids=unit_ids, label=label,
+                                       support=support)
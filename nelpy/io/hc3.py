@@ -53,13 +53,18 @@ st2 = exp_data['session2']['spikes']
 
 """
 
-__all__ = ['load_hc3_data']
+__all__ = ['load_hc3_data',
+           'load_hc3_spikes']
 
 import os.path
+import hashlib
 import pandas as pd
 import numpy as np
 import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from ..core import *
+from ._common import spiketrainarray_from_sorted
 
 # from mymap import Map
 
@@ -79,9 +84,8 @@ def get_num_electrodes(sessiondir, verbose=False):
     else:
         raise ValueError('number of electrodes (shanks) could not be established...')
 
-#datatype = ['spikes', 'eeg', 'pos', '?']
-def load_hc3_data(fileroot, animal='gor01', year=2006, month=6, day=7, sessiontime='11-26-53', track=None, datatype='spikes', channels='all', fs=32552,starttime=0, ctx=None, verbose=False, includeUnsortedSpikes=False):
-
+def _get_session_dir(fileroot, *, animal, year, month, day, sessiontime, track=None):
+    """Return the session directory and session prefix of an hc3 session."""
     fileroot = os.path.normpath(fileroot)
     if track is None:
         anim_prefix = "{}-{}-{}".format(animal,month,day)
@@ -91,71 +95,190 @@ def load_hc3_data(fileroot, animal='gor01', year=2006, month=6, day=7, sessionti
         anim_prefix = "{}".format(animal)
         session_prefix = "{}-{}-{}_{}".format(year,month,str(day).zfill(2),sessiontime)
         sessiondir = "{}/{}/{}/{}".format(fileroot, anim_prefix, track, session_prefix) # track can be 'one', 'two', or 'sleep'
+    return sessiondir, session_prefix
+
+def _read_hc3_electrode(electrode):
+    """Parse the .clu and .res files of a single electrode.
+
+    Parameters
+    ----------
+    electrode : tuple (filename, ele)
+        Common file name prefix of the session, and the (1-based) electrode
+        number, so that the files are filename.clu.ele and filename.res.ele.
+
+    Returns
+    -------
+    n_clusters : int
+        Number of clusters (including clusters 0 and 1) in the .clu file.
+    clusters : np.array of int
+        Cluster label of each spike.
+    samples : np.array of int
+        Sample number of each spike.
+    """
+    filename, ele = electrode
+    # np.fromfile in text mode parses the whitespace-separated integers in C
+    clu = np.fromfile('{}.clu.{}'.format(filename, ele), dtype=np.int64, sep=' ')
+    res = np.fromfile('{}.res.{}'.format(filename, ele), dtype=np.int64, sep=' ')
+    if clu.size == 0:
+        raise ValueError("empty .clu file for electrode {}".format(ele))
+    n_clusters, clusters = int(clu[0]), clu[1:]
+    if clusters.size != res.size:
+        raise ValueError("number of spikes in .clu and .res files for "
+                         "electrode {} do not match ({} vs {})".format(
+                             ele, clusters.size, res.size))
+    return n_clusters, clusters, res
+
+def _get_hc3_cache_key(files, fs, includeUnsortedSpikes):
+    """Hash of file names, sizes and modification times, and load options."""
+    h = hashlib.sha1()
+    for ff in files:
+        stat = os.stat(ff)
+        h.update('{}|{}|{}\n'.format(os.path.basename(ff), stat.st_size,
+                                     stat.st_mtime_ns).encode())
+    h.update('fs={}|unsorted={}'.format(fs, bool(includeUnsortedSpikes)).encode())
+    return h.hexdigest()
+
+def load_hc3_spikes(fileroot, animal='gor01', year=2006, month=6, day=7,
+                    sessiontime='11-26-53', track=None, fs=32552,
+                    includeUnsortedSpikes=False, n_workers=None, cache=False,
+                    verbose=False):
+    """Load the spikes of all electrodes of an hc3 session into a
+    SpikeTrainArray.
+
+    Electrode .clu and .res files are parsed in parallel, and the spikes of
+    all electrodes are split into units with a single sort, instead of one
+    boolean mask (and sort) per unit.
+
+    Cluster 0 (mechanical noise) is always discarded. Cluster 1 (unsortable
+    spikes) of all electrodes is pooled into unit 0 if includeUnsortedSpikes
+    is True, and discarded otherwise. The remaining clusters become units
+    1, 2, ... in order of electrode and cluster number, exactly as in
+    load_hc3_data(datatype='spikes').
+
+    Parameters
+    ----------
+    fileroot : string
+        Root directory of the hc3 dataset.
+    animal, year, month, day, sessiontime, track : optional
+        Session identifiers; see load_hc3_data.
+    fs : float, optional
+        Sampling rate (Hz) of the .res sample numbers. Default is 32552.
+    includeUnsortedSpikes : bool, optional
+        Whether or not to include unsortable spikes as unit 0. Default is
+        False.
+    n_workers : int, optional
+        Number of processes used to parse the electrode files. Default is
+        the number of CPUs (but no more than the number of electrodes). Use
+        n_workers=1 to parse the files in the current process.
+    cache : bool or string, optional
+        If True, the parsed spike times are stored in a binary (.npz) file in
+        the session directory, and re-used as long as none of the .clu or
+        .res files have been modified. If a string, the cache file is stored
+        in that directory instead. Default is False.
+    verbose : bool, optional
+
+    Returns
+    -------
+    spikes : SpikeTrainArray
+    """
+    sessiondir, session_prefix = _get_session_dir(fileroot, animal=animal,
+        year=year, month=month, day=day, sessiontime=sessiontime, track=track)
+    filename = "{}/{}".format(sessiondir, session_prefix)
 
-    if (datatype=='spikes'):
-        # NOTE: st_array[0] always corresponds to unsortable spikes (not mechanical noise). However, when includeUnsortedSpikes==True, then it gets populated
-        #       with spike times; else, it just remains an empty list []
-
-        #filename = "{}/{}/{}/{}.clu.1".format(fileroot, anim_prefix, session_prefix, session_prefix)
-        filename = "{}/{}".format(sessiondir, session_prefix)
-        #print(filename)
-        if verbose:
-            print("Loading data for session in directory '{}'...".format(sessiondir))
-        num_elec = get_num_electrodes(sessiondir, verbose=verbose)
-        if verbose:
-            print('Number of electrode (.clu) files found:', num_elec)
-        if includeUnsortedSpikes:
-            st_array = [[]]
-        else:
-            st_array = []
-        # note: using pandas.read_table is orders of magnitude faster here than using numpy.loadtxt
-        for ele in np.arange(num_elec):
-            #%time dt1a = np.loadtxt( base_filename1 + '.clu.' + str(ele + 1), skiprows=1,dtype=int)
-            eudf = pd.read_table( filename + '.clu.' + str(ele + 1), header=None, names='u' ) # read unit numbers within electrode
-            tsdf = pd.read_table( filename + '.res.' + str(ele + 1), header=None, names='t' ) # read sample numbers for spikes
-            max_units = eudf.u.values[0]
-
-            eu = eudf.u.values[1:]
-            ts = tsdf.t.values
-            # discard units labeled as '0' or '1', as these correspond to mechanical noise and unsortable units
-            ts = ts[eu!=0]  # always discard mechanical noise
-            eu = eu[eu!=0]  # always discard mechanical noise
+    if verbose:
+        print("Loading data for session in directory '{}'...".format(sessiondir))
+    num_elec = get_num_electrodes(sessiondir, verbose=verbose)
+    if verbose:
+        print('Number of electrode (.clu) files found:', num_elec)
 
-            if not includeUnsortedSpikes:
-                ts = ts[eu!=1]  # potentially discard unsortable spikes
-                eu = eu[eu!=1]  # potentially discard unsortable spikes
+    electrodes = [(filename, ele + 1) for ele in range(num_elec)]
 
-            for uu in np.arange(max_units-2):
-                st_array.append(ts[eu==uu+2])
+    cachefile = None
+    if cache:
+        cachedir = sessiondir if cache is True else cache
+        cachefile = os.path.join(cachedir, session_prefix + '.hc3spikes.npz')
+        files = ['{}.{}.{}'.format(fn, ext, ele)
+                 for fn, ele in electrodes for ext in ('clu', 'res')]
+        key = _get_hc3_cache_key(files, fs, includeUnsortedSpikes)
+        try:
+            with np.load(cachefile, allow_pickle=False) as cached:
+                if str(cached['key']) == key:
+                    if verbose:
+                        print("Using cached spikes from '{}'".format(cachefile))
+                    return spiketrainarray_from_sorted(cached['times'],
+                                                       cached['counts'],
+                                                       fs=fs,
+                                                       unit_ids=cached['unit_ids'],
+                                                       label=session_prefix)
+        except (OSError, ValueError, KeyError):
+            pass  # no (valid) cache file; parse the electrode files instead
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, num_elec))
+    if n_workers == 1:
+        parsed = [_read_hc3_electrode(ele) for ele in electrodes]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parsed = list(executor.map(_read_hc3_electrode, electrodes))
+
+    # map (electrode, cluster) to a global unit index; clusters 2, 3, ... of
+    # each electrode follow those of the previous electrodes, and cluster 1
+    # maps to unit 0 (when included):
+    n_clusters = np.array([nc for nc, _, _ in parsed])
+    offset = 1 if includeUnsortedSpikes else 0
+    first_unit = offset + np.concatenate(([0], np.cumsum(n_clusters - 2)[:-1]))
+    n_units = offset + int(np.sum(n_clusters - 2))
+
+    clusters = np.concatenate([clu for _, clu, _ in parsed])
+    samples = np.concatenate([res for _, _, res in parsed])
+    lengths = [clu.size for _, clu, _ in parsed]
+    units = clusters - 2 + np.repeat(first_unit, lengths)
+    # cluster ids outside of [0, n_clusters) of their electrode header belong
+    # to no unit, and are dropped, as in load_hc3_data:
+    valid = clusters < np.repeat(n_clusters, lengths)
+    if includeUnsortedSpikes:
+        units[clusters == 1] = 0
+        keep = valid & (clusters > 0)
+    else:
+        keep = valid & (clusters > 1)
+    units, samples = units[keep], samples[keep]
 
-            if includeUnsortedSpikes:
-                st_array[0] = np.append(st_array[0], ts[eu==1])   # unit 0 now corresponds to unsortable spikes
+    # one sort by unit, and by time within units:
+    order = np.lexsort((samples, units))
+    times = samples[order] / fs
+    counts = np.bincount(units, minlength=n_units)
 
-        if verbose:
-            print('Spike times (in sample numbers) for a total of {} units were read successfully...'.format(len(st_array)))
+    if includeUnsortedSpikes:
+        unit_ids = np.arange(n_units)
+    else:
+        unit_ids = np.arange(1, n_units + 1)
 
-        if includeUnsortedSpikes:
-            unit_ids = np.arange(len(st_array))
-        else:
-            unit_ids = np.arange(1, len(st_array)+1)
+    if verbose:
+        print('Spike times (in sample numbers) for a total of {} units were read successfully...'.format(n_units))
 
-        # make sure that spike times are sorted! (this is not true for unit 0 of the hc-3 dataset, for example):
-        for unit, spikes in enumerate(st_array):
-            st_array[unit] = np.sort(spikes)/fs
+    if cachefile is not None:
+        try:
+            np.savez(cachefile, key=key, times=times, counts=counts,
+                     unit_ids=unit_ids)
+        except OSError as e:
+            warnings.warn("could not write hc3 cache file '{}': {}".format(cachefile, e))
 
-        spikes = SpikeTrainArray(st_array, label=session_prefix, fs=fs, unit_ids=unit_ids)
+    return spiketrainarray_from_sorted(times, counts, fs=fs,
+                                       unit_ids=unit_ids, label=session_prefix)
 
-        # spikes = Map()
-        # spikes['data'] = st_array
-        # spikes['num_electrodes'] = num_elec
-        # spikes['num_units'] = len(st_array)
-        # spikes['samprate'] = fs
-        # spikes['session'] = session_prefix
+#datatype = ['spikes', 'eeg', 'pos', '?']
+def load_hc3_data(fileroot, animal='gor01', year=2006, month=6, day=7, sessiontime='11-26-53', track=None, datatype='spikes', channels='all', fs=32552,starttime=0, ctx=None, verbose=False, includeUnsortedSpikes=False):
 
-        return spikes
+    sessiondir, session_prefix = _get_session_dir(fileroot, animal=animal,
+        year=year, month=month, day=day, sessiontime=sessiontime, track=track)
 
-        ## continue from here... we want to keep cells that are inactive in some, but not all environments...
-        # hence when extracting info, we must take all sessions in a recording day into account, and not just a specific recording session
+    if (datatype=='spikes'):
+        return load_hc3_spikes(fileroot, animal=animal, year=year,
+                               month=month, day=day, sessiontime=sessiontime,
+                               track=track, fs=fs, verbose=verbose,
+                               includeUnsortedSpikes=includeUnsortedSpikes,
+                               n_workers=1)
 
     elif (datatype=='eeg'):
         filename = "{}/{}.eeg".format(sessiondir, session_prefix)
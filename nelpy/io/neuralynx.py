@@ -1,10 +1,297 @@
 """Loads data stored in the formats used by the Neuralynx recording systems."""
 # Adapted from nlxio written by Bernard Willards <https://github.com/bwillers/nlxio>
 
+import bisect
+import math
+import os
+
 import numpy as np
 from .. import auxiliary
+from ..core import EpochArray
+from ._common import spiketrainarray_from_labels
+
+# Neuralynx files have a 16kbyte header
+_HEADER_SIZE = 2 ** 14
+
+# The format for .nvt files according the the neuralynx docs is
+# uint16 - beginning of the record
+# uint16 - ID for the system
+# uint16 - size of videorec in bytes
+# uint64 - timestamp in microseconds
+# uint32 x 400 - points with the color bitfield values
+# int16 - unused
+# int32 - extracted X location of target
+# int32 - extracted Y location of target
+# int32 - calculated head angle in degrees clockwise from the positive Y axis
+# int32 x 50 - colored targets using the same bitfield format used to extract colors earlier
+_NVT_DTYPE = np.dtype([('filler1', '<h', 3), ('time', '<Q'), ('points', '<i', 400),
+                       ('filler2', '<h'), ('x', '<i'), ('y', '<i'), ('head_angle', '<i'),
+                       ('targets', '<i', 50)])
+
+# A tetrode spike record is as folows:
+# uint64 - timestamp                    bytes 0:8
+# uint32 - acquisition entity number    bytes 8:12
+# uint32 - classified cell number       bytes 12:16
+# 8 * uint32- params                    bytes 16:48
+# 32 * 4 * int16 - waveform points
+# hence total record size is 2432 bits, 304 bytes
+# Neuralynx writes little endian for some reason
+_NTT_DTYPE = np.dtype([('spiketimes', '<Q'), ('acq', '<i'), ('cellnums', '<i'), ('params', '<i', 8),
+                       ('waveforms', np.dtype('<h'), (32, 4))])
+
+def _read_header(filename):
+    """Return the (null-stripped) 16 kbyte header of a Neuralynx file."""
+    with open(filename, 'rb') as f:
+        return f.read(_HEADER_SIZE).strip(b'\x00')
+
+def _parse_ntt_header(header, filename):
+    """Return the ADBitVolts conversion factor and sampling frequency."""
+    analog_to_digital = None
+    fs = None
+
+    for line in header.split(b'\n'):
+        if line.strip().startswith(b'-ADBitVolts'):
+            analog_to_digital = np.array(float(line.split(b' ')[1].decode()))
+        if line.strip().startswith(b'-SamplingFrequency'):
+            fs = float(line.split(b' ')[1].decode())
+
+    if analog_to_digital is None:
+        raise IOError("ADBitVolts not found in .ntt header for " + filename)
+    if fs is None:
+        raise IOError("Frequency not found in .ntt header for " + filename)
+    return analog_to_digital, fs
+
+def _memmap_records(filename, dtype):
+    """Memory-map the records of a Neuralynx file (read-only).
+
+    Nothing but the file size is read, so that this is instantaneous even
+    for very large files. A trailing partial record is ignored.
+    """
+    n_records = (os.path.getsize(filename) - _HEADER_SIZE) // dtype.itemsize
+    if n_records <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode='r', offset=_HEADER_SIZE,
+                     shape=(n_records,))
+
+def _record_range(timestamps, start=None, stop=None):
+    """Return the slice of records with start <= time < stop.
+
+    Parameters
+    ----------
+    timestamps : np.array of uint64
+        Sorted timestamps (in microseconds), typically a field of a memmap.
+    start, stop : float, optional
+        Time range (in seconds).
+
+    Notes
+    -----
+    The binary search only touches O(log n_records) timestamps. Note that
+    np.searchsorted cannot be used here, since it would first copy the
+    (non-contiguous) timestamp column of the entire file.
+    """
+    lo, hi = 0, len(timestamps)
+    if start is not None:
+        lo = bisect.bisect_left(timestamps, np.uint64(max(0, math.ceil(start*1e6))))
+    if stop is not None:
+        hi = bisect.bisect_left(timestamps, np.uint64(max(0, math.ceil(stop*1e6))), lo)
+    return slice(lo, max(lo, hi))
+
+def memmap_ntt(filename):
+    """Memory-map a neuralynx .ntt tetrode spike file.
+
+    Parameters
+    ----------
+    filename: str
 
-def load_position(filename, pixels_per_cm=None):
+    Returns
+    -------
+    records: np.memmap
+        Structured array of spike records, with fields 'spiketimes' (in
+        microseconds), 'acq', 'cellnums', 'params' and 'waveforms' (in
+        integer units).
+    fs: float
+        Sampling frequency (Hz)
+    analog_to_digital: float
+        Conversion factor from integer to microVolt units
+    """
+    header = _read_header(filename)
+    analog_to_digital, fs = _parse_ntt_header(header, filename)
+    return _memmap_records(filename, _NTT_DTYPE), fs, analog_to_digital
+
+def read_ntt(filename, *, fields=None, start=None, stop=None, should_d2a=True):
+    """Reads selected fields of a neuralynx .ntt tetrode spike file,
+    optionally restricted to a time range.
+
+    Only the requested fields of the records within [start, stop) are read
+    from disk; in particular, waveforms are not read unless requested.
+
+    Parameters
+    ----------
+    filename: str
+    fields: list of str, optional
+        Any of 'spiketimes', 'acq', 'cellnums', 'params' and 'waveforms'.
+        Default is ['spiketimes', 'cellnums'].
+    start, stop: float, optional
+        Time range (in seconds). Records are assumed to be sorted by time.
+    should_d2a: convert waveforms from integer to microVolt units (default True)
+
+    Returns
+    -------
+    ntt_data: dict
+        With the requested fields as keys, and 'fs'. Spike times are in
+        seconds.
+
+    Usage:
+    ntt_data = read_ntt('TT13.ntt', start=100, stop=200)
+    """
+    if fields is None:
+        fields = ['spiketimes', 'cellnums']
+    unknown = set(fields) - set(_NTT_DTYPE.names)
+    if unknown:
+        raise ValueError("unknown .ntt field(s): {}".format(sorted(unknown)))
+
+    records, fs, analog_to_digital = memmap_ntt(filename)
+    records = records[_record_range(records['spiketimes'], start, stop)]
+
+    ntt_data = dict()
+    for field in fields:
+        if field == 'spiketimes':
+            ntt_data[field] = records[field] / 1e6
+        elif field == 'waveforms' and should_d2a:
+            ntt_data[field] = records[field] * analog_to_digital
+        else:
+            ntt_data[field] = np.array(records[field])
+    ntt_data['fs'] = fs
+    return ntt_data
+
+def iter_ntt_waveforms(filename, *, start=None, stop=None, chunksize=10000,
+                       should_d2a=True):
+    """Streams the spike waveforms of a neuralynx .ntt file in chunks.
+
+    Parameters
+    ----------
+    filename: str
+    start, stop: float, optional
+        Time range (in seconds).
+    chunksize: int, optional
+        Number of spikes per chunk (default 10000).
+    should_d2a: convert from integer to microVolt units (default True)
+
+    Yields
+    ------
+    spiketimes: np.array
+        Spike times as floats (seconds)
+    waveforms: np.array
+        Spike waveforms as (chunksize, length_waveform, num_channels)
+    """
+    records, _, analog_to_digital = memmap_ntt(filename)
+    sl = _record_range(records['spiketimes'], start, stop)
+    for frm in range(sl.start, sl.stop, chunksize):
+        chunk = records[frm:min(frm + chunksize, sl.stop)]
+        waveforms = chunk['waveforms']
+        if should_d2a:
+            waveforms = waveforms * analog_to_digital
+        else:
+            waveforms = np.array(waveforms)
+        yield chunk['spiketimes'] / 1e6, waveforms
+
+def load_ntt_spikes(filename, *, start=None, stop=None, unit_ids=None,
+                    label=None):
+    """Loads the sorted spikes of a neuralynx .ntt file as a SpikeTrainArray,
+    without reading any waveforms.
+
+    Parameters
+    ----------
+    filename: str
+    start, stop: float, optional
+        Time range (in seconds). If both are given, they also define the
+        support of the SpikeTrainArray.
+    unit_ids: list of int, optional
+        Cell numbers to include, in order. Default is all cell numbers
+        present (including 0, i.e., unclassified spikes), in increasing
+        order.
+    label: str, optional
+        Label of the SpikeTrainArray. Default is filename.
+
+    Returns
+    -------
+    spikes: nelpy.SpikeTrainArray
+    """
+    ntt_data = read_ntt(filename, fields=['spiketimes', 'cellnums'],
+                        start=start, stop=stop)
+    support = None
+    if start is not None and stop is not None:
+        support = EpochArray([start, stop])
+    if label is None:
+        label = os.path.basename(filename)
+    return spiketrainarray_from_labels(ntt_data['spiketimes'],
+                                       ntt_data['cellnums'],
+                                       fs=ntt_data['fs'],
+                                       unit_ids=unit_ids,
+                                       label=label,
+                                       support=support)
+
+def memmap_nvt(filename):
+    """Memory-map a neuralynx .nvt file.
+
+    Parameters
+    ----------
+    filename: str
+
+    Returns
+    -------
+    records: np.memmap
+        Structured array of video records, with fields 'time' (in
+        microseconds), 'points', 'x', 'y', 'head_angle' and 'targets'.
+    """
+    return _memmap_records(filename, _NVT_DTYPE)
+
+def read_nvt(filename, *, fields=None, start=None, stop=None):
+    """Reads selected fields of a neuralynx .nvt file, optionally restricted
+    to a time range.
+
+    Records in which the target was not detected (x == y == 0) are dropped,
+    as in load_nvt.
+
+    Parameters
+    ----------
+    filename: str
+    fields: list of str, optional
+        Any of 'time', 'x', 'y', 'head_angle' and 'targets'. Default is
+        ['time', 'x', 'y'].
+    start, stop: float, optional
+        Time range (in seconds). Records are assumed to be sorted by time.
+
+    Returns
+    -------
+    nvt_data: dict
+        With the requested fields as keys. Time is in seconds.
+    """
+    if fields is None:
+        fields = ['time', 'x', 'y']
+    unknown = set(fields) - {'time', 'x', 'y', 'head_angle', 'targets'}
+    if unknown:
+        raise ValueError("unknown .nvt field(s): {}".format(sorted(unknown)))
+
+    records = memmap_nvt(filename)
+    records = records[_record_range(records['time'], start, stop)]
+    x = np.array(records['x'])
+    y = np.array(records['y'])
+    keep = ~((x == 0) & (y == 0))
+
+    nvt_data = dict()
+    for field in fields:
+        if field == 'time':
+            nvt_data[field] = records['time'][keep] * 1e-6
+        elif field == 'x':
+            nvt_data[field] = np.array(x[keep], dtype=float)
+        elif field == 'y':
+            nvt_data[field] = np.array(y[keep], dtype=float)
+        else:
+            nvt_data[field] = np.array(records[field][keep], dtype=float)
+    return nvt_data
+
+def load_position(filename, pixels_per_cm=None, *, start=None, stop=None):
     """Loads videotracking position as a nelpy PositionArray
 
     Parameters
@@ -12,6 +299,8 @@ def load_position(filename, pixels_per_cm=None):
     filename: str
     pixel_per_cm: tuple
         With (x, y) conversion factors
+    start, stop: float, optional
+        Time range (in seconds) to load.
     Returns
     -------
     position: nelpy.PositionArray
@@ -20,7 +309,7 @@ def load_position(filename, pixels_per_cm=None):
     if not pixels_per_cm:
         pixels_per_cm = (1,1)
 
-    nvt_data = load_nvt(filename)
+    nvt_data = read_nvt(filename, fields=['time', 'x', 'y'], start=start, stop=stop)
 
     xydata = np.vstack((nvt_data['x'] / pixels_per_cm[0], nvt_data['y'] / pixels_per_cm[1]))
     timestamps = nvt_data['time']
@@ -40,24 +329,8 @@ def load_nvt(filename):
     """
     with open(filename, 'rb') as f:
 
-        # Neuralynx files have a 16kbyte header
-        header = f.read(2 ** 14).strip(b'\x00')
-
-        # The format for .nvt files according the the neuralynx docs is
-        # uint16 - beginning of the record
-        # uint16 - ID for the system
-        # uint16 - size of videorec in bytes
-        # uint64 - timestamp in microseconds
-        # uint32 x 400 - points with the color bitfield values
-        # int16 - unused
-        # int32 - extracted X location of target
-        # int32 - extracted Y location of target
-        # int32 - calculated head angle in degrees clockwise from the positive Y axis
-        # int32 x 50 - colored targets using the same bitfield format used to extract colors earlier
-        dt = np.dtype([('filler1', '<h', 3), ('time', '<Q'), ('points', '<i', 400),
-                    ('filler2', '<h'), ('x', '<i'), ('y', '<i'), ('head_angle', '<i'),
-                    ('targets', '<i', 50)])
-        data = np.fromfile(f, dt)
+        header = f.read(_HEADER_SIZE).strip(b'\x00')
+        data = np.fromfile(f, _NVT_DTYPE)
 
     nvt_data = dict()
     nvt_data['time'] = data['time'] * 1e-6
@@ -96,36 +369,12 @@ def load_ntt(filename, should_d2a=True):
 
     with open(filename, 'rb') as f:
 
-        # A tetrode spike record is as folows:
-        # uint64 - timestamp                    bytes 0:8
-        # uint32 - acquisition entity number    bytes 8:12
-        # uint32 - classified cell number       bytes 12:16
-        # 8 * uint32- params                    bytes 16:48
-        # 32 * 4 * int16 - waveform points
-        # hence total record size is 2432 bits, 304 bytes
-
-        # header is 16kbyte, i.e. 16 * 2^10 = 2^14
-        header = f.read(2 ** 14).strip(b'\x00')
+        header = f.read(_HEADER_SIZE).strip(b'\x00')
 
         # Read the header and find the conversion factors / sampling frequency
-        analog_to_digital = None
-        fs = None
-
-        for line in header.split(b'\n'):
-            if line.strip().startswith(b'-ADBitVolts'):
-                analog_to_digital = np.array(float(line.split(b' ')[1].decode()))
-            if line.strip().startswith(b'-SamplingFrequency'):
-                fs = float(line.split(b' ')[1].decode())
-
-        f.seek(2 ** 14)  # start of the spike, records
-        # Neuralynx writes little endian for some reason
-        dt = np.dtype([('spiketimes', '<Q'), ('acq', '<i', 1), ('cellnums', '<i', 1), ('params', '<i', 8),
-                    ('waveforms', np.dtype('<h'), (32, 4))])
-        data = np.fromfile(f, dt)
-
-        if analog_to_digital is None:
-            raise IOError("ADBitVolts not found in .ntt header for " + filename)
-        if fs is None:
-            raise IOError("Frequency not found in .ntt header for " + filename)
+        analog_to_digital, fs = _parse_ntt_header(header, filename)
+
+        f.seek(_HEADER_SIZE)  # start of the spike, records
+        data = np.fromfile(f, _NTT_DTYPE)
 
     return data['spiketimes'] / 1e6, data['waveforms'] * analog_to_digital, fs, data['cellnums']
\ No newline at end of file
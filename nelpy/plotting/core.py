@@ -354,17 +354,33 @@ def imagesc(x=None, y=None, data=None, *, ax=None, large=False, **kwargs):
     return ax, image
 
 def plot(obj, *args, **kwargs):
-    """Docstring goes here."""
+    """Plot an AnalogSignalArray (or pass anything else on to ax.plot).
+
+    Parameters
+    ----------
+    obj : nelpy.AnalogSignalArray, or array-like
+    ax : axis object, optional
+        Plot in given axis. If None, plots on current axes
+    lod : bool, optional
+        If True, use level-of-detail rendering: only the min/max envelope
+        of the visible part of each signal is drawn, at the resolution of
+        the axes, and it is updated on zoom / pan. This keeps interactive
+        browsing of session-length signals responsive. Default is False.
+    kwargs :
+        Other keyword arguments are passed to ax.plot()
+    """
 
     ax = kwargs.pop('ax', None)
     if ax is None:
         ax = plt.gca()
+    lod = kwargs.pop('lod', False)
 
     if(isinstance(obj, AnalogSignalArray)):
+        plotfunc = utils.LODLines(ax).plot if lod else ax.plot
         if obj.n_signals == 1:
             label = kwargs.pop('label', None)
             for ii, (timestamps, data) in enumerate(zip(obj._epochtime.plot_generator(), obj._epochdata.plot_generator())):
-                ax.plot(timestamps, data.T, label=label if ii == 0 else '_nolegend_', *args, **kwargs)
+                plotfunc(timestamps, data.T, label=label if ii == 0 else '_nolegend_', *args, **kwargs)
         elif obj.n_signals > 1:
             # TODO: intercept when any color is requested. This could happen
             # multiple ways, such as plt.plot(x, '-r') or plt.plot(x, c='0.7')
@@ -395,14 +411,14 @@ def plot(obj, *args, **kwargs):
                     if ee > 0:
                         kwargs['label'] = '_nolegend_'
                     for ii, snippet in enumerate(data):
-                        ax.plot(timestamps, snippet, *args, color=colors[ii], **kwargs)
+                        plotfunc(timestamps, snippet, *args, color=colors[ii], **kwargs)
             else:
                 kwargs['color'] = color
                 for ee, (timestamps, data) in enumerate(zip(obj._epochtime.plot_generator(), obj._epochdata.plot_generator())):
                     if ee > 0:
                         kwargs['label'] = '_nolegend_'
                     for ii, snippet in enumerate(data):
-                        ax.plot(timestamps, snippet, *args, **kwargs)
+                        plotfunc(timestamps, snippet, *args, **kwargs)
 
     else: # if we didn't handle it yet, just pass it through to matplotlib...
         ax.plot(obj, *args, **kwargs)
@@ -658,7 +674,8 @@ def occupancy():
     """Docstring goes here. TODO: complete me."""
     raise NotImplementedError("occupancy() not implemented yet")
 
-def overviewstrip(epochs, *, ax=None, lw=5, solid_capstyle='butt', label=None):
+def overviewstrip(epochs, *, ax=None, lw=5, solid_capstyle='butt', label=None,
+                  color=None):
     """Plot an epoch array similar to vscode scrollbar, to show gaps in e.g.
     matshow plots. TODO: complete me.
 
@@ -673,8 +690,12 @@ def overviewstrip(epochs, *, ax=None, lw=5, solid_capstyle='butt', label=None):
     divider = make_axes_locatable(ax)
     ax_ = divider.append_axes("top", size=0.2, pad=0.05)
 
-    for epoch in epochs:
-        ax_.plot([epoch.start, epoch.stop], [1,1], lw=lw, solid_capstyle=solid_capstyle)
+    if color is None:
+        color = 'C0'
+    ax_.add_collection(
+        utils.EpochLineCollection(epochs.starts, epochs.stops, 1, lw=lw,
+                                  capstyle=solid_capstyle, color=color))
+    ax_.autoscale_view()
 
     if label is not None:
         ax_.set_yticks([1])
@@ -719,7 +740,8 @@ def rastercountplot(spiketrain, nbins=50, **kwargs):
     return ax1, ax2
 
 def rasterplot(data, *, cmap=None, color=None, ax=None, lw=None, lh=None,
-           vertstack=None, labels=None, cmap_lo=0.25, cmap_hi=0.75, **kwargs):
+           vertstack=None, labels=None, cmap_lo=0.25, cmap_hi=0.75, lod=False,
+           **kwargs):
     """Make a raster plot from a SpikeTrainArray object.
 
     Parameters
@@ -741,8 +763,15 @@ def rasterplot(data, *, cmap=None, color=None, ax=None, lw=None, lh=None,
         If not specified, default is to use the unit_labels from the
         SpikeTrainArray input. See SpikeTrainArray docstring for
         default behavior of unit_labels
+    lod : bool, optional
+        If True, use level-of-detail rendering: all units are drawn as a
+        single collection that only holds the visible spikes, and when
+        these cannot be resolved at the resolution of the axes, one tick
+        per occupied sub-pixel time bin instead. It is updated on zoom /
+        pan. Default is False.
     kwargs :
-        Other keyword arguments are passed to main vlines() call
+        Other keyword arguments are passed to main vlines() call (or to
+        the LineCollection, if lod is True)
 
     Returns
     -------
@@ -842,7 +871,12 @@ def rasterplot(data, *, cmap=None, color=None, ax=None, lw=None, lh=None,
 
         yrange = (minunit - 0.5, maxunit + 0.5)
 
-        if cmap is not None:
+        if lod:
+            if cmap is not None:
+                color = cmap(np.linspace(cmap_lo, cmap_hi, data.n_units))
+            utils.LODRaster(ax, data.time, unitlist, color, lh=lh,
+                            fs=data.fs, lw=lw, **kwargs)
+        elif cmap is not None:
             color_range = range(data.n_units)
             # TODO: if we go from 0 then most colormaps are invisible at one end of the spectrum
             colors = cmap(np.linspace(cmap_lo, cmap_hi, data.n_units))
@@ -875,7 +909,11 @@ def rasterplot(data, *, cmap=None, color=None, ax=None, lw=None, lh=None,
 
 def epochplot(epochs, data=None, *, ax=None, height=None, fc='0.5', ec='0.5',
                       alpha=0.5, hatch='////', label=None, hc=None,**kwargs):
-    """Docstring goes here.
+    """Shade the epochs of an EpochArray (or plot a value per epoch).
+
+    All epochs are drawn as a single EpochCollection, in which epochs that
+    are separated by less than a pixel are merged at render time, so that
+    even tens of thousands of epochs draw (and save) quickly.
     """
     if ax is None:
         ax = plt.gca()
@@ -907,20 +945,22 @@ def epochplot(epochs, data=None, *, ax=None, height=None, fc='0.5', ec='0.5',
         except KeyError:
             warnings.warn("Hatch color not supported for matplotlib <2.0")
 
-    for ii, (start, stop) in enumerate(zip(epochs.starts, epochs.stops)):
-        ax.add_patch(
-            patches.Rectangle(
-                (start, ymin),   # (x,y)
-                width=stop - start ,          # width
-                height=height,          # height
-                hatch=hatch,
-                facecolor=fc,
-                edgecolor=ec,
-                alpha=alpha,
-                label=label if ii == 0 else "_nolegend_",
-                **kwargs
-            )
+    # a single artist for all epochs; epochs separated by less than a pixel
+    # are merged when drawn
+    ax.add_collection(
+        utils.EpochCollection(
+            epochs.starts,
+            epochs.stops,
+            ymin,
+            ymin + height,
+            hatch=hatch,
+            facecolor=fc,
+            edgecolor=ec,
+            alpha=alpha,
+            label=label,
+            **kwargs
         )
+    )
 
     if epochs.start < xmin:
         xmin = epochs.start
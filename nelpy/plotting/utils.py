@@ -28,6 +28,7 @@ from matplotlib import colors as mplcolors
 from matplotlib import cbook
 import matplotlib.gridspec as gridspec
 from matplotlib.image import AxesImage
+from matplotlib.collections import LineCollection, PolyCollection
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import matplotlib.pyplot as plt
 import colorsys
@@ -1048,3 +1049,311 @@ def imshow(axes, X, cmap=None, norm=None, aspect=None,
     return im
 
 
+
+class _MinMaxPyramid(object):
+    """Min/max envelopes of a sampled signal, at successive factors of two.
+
+    Level k holds, for every block of 2**k consecutive samples, the time
+    of the first sample in the block, and the min and max of the signal
+    over the block. Together, all levels take up about twice the memory
+    of the signal itself.
+    """
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if len(x) != len(y):
+            raise ValueError("x and y must have the same number of elements!")
+        self.levels = [(x, y, y)]
+        while len(x) > 2:
+            _, ymin, ymax = self.levels[-1]
+            if len(x) % 2:
+                # repeat the last sample, so that blocks can be paired up
+                ymin, ymax = np.append(ymin, ymin[-1]), np.append(ymax, ymax[-1])
+            x = x[::2]
+            # fmin/fmax ignore NaNs, unless the entire block is NaN
+            self.levels.append((x, np.fmin(ymin[::2], ymin[1::2]),
+                                   np.fmax(ymax[::2], ymax[1::2])))
+
+    def get(self, xmin, xmax, n_pixels):
+        """Return the (x, y) vertices to draw in [xmin, xmax], at the
+        coarsest level with at least one block per pixel."""
+        x = self.levels[0][0]
+        i0, i1 = np.searchsorted(x, [xmin, xmax])
+        n_visible = i1 - i0
+        level = 0
+        if n_visible > 2*n_pixels:
+            level = int(np.log2(n_visible / max(n_pixels, 1)))
+            level = min(level, len(self.levels) - 1)
+        x, ymin, ymax = self.levels[level]
+        # include one block on either side, so that lines reach the edges
+        i0 = max(0, (i0 >> level) - 1)
+        i1 = min(len(x), (i1 >> level) + 2)
+        if level == 0:
+            return x[i0:i1], ymin[i0:i1]
+        return (np.repeat(x[i0:i1], 2),
+                np.column_stack((ymin[i0:i1], ymax[i0:i1])).ravel())
+
+class _SpikePyramid(object):
+    """Occupied time bins of a spike train, at successive factors of two.
+
+    Level k holds the sorted, unique indices of all bins of width
+    dt*2**k (aligned to t0) that contain at least one spike. Drawing one
+    tick per occupied bin that is narrower than a pixel is visually
+    identical to drawing every spike, but costs at most one tick per
+    pixel column. Levels are computed when first needed, and cached.
+    """
+    def __init__(self, times, t0, dt):
+        self.times = np.asarray(times, dtype=float).ravel()
+        self.t0 = t0
+        self.dt = dt
+        self.levels = {}
+
+    def level(self, level):
+        """Sorted unique indices of the occupied bins of width dt*2**level."""
+        if level not in self.levels:
+            idx = np.floor((self.times - self.t0) / (self.dt * 2**level))
+            idx = idx.astype(np.int64)
+            if len(idx):
+                idx = idx[np.r_[True, idx[1:] != idx[:-1]]]
+            self.levels[level] = idx
+        return self.levels[level]
+
+    def get(self, xmin, xmax, level):
+        """Return the tick positions to draw in [xmin, xmax]."""
+        if level < 0:
+            i0, i1 = np.searchsorted(self.times, [xmin, xmax])
+            return self.times[i0:i1]
+        width = self.dt * 2**level
+        idx = self.level(level)
+        i0, i1 = np.searchsorted(idx, [np.floor((xmin - self.t0) / width),
+                                       np.ceil((xmax - self.t0) / width)])
+        return self.t0 + (idx[i0:i1] + 0.5) * width
+
+    def count(self, xmin, xmax):
+        """Number of spikes in [xmin, xmax]."""
+        i0, i1 = np.searchsorted(self.times, [xmin, xmax])
+        return i1 - i0
+
+class LODLines(object):
+    """Level-of-detail rendering of long signals.
+
+    Each line only holds the min/max envelope of the part of its signal
+    that is visible, at (about) the resolution of the axes, and is
+    updated whenever the x-limits of the axes change (zoom / pan).
+    """
+    def __init__(self, ax):
+        self.ax = ax
+        self.lines = []
+        ax.callbacks.connect('xlim_changed', self.update)
+
+    def plot(self, x, y, *args, **kwargs):
+        """Like ax.plot(x, y, ...), but with level-of-detail rendering.
+
+        Returns
+        -------
+        lines : list of Line2D
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if y.ndim == 1:
+            y = y[:, np.newaxis]
+        if len(x) == 0:
+            return self.ax.plot(x, y, *args, **kwargs)
+        pyramids = [_MinMaxPyramid(x, col) for col in y.T]
+        n_pixels = self._n_pixels()
+        lines = []
+        for pyramid in pyramids:
+            line, = self.ax.plot(*pyramid.get(x[0], x[-1], n_pixels),
+                                 *args, **kwargs)
+            lines.append(line)
+        for line, pyramid in zip(lines, pyramids):
+            # the axes callback registry only holds a weak reference to us
+            line._lod = self
+            self.lines.append((line, pyramid))
+        return lines
+
+    def _n_pixels(self):
+        return max(int(self.ax.bbox.width), 1)
+
+    def update(self, ax=None):
+        xmin, xmax = sorted(self.ax.get_xlim())
+        n_pixels = self._n_pixels()
+        for line, pyramid in self.lines:
+            line.set_data(*pyramid.get(xmin, xmax, n_pixels))
+
+class LODRaster(object):
+    """Level-of-detail rendering of spike rasters.
+
+    All units are drawn as a single LineCollection, which only holds the
+    ticks that are visible. When there are more spikes in view than can
+    be resolved, spikes are replaced by the occupied time bins (narrower
+    than a pixel) of a precomputed pyramid. The collection is updated
+    whenever the x-limits of the axes change (zoom / pan).
+
+    Parameters
+    ----------
+    ax : matplotlib axis
+    spiketrains : list of array-like
+        Sorted spike times of each unit.
+    positions : array-like
+        Vertical position of each unit.
+    colors : matplotlib color, or list of colors (one per unit)
+    lh : float, optional
+        Line height, default value of 0.95
+    dt : float, optional
+        Bin width of the finest level of the pyramid. Default is 1/fs if
+        fs is given, and 1 ms otherwise.
+    fs : float, optional
+        Sampling rate of the spike times.
+    kwargs :
+        Other keyword arguments are passed to the LineCollection.
+    """
+    def __init__(self, ax, spiketrains, positions, colors, *, lh=0.95,
+                 dt=None, fs=None, **kwargs):
+        self.ax = ax
+        self.positions = np.asarray(positions, dtype=float)
+        self.colors = mplcolors.to_rgba_array(colors)
+        if len(self.colors) == 1:
+            self.colors = np.repeat(self.colors, len(self.positions), axis=0)
+        self.hh = lh/2.0
+        if dt is None:
+            dt = 1/fs if fs else 0.001
+
+        spiketrains = [np.asarray(st, dtype=float).ravel() for st in spiketrains]
+        nonempty = [st for st in spiketrains if len(st)]
+        t0 = min(st[0] for st in nonempty) if nonempty else 0
+        t1 = max(st[-1] for st in nonempty) if nonempty else 0
+        self.n_levels = int(np.ceil(np.log2(max((t1 - t0) / dt, 1)))) + 1
+        self.dt = dt
+        self.pyramids = [_SpikePyramid(st, t0, dt) for st in spiketrains]
+
+        self.collection = LineCollection(self._segments(t0, t1)[0], **kwargs)
+        self.collection._lod = self
+        self._update_collection(t0, t1)
+        ax.add_collection(self.collection)
+        ax.autoscale_view()
+        ax.callbacks.connect('xlim_changed', self.update)
+
+    def _level(self, xmin, xmax):
+        """Pyramid level to draw in [xmin, xmax]; -1 for all spikes."""
+        n_pixels = max(int(self.ax.bbox.width), 1)
+        n_visible = sum(pyramid.count(xmin, xmax) for pyramid in self.pyramids)
+        if n_visible <= 2*n_pixels:
+            return -1
+        pixel_width = (xmax - xmin) / n_pixels
+        return int(np.clip(np.floor(np.log2(pixel_width / self.dt)),
+                           -1, self.n_levels - 1))
+
+    def _segments(self, xmin, xmax):
+        if not self.pyramids:
+            return np.zeros((0, 2, 2)), np.zeros(0, dtype=int)
+        level = self._level(xmin, xmax)
+        ticks = [pyramid.get(xmin, xmax, level) for pyramid in self.pyramids]
+        counts = np.array([len(tt) for tt in ticks], dtype=int)
+        x = np.concatenate(ticks)
+        y = np.repeat(self.positions, counts)
+        segments = np.empty((len(x), 2, 2))
+        segments[:, :, 0] = x[:, np.newaxis]
+        segments[:, 0, 1] = y - self.hh
+        segments[:, 1, 1] = y + self.hh
+        return segments, counts
+
+    def _update_collection(self, xmin, xmax):
+        segments, counts = self._segments(xmin, xmax)
+        self.collection.set_segments(segments)
+        self.collection.set_color(np.repeat(self.colors, counts, axis=0))
+
+    def update(self, ax=None):
+        xmin, xmax = sorted(self.ax.get_xlim())
+        self._update_collection(xmin, xmax)
+
+def _merge_epochs(starts, stops, min_gap=0):
+    """Merge (sorted) epochs that overlap, or that are separated by gaps
+    no larger than min_gap.
+
+    Returns
+    -------
+    starts, stops : np.array
+    """
+    if len(starts) == 0:
+        return starts, stops
+    cumstops = np.maximum.accumulate(stops)
+    firsts = np.flatnonzero(np.r_[True, starts[1:] - cumstops[:-1] > min_gap])
+    return starts[firsts], np.maximum.reduceat(stops, firsts)
+
+class _EpochArtistMixin(object):
+    """Draw only the visible epochs, merging those that are separated by
+    less than a pixel, every time that the collection is drawn."""
+
+    def _set_epochs(self, starts, stops):
+        starts = np.asarray(starts, dtype=float).ravel()
+        stops = np.asarray(stops, dtype=float).ravel()
+        order = np.argsort(starts, kind='mergesort')
+        self._starts = starts[order]
+        self._stops = stops[order]
+        # non-decreasing, so that visible epochs can be found by bisection
+        self._cumstops = np.maximum.accumulate(self._stops)
+        self._update_epochs(self._starts, self._stops)
+
+    def _visible_epochs(self):
+        ax = self.axes
+        xmin, xmax = sorted(ax.get_xlim())
+        pixel_width = (xmax - xmin) / max(ax.bbox.width, 1)
+        i0 = np.searchsorted(self._cumstops, xmin)
+        i1 = np.searchsorted(self._starts, xmax, side='right')
+        return _merge_epochs(self._starts[i0:i1], self._stops[i0:i1],
+                             min_gap=pixel_width)
+
+    def draw(self, renderer, *args, **kwargs):
+        if self.axes is not None:
+            self._update_epochs(*self._visible_epochs())
+        super(_EpochArtistMixin, self).draw(renderer, *args, **kwargs)
+
+class EpochCollection(_EpochArtistMixin, PolyCollection):
+    """All epochs of an EpochArray as rectangles in a single artist.
+
+    Parameters
+    ----------
+    starts, stops : array-like
+        Start and stop times of the epochs.
+    ymin, ymax : float
+        Vertical extent of the rectangles, in data coordinates.
+    kwargs :
+        Other keyword arguments are passed to PolyCollection.
+    """
+    def __init__(self, starts, stops, ymin, ymax, **kwargs):
+        self._ymin, self._ymax = ymin, ymax
+        super(EpochCollection, self).__init__([], **kwargs)
+        self._set_epochs(starts, stops)
+
+    def _update_epochs(self, starts, stops):
+        verts = np.empty((len(starts), 4, 2))
+        verts[:, :2, 0] = starts[:, np.newaxis]
+        verts[:, 2:, 0] = stops[:, np.newaxis]
+        verts[:, [0, 3], 1] = self._ymin
+        verts[:, [1, 2], 1] = self._ymax
+        self.set_verts(verts)
+
+class EpochLineCollection(_EpochArtistMixin, LineCollection):
+    """All epochs of an EpochArray as horizontal lines in a single artist.
+
+    Parameters
+    ----------
+    starts, stops : array-like
+        Start and stop times of the epochs.
+    y : float
+        Vertical position of the lines, in data coordinates.
+    kwargs :
+        Other keyword arguments are passed to LineCollection.
+    """
+    def __init__(self, starts, stops, y, **kwargs):
+        self._y = y
+        super(EpochLineCollection, self).__init__([], **kwargs)
+        self._set_epochs(starts, stops)
+
+    def _update_epochs(self, starts, stops):
+        segments = np.empty((len(starts), 2, 2))
+        segments[:, 0, 0] = starts
+        segments[:, 1, 0] = stops
+        segments[:, :, 1] = self._y
+        self.set_segments(segments)
@@ -1,172 +1,235 @@
-"""Temporary scoring functions. Needs a lot of work. DEPRECATED"""
+"""Sequence order scores of (decoded) state sequences.
+
+All state sequences are concatenated into a single array (together with
+their lengths), so that transition log probabilities are obtained with one
+fancy-indexing operation, logP[s[:-1], s[1:]], and summed per sequence,
+instead of walking each sequence in Python. Time-swap shuffles are drawn
+for all sequences at once, as a 2D (n_shuffles, n_samples) index array.
+"""
+
+__all__ = ['concatenate_sequences',
+           'remove_adjacent_duplicates',
+           'transition_logprob',
+           'shuffled_transition_logprob',
+           'scoreOrderND',
+           'scoreOrderD',
+           'scoreOrderD_time_swap',
+           'scoreOrderNAND',
+           'scoreOrderNA',
+           'score_plen',
+           'score_plenND',
+           'score_SD',
+           'bigscore']
 
 import numpy as np
-from itertools import groupby
+
+def concatenate_sequences(state_sequences, lengths=None):
+    """Concatenate state sequences into a single array.
+
+    Parameters
+    ----------
+    state_sequences : list of array-like, or array-like
+        One state sequence per event, or the already concatenated state
+        sequences (in which case lengths must be specified).
+    lengths : array-like of int, optional
+        Lengths of the concatenated sequences.
+
+    Returns
+    -------
+    states : np.array of int, shape (n_samples,)
+    lengths : np.array of int, shape (n_sequences,)
+    """
+    if lengths is None:
+        sequences = [np.asarray(seq, dtype=int).ravel() for seq in state_sequences]
+        lengths = np.array([len(seq) for seq in sequences], dtype=int)
+        if len(sequences):
+            states = np.concatenate(sequences)
+        else:
+            states = np.array([], dtype=int)
+    else:
+        states = np.asarray(state_sequences, dtype=int).ravel()
+        lengths = np.asarray(lengths, dtype=int).ravel()
+        if lengths.sum() != states.size:
+            raise ValueError("lengths must sum to the number of states")
+    return states, lengths
+
+def _sequence_ids(lengths):
+    """Index of the sequence that each sample belongs to."""
+    return np.repeat(np.arange(len(lengths)), lengths)
+
+def remove_adjacent_duplicates(states, lengths):
+    """Remove adjacent duplicate states within each sequence.
+
+    Parameters
+    ----------
+    states : np.array of int, shape (n_samples,)
+        Concatenated state sequences.
+    lengths : np.array of int, shape (n_sequences,)
+
+    Returns
+    -------
+    states : np.array of int
+    lengths : np.array of int
+    """
+    states = np.asarray(states)
+    lengths = np.asarray(lengths)
+    seqids = _sequence_ids(lengths)
+    keep = np.ones(states.size, dtype=bool)
+    keep[1:] = (states[1:] != states[:-1]) | (seqids[1:] != seqids[:-1])
+    return states[keep], np.bincount(seqids[keep], minlength=len(lengths))
+
+def transition_logprob(logP, states, lengths):
+    """Sum of the transition log probabilities within each sequence.
+
+    Parameters
+    ----------
+    logP : array, shape (n_states, n_states)
+        Log transition probability matrix.
+    states : np.array of int, shape (n_samples,) or (n_shuffles, n_samples)
+        Concatenated state sequences, or a batch thereof.
+    lengths : np.array of int, shape (n_sequences,)
+
+    Returns
+    -------
+    logprob : array, shape (n_sequences,) or (n_shuffles, n_sequences)
+    """
+    states = np.asarray(states)
+    lengths = np.asarray(lengths)
+    n_sequences = len(lengths)
+    seqids = _sequence_ids(lengths)
+    # transitions (i, i+1) that do not cross sequence boundaries:
+    within = seqids[:-1] == seqids[1:]
+    trans_seqids = seqids[:-1][within]
+
+    batch = np.atleast_2d(states)
+    n_batch = batch.shape[0]
+    logp = logP[batch[:, :-1][:, within], batch[:, 1:][:, within]]
+    # segment sums, for all rows of the batch at once:
+    bins = (np.arange(n_batch)[:, np.newaxis] * n_sequences + trans_seqids).ravel()
+    logprob = np.bincount(bins, weights=logp.ravel(),
+                          minlength=n_batch * n_sequences)
+    logprob = logprob.reshape(n_batch, n_sequences)
+    if states.ndim == 1:
+        return logprob[0]
+    return logprob
+
+def shuffled_transition_logprob(logP, states, lengths, n_shuffles=250,
+                                chunksize=None):
+    """Transition log probability sums of time-swapped state sequences.
+
+    The states within each sequence are permuted independently, by sorting
+    uniform random keys offset by the sequence index, so that all
+    permutations are obtained as a single 2D index array.
+
+    Parameters
+    ----------
+    logP : array, shape (n_states, n_states)
+        Log transition probability matrix.
+    states : np.array of int, shape (n_samples,)
+        Concatenated state sequences.
+    lengths : np.array of int, shape (n_sequences,)
+    n_shuffles : int, optional
+        Number of shuffles. Default is 250.
+    chunksize : int, optional
+        Number of shuffles to process at once, to limit memory usage. By
+        default, chunks of roughly 4 million samples are used.
+
+    Returns
+    -------
+    shuffled : array, shape (n_shuffles, n_sequences)
+    """
+    states = np.asarray(states)
+    lengths = np.asarray(lengths)
+    seqids = _sequence_ids(lengths)
+    if chunksize is None:
+        chunksize = max(1, 2**22 // max(states.size, 1))
+
+    shuffled = np.zeros((n_shuffles, len(lengths)))
+    for frm in range(0, n_shuffles, chunksize):
+        to = min(frm + chunksize, n_shuffles)
+        keys = np.random.random_sample((to - frm, states.size)) + seqids
+        perm = np.argsort(keys, axis=1)
+        shuffled[frm:to] = transition_logprob(logP, states[perm], lengths)
+    return shuffled
+
+def _order_scores(hmm, state_sequences, *, no_duplicates, average):
+    """Order scores shared by scoreOrderND, scoreOrderD, scoreOrderNAND and
+    scoreOrderNA."""
+    logP = np.log(hmm.transmat_)
+    states, lengths = concatenate_sequences(state_sequences)
+    if no_duplicates:
+        states, lengths = remove_adjacent_duplicates(states, lengths)
+    scores = transition_logprob(logP, states, lengths)
+    if average:
+        scores = scores - np.log(lengths)
+    return scores
 
 def scoreOrderND(hmm, state_sequences):
     """Compute order score with no adjacent duplicates in state sequences
 
     A score of 0 means there's only one state.
     """
-
-    scoresND = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        logP = np.log(hmm.transmat_)
-        pth = [x[0] for x in groupby(state_sequences[seqid])] # remove adjacent duplicates
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq - np.log(plen)
-        scoresND.append(score)
-
-    return np.array(scoresND)
+    return _order_scores(hmm, state_sequences, no_duplicates=True, average=True)
 
 def scoreOrderD_time_swap(hmm, state_sequences, n_shuffles=250):
-    """Compute order score of state sequences
+    """Compute order score of state sequences, and of time-swapped (shuffled)
+    state sequences.
 
     A score of 0 means there's only one state.
-    """
 
-    scoresD = [] # scores with no adjacent duplicates
-    n_sequences = len(state_sequences)
-    shuffled = np.zeros((n_shuffles, n_sequences))
-
-    for seqid in range(n_sequences):
-        logP = np.log(hmm.transmat_)
-        pth = state_sequences[seqid]
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq - np.log(plen)
-        scoresD.append(score)
-        for nn in range(n_shuffles):
-            logPseq = 0
-            pth = np.random.permutation(pth)
-            for ii in range(plen-1):
-                logPseq += logP[pth[ii],pth[ii+1]]
-            score = logPseq - np.log(plen)
-            shuffled[nn, seqid] = score
-
-    scoresD = np.array(scoresD)
-    return scoresND, shuffled
-
-# def scoreOrderD_trans_mat_shuffle(hmm, state_sequences, n_shuffles=5):
-#     """Compute order score of state sequences
-
-#     A score of 0 means there's only one state.
-#     """
-
-#     scoresND = [] # scores with no adjacent duplicates
-#     shuffles =
-#     for seqid in range(len(state_sequences)):
-#         logP = np.log(hmm.transmat_)
-#         pth = state_sequences[seqid]
-#         plen = len(pth)
-#         logPseq = 0
-#         for ii in range(plen-1):
-#             logPseq += logP[pth[ii],pth[ii+1]]
-#         score = logPseq - np.log(plen)
-#         scoresND.append(score)
-
-#     return np.array(scoresND)
+    Returns
+    -------
+    scoresD : array, shape (n_sequences,)
+    shuffled : array, shape (n_shuffles, n_sequences)
+    """
+    logP = np.log(hmm.transmat_)
+    states, lengths = concatenate_sequences(state_sequences)
+    scoresD = transition_logprob(logP, states, lengths) - np.log(lengths)
+    shuffled = shuffled_transition_logprob(logP, states, lengths,
+                                           n_shuffles=n_shuffles) - np.log(lengths)
+    return scoresD, shuffled
 
 def scoreOrderD(hmm, state_sequences):
     """Compute order score of state sequences
 
     A score of 0 means there's only one state.
     """
-
-    scoresND = [] # scores with no adjacent duplicates
-    for seqid in range(len(state_sequences)):
-        logP = np.log(hmm.transmat_)
-        pth = state_sequences[seqid]
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq - np.log(plen)
-        scoresND.append(score)
-
-    return np.array(scoresND)
+    return _order_scores(hmm, state_sequences, no_duplicates=False, average=True)
 
 def scoreOrderNAND(hmm, state_sequences):
     """Compute order score of state sequences, not averaging, but with adj dupes removed
 
     A score of 0 means there's only one state.
     """
-
-    scoresND = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        logP = np.log(hmm.transmat_)
-        pth = [x[0] for x in groupby(state_sequences[seqid])] # remove adjacent duplicates
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq
-        scoresND.append(score)
-
-    return np.array(scoresND)
+    return _order_scores(hmm, state_sequences, no_duplicates=True, average=False)
 
 def scoreOrderNA(hmm, state_sequences):
     """Compute order score of state sequences, not averaging
 
     A score of 0 means there's only one state.
     """
-
-    scoresND = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        logP = np.log(hmm.transmat_)
-        pth = state_sequences[seqid]
-        plen = len(pth)
-        logPseq = 0
-        for ii in range(plen-1):
-            logPseq += logP[pth[ii],pth[ii+1]]
-        score = logPseq
-        scoresND.append(score)
-
-    return np.array(scoresND)
+    return _order_scores(hmm, state_sequences, no_duplicates=False, average=False)
 
 def score_plen(hmm, state_sequences):
     """returns path length
     """
-    plens = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        pth = state_sequences[seqid]
-        plen = len(pth)
-        plens.append(plen)
-
-    return np.array(plens)
+    _, lengths = concatenate_sequences(state_sequences)
+    return lengths
 
 def score_plenND(hmm, state_sequences):
     """returns path length, no adjacent duplicates
     """
-    plens = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        pth = [x[0] for x in groupby(state_sequences[seqid])] # remove adjacent duplicates
-        plen = len(pth)
-        plens.append(plen)
-
-    return np.array(plens)
+    _, lengths = remove_adjacent_duplicates(*concatenate_sequences(state_sequences))
+    return lengths
 
 def score_SD(hmm, state_sequences):
     """returns State Diversity --- number of unique decoded states
     """
-    plens = [] # scores with no adjacent duplicates
-
-    for seqid in range(len(state_sequences)):
-        pth = state_sequences[seqid]
-        sd = len(set(pth))
-        plens.append(sd)
-
-    return np.array(plens)
+    states, lengths = concatenate_sequences(state_sequences)
+    seqids = _sequence_ids(lengths)
+    n_states = states.max() + 1 if states.size else 1
+    unique = np.unique(seqids * n_states + states)
+    return np.bincount(unique // n_states, minlength=len(lengths))
 
 def bigscore(hmm, state_sequences):
     scorefuncs = [score_SD,
@@ -183,4 +246,4 @@ def bigscore(hmm, state_sequences):
     # comboscore = ((-scoresND+scoresNAND-scoresD+scoresNA)/scoresplenND)+scoresSD
     comboscore = ((-scores[2]+scores[3]-scores[4]+scores[5])/scores[1])+scores[0]
 
-    return comboscore, scores
\ No newline at end of file
+    return comboscore, scores
@@ -0,0 +1,13 @@
+"""
+nelpy.synthesis
+===============
+
+This is the nelpy synthesis sub-package.
+
+nelpy.synthesis provides tools to generate synthetic data, e.g., Poisson
+spike trains with known place fields.
+"""
+
+from . import poisson
+
+__version__ = '0.0.1'  # should I maintain a separate version for this?
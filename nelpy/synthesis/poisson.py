@@ -1,3 +1,16 @@
+"""Poisson spike train synthesis"""
+
+__all__ = ['GenerateSpikes',
+           'generate_spikes_from_traj',
+           'inhomogeneous_poisson_st',
+           'poisson_st_from_tuningcurve']
+
+import numpy as np
+
+from .. import core
+from .. import auxiliary
+from .. import utils
+
 def GenerateSpikes(IntensityFunc, MaxRate, PositionFunc, TotalTime) :
     # Start by generating spikes for a homogeneous Poisson process
     nHomogeneousSpikes = np.random.poisson(MaxRate * TotalTime)
@@ -20,7 +33,7 @@ def GenerateSpikes(IntensityFunc, MaxRate, PositionFunc, TotalTime) :
       return tHomogeneousSpikeTimes
 
 
-def generate_spikes_from_traj(binned_runidx,truepos,pfs,pfbincenters,pos_fs,const_firing_rate=False,verbose=False):
+def generate_spikes_from_traj(binned_runidx,truepos,pfs,pfbincenters,pos_fs,const_firing_rate=False,verbose=False,fs=32552):
 
     # extract running trajectories from real data:
     run_ends = np.where(np.diff(binned_runidx)-1)[0] + 1
@@ -34,7 +47,6 @@ def generate_spikes_from_traj(binned_runidx,truepos,pfs,pfbincenters,pos_fs,cons
 
     # seq_lengths[sseq_lengths<bins_per_window]
 
-    fs = 32552
     numCells = pfs.shape[0]
     NumTrajectories = len(runbdries)
     SpikeRasters = [[[] for _ in range(numCells)] for _ in range(NumTrajectories)] 
@@ -77,4 +89,126 @@ def generate_spikes_from_traj(binned_runidx,truepos,pfs,pfbincenters,pos_fs,cons
         st = np.sort(st)
         cons_st_array.append(st)
 
-    return cons_st_array
\ No newline at end of file
+    return cons_st_array
+
+def inhomogeneous_poisson_st(rates, fs, *, timestamps=None, support=None,
+                             unit_ids=None, spike_fs=None, random_state=None):
+    """Generate inhomogeneous Poisson spike trains for all units at once.
+
+    The firing rates are taken to be constant for 1/fs seconds after each
+    timestamp. The number of spikes of every unit in every such interval is
+    drawn from a Poisson distribution (all at once), and the spikes are then
+    placed uniformly within their interval.
+
+    Parameters
+    ----------
+    rates : array-like, shape (n_units, n_timepoints)
+        Firing rates, in Hz.
+    fs : float
+        Sampling rate of the firing rates, in Hz.
+    timestamps : array-like, shape (n_timepoints,), optional
+        Times of the firing rates, in seconds. Default is np.arange(n_timepoints)/fs.
+    support : EpochArray, optional
+        Support of the spike trains. Default is from the first timestamp
+        to 1/fs after the last timestamp.
+    unit_ids : list of int, optional
+        Unit IDs. Default is 1, 2, ..., n_units.
+    spike_fs : float, optional
+        Sampling rate of the SpikeTrainArray, in Hz.
+    random_state : None, int or np.random.Generator, optional
+        Random number generator, or seed thereof. Default is to use
+        np.random.
+
+    Returns
+    -------
+    st : SpikeTrainArray
+    """
+    rng = utils._check_random_state(random_state)
+    rates = np.atleast_2d(np.asarray(rates, dtype=float))
+    if np.any(rates < 0):
+        raise ValueError("rates must be non-negative")
+    n_units, n_timepoints = rates.shape
+    if timestamps is None:
+        timestamps = np.arange(n_timepoints) / fs
+    timestamps = np.asarray(timestamps, dtype=float).ravel()
+    if len(timestamps) != n_timepoints:
+        raise ValueError("timestamps must have one entry per column of rates")
+
+    counts = rng.poisson(rates / fs)
+    units, samples = np.nonzero(counts)
+    n_spikes = counts[units, samples]
+    offsets = rng.random(n_spikes.sum())
+    # spikes are ordered by unit and interval, so only the offsets within
+    # intervals with more than one spike have to be sorted:
+    multi = np.repeat(n_spikes > 1, n_spikes)
+    if np.any(multi):
+        intervals = np.repeat(np.arange(len(n_spikes)), n_spikes)[multi]
+        offsets[multi] = offsets[multi][np.lexsort((offsets[multi], intervals))]
+    times = np.repeat(timestamps[samples], n_spikes) + offsets / fs
+    spikes = np.split(times, np.cumsum(counts.sum(axis=1))[:-1])
+
+    if support is None and n_timepoints:
+        support = core.EpochArray([timestamps[0], timestamps[-1] + 1/fs])
+    return core.SpikeTrainArray(spikes, fs=spike_fs, support=support,
+                                unit_ids=unit_ids)
+
+def _bin_index(x, bins):
+    """Index of the bin containing each value of x, or -1 if outside of bins."""
+    idx = np.searchsorted(bins, x, side='right') - 1
+    idx[x == bins[-1]] = len(bins) - 2
+    idx[(idx < 0) | (idx >= len(bins) - 1)] = -1
+    return idx
+
+def _rates_at_positions(tuningcurve, pos):
+    """Firing rates of all units at every sample of pos; zero outside of
+    the bins of the tuning curve."""
+    ratemap = np.nan_to_num(tuningcurve.ratemap)
+    n_units = ratemap.shape[0]
+    ydata = np.atleast_2d(pos._ydata)
+    if isinstance(tuningcurve, auxiliary.TuningCurve2D):
+        ix = _bin_index(ydata[0], tuningcurve.xbins)
+        iy = _bin_index(ydata[1], tuningcurve.ybins)
+        valid = (ix >= 0) & (iy >= 0)
+        rates = np.zeros((n_units, ydata.shape[1]))
+        rates[:, valid] = ratemap[:, ix[valid], iy[valid]]
+    elif isinstance(tuningcurve, auxiliary.TuningCurve1D):
+        ix = _bin_index(ydata[0], tuningcurve.bins)
+        valid = ix >= 0
+        rates = np.zeros((n_units, ydata.shape[1]))
+        rates[:, valid] = ratemap[:, ix[valid]]
+    else:
+        raise TypeError("tuningcurve must be a TuningCurve1D or TuningCurve2D")
+    return rates
+
+def poisson_st_from_tuningcurve(tuningcurve, pos, *, spike_fs=None,
+                                random_state=None):
+    """Generate Poisson spike trains from tuning curves along a trajectory.
+
+    Parameters
+    ----------
+    tuningcurve : TuningCurve1D or TuningCurve2D
+        Firing rates (in Hz) of all units, as a function of position.
+    pos : PositionArray or AnalogSignalArray
+        Position, with one (1D) or two (2D) signals. The firing rates are
+        looked up at every sample, and are zero outside of the tuning curve
+        bins.
+    spike_fs : float, optional
+        Sampling rate of the SpikeTrainArray, in Hz.
+    random_state : None, int or np.random.Generator, optional
+        Random number generator, or seed thereof. Default is to use
+        np.random.
+
+    Returns
+    -------
+    st : SpikeTrainArray
+        Spike trains on the support of pos, with the unit IDs of the
+        tuning curve.
+    """
+    if pos.fs is None:
+        raise ValueError("pos must have a sampling rate (fs)")
+    rates = _rates_at_positions(tuningcurve, pos)
+    return inhomogeneous_poisson_st(rates, pos.fs, timestamps=pos.time,
+                                    support=pos.support,
+                                    unit_ids=tuningcurve.unit_ids,
+                                    spike_fs=spike_fs,
+                                    random_state=random_state)
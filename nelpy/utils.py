@@ -1,6 +1,7 @@
 """This module contains helper functions and utilities for nelpy."""
 
 __all__ = ['spatial_information',
+           'spatial_metrics',
            'frange',
            'swap_cols',
            'swap_rows',
@@ -9,21 +10,24 @@ __all__ = ['spatial_information',
            'linear_merge',
            'PrettyDuration',
            'get_contiguous_segments',
+           'get_run_boundaries',
+           'get_max_run_lengths',
            'get_events_boundaries',
-           'get_threshold_crossing_epochs']
+           'get_threshold_crossing_epochs',
+           'get_motion_epochs']
 
+import sys
 import numpy as np
 import warnings
 from itertools import tee
 from collections import namedtuple
 from math import floor
-from scipy.signal import hilbert
-import scipy.ndimage.filters #import gaussian_filter1d, gaussian_filter
 from numpy import log, ceil
 import copy
 
 from . import core # so that core.AnalogSignalArray is exposed
 from . import auxiliary # so that auxiliary.TuningCurve1D is epxosed
+from .utils_.decorators import instrumented
 
 # def sub2ind(array_shape, rows, cols):
 #     ind = rows*array_shape[1] + cols
@@ -46,7 +50,7 @@ def frange(start, stop, step):
     num_steps = int(np.floor((stop-start)/step))
     return np.linspace(start, stop, num=num_steps, endpoint=False)
 
-def spatial_information(ratemap):
+def spatial_information(ratemap, occupancy=None):
         """Compute the spatial information and firing sparsity...
 
         The specificity index examines the amount of information
@@ -81,10 +85,12 @@ def spatial_information(ratemap):
 
         Parameters
         ----------
-        occupancy : array of shape (n_bins,)
-            Occupancy of the animal.
         ratemap : array of shape (n_units, n_bins)
             Rate map in Hz.
+        occupancy : array of shape (n_bins,), optional
+            Occupancy of the animal. If given, the occupancy-weighted
+            information (see spatial_metrics) is returned. Otherwise,
+            occupancy is assumed to be uniform.
         Returns
         -------
         si : array of shape (n_units,)
@@ -93,11 +99,15 @@ def spatial_information(ratemap):
             sparsity (in percent) for each unit
         """
 
-        ratemap = copy.deepcopy(ratemap)
+        if occupancy is not None:
+            return spatial_metrics(ratemap, occupancy,
+                                   metrics=['information'])['information']
+
+        ratemap = np.asarray(ratemap)
         # ensure that the ratemap always has nonzero firing rates,
         # otherwise the spatial information might return NaNs:
         bkg_rate = ratemap[ratemap>0].min()
-        ratemap[ratemap < bkg_rate] = bkg_rate
+        ratemap = np.maximum(ratemap, bkg_rate)
 
         number_of_spatial_bins = np.prod(ratemap.shape[1:])
         weight_per_bin = 1/number_of_spatial_bins
@@ -118,7 +128,7 @@ def spatial_information(ratemap):
 
         return si/number_of_spatial_bins
 
-def spatial_sparsity(ratemap):
+def spatial_sparsity(ratemap, occupancy=None):
         """Compute the firing sparsity...
 
         The specificity index examines the amount of information
@@ -153,10 +163,12 @@ def spatial_sparsity(ratemap):
 
         Parameters
         ----------
-        occupancy : array of shape (n_bins,)
-            Occupancy of the animal.
         ratemap : array of shape (n_units, n_bins)
             Rate map in Hz.
+        occupancy : array of shape (n_bins,), optional
+            Occupancy of the animal. If given, the occupancy-weighted
+            sparsity (see spatial_metrics) is returned. Otherwise,
+            occupancy is assumed to be uniform.
         Returns
         -------
         si : array of shape (n_units,)
@@ -165,6 +177,11 @@ def spatial_sparsity(ratemap):
             sparsity (in percent) for each unit
         """
 
+        if occupancy is not None:
+            return spatial_metrics(ratemap, occupancy,
+                                   metrics=['sparsity'])['sparsity']
+
+        ratemap = np.asarray(ratemap)
         number_of_spatial_bins = np.prod(ratemap.shape[1:])
         weight_per_bin = 1/number_of_spatial_bins
         Pi = 1
@@ -184,14 +201,282 @@ def spatial_sparsity(ratemap):
 
         return sparsity/number_of_spatial_bins
 
-def downsample_analogsignalarray(obj, *, fs_out, aafilter=True, inplace=False):
-    # TODO add'l kwargs
+_SPATIAL_METRICS = ('information', 'information_rate', 'sparsity',
+                    'selectivity', 'coherence')
+
+def _neighbor_sum(x, ndim):
+    """Sum over the 2 (1D) or 8 (2D) nearest neighbors of each bin, in the
+    last ndim axes of x (bins outside of the map count as zero)."""
+    pad = [(0, 0)]*(x.ndim - ndim) + [(1, 1)]*ndim
+    xp = np.pad(x, pad)
+    out = -x.copy()
+    if ndim == 1:
+        for dx in range(3):
+            out += xp[..., dx:dx+x.shape[-1]]
+    else:
+        nx, ny = x.shape[-2:]
+        for dx in range(3):
+            for dy in range(3):
+                out += xp[..., dx:dx+nx, dy:dy+ny]
+    return out
+
+def spatial_metrics(ratemaps, occupancy=None, *, ndim=None, metrics=None):
+    """Compute occupancy-weighted spatial metrics of (stacks of) ratemaps.
+
+    All metrics are computed for any number of leading dimensions at once,
+    e.g., for ratemaps of shape (n_shuffles, n_units, n_bins), so that
+    the metrics of thousands of shuffled ratemaps are obtained in a single
+    vectorized pass.
+
+    With P_i the occupancy probability of bin i, R_i the firing rate in bin
+    i, and R = Sum P_i R_i the overall (occupancy-weighted) mean firing rate:
+
+        information = Sum P_i (R_i/R) log_2(R_i/R)   [bits/spike]
+        information_rate = R * information            [bits/sec]
+        sparsity = (Sum P_i R_i)**2 / Sum P_i R_i**2   [0, 1]
+        selectivity = max R_i / R
+        coherence = arctanh(corr(R_i, mean of the visited neighbors of i))
+
+    Unvisited bins (zero occupancy) are ignored. Coherence (Muller and
+    Kubie, 1989) uses the 2 (1D) or 8 (2D) adjacent bins.
+
+    Reference(s)
+    ------------
+    Skaggs, W. E., McNaughton, B. L., Wilson, M. A., and Barnes, C. A.
+        (1996). "Theta phase precession in hippocampal neuronal populations
+        and the compression of temporal sequences", Hippocampus, 6(2),
+        149-172.
+    Muller, R. U., and Kubie, J. L. (1989). "The firing of hippocampal
+        place cells predicts the future position of freely moving rats",
+        J. Neurosci., 9(12), 4101-4110.
+
+    Parameters
+    ----------
+    ratemaps : array of shape (..., n_bins) or (..., n_xbins, n_ybins)
+        Rate maps in Hz.
+    occupancy : array of shape (n_bins,) or (n_xbins, n_ybins), optional
+        Occupancy of the animal (in any units). Default is uniform.
+    ndim : int, optional
+        Number of spatial dimensions (1 or 2). Only needed if occupancy
+        is None; default is occupancy.ndim, or 1.
+    metrics : list of str, optional
+        Metrics to compute, from 'information', 'information_rate',
+        'sparsity', 'selectivity' and 'coherence'. Default is all.
+
+    Returns
+    -------
+    out : dict
+        Maps each metric to an array of shape ratemaps.shape[:-ndim].
+    """
+    if metrics is None:
+        metrics = _SPATIAL_METRICS
+    for metric in metrics:
+        if metric not in _SPATIAL_METRICS:
+            raise ValueError("unknown metric '{}'".format(metric))
+
+    ratemaps = np.asarray(ratemaps, dtype=float)
+    if occupancy is None:
+        ndim = 1 if ndim is None else ndim
+        occupancy = np.ones(ratemaps.shape[ratemaps.ndim-ndim:])
+    occupancy = np.asarray(occupancy, dtype=float)
+    ndim = occupancy.ndim
+    if ndim not in (1, 2):
+        raise TypeError("rate map shape not supported / understood!")
+    if ratemaps.shape[ratemaps.ndim-ndim:] != occupancy.shape:
+        raise ValueError("ratemaps and occupancy must have the same spatial shape")
+
+    axes = tuple(range(-ndim, 0))
+    visited = occupancy > 0
+    Pi = occupancy / occupancy.sum()
+    Ri = np.where(visited, ratemaps, 0)
+    R = np.sum(Pi*Ri, axis=axes)
+    Rx = np.expand_dims(R, axes)
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'information' in metrics or 'information_rate' in metrics:
+            ratio = Ri / Rx
+            # 0 log 0 = 0:
+            logratio = np.log2(np.where(ratio > 0, ratio, 1))
+            info = np.sum(Pi*ratio*logratio, axis=axes)
+            if 'information' in metrics:
+                out['information'] = info
+            if 'information_rate' in metrics:
+                out['information_rate'] = R*info
+        if 'sparsity' in metrics:
+            out['sparsity'] = R**2 / np.sum(Pi*Ri**2, axis=axes)
+        if 'selectivity' in metrics:
+            out['selectivity'] = np.max(Ri, axis=axes) / R
+        if 'coherence' in metrics:
+            mask = visited.astype(float)
+            n_neighbors = _neighbor_sum(mask, ndim)
+            neighbor_mean = _neighbor_sum(Ri, ndim) / n_neighbors
+            valid = visited & (n_neighbors > 0)
+            n = valid.sum()
+            x = np.where(valid, Ri, 0)
+            y = np.where(valid, neighbor_mean, 0)
+            mx = np.expand_dims(np.sum(x, axis=axes) / n, axes)
+            my = np.expand_dims(np.sum(y, axis=axes) / n, axes)
+            dx = np.where(valid, x - mx, 0)
+            dy = np.where(valid, y - my, 0)
+            corr = np.sum(dx*dy, axis=axes) / np.sqrt(
+                np.sum(dx**2, axis=axes)*np.sum(dy**2, axis=axes))
+            out['coherence'] = np.arctanh(np.clip(corr, -1, 1))
+    return out
+
+def _rational_rate_ratio(fs, fs_out, max_denominator=1000):
+    """Return (up, down) such that fs_out ~= fs*up/down."""
+    from fractions import Fraction
+    ratio = Fraction(fs_out / fs).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+def _resample_poly_filter(up, down, window=('kaiser', 5.0)):
+    """FIR filter used by scipy.signal.resample_poly, and its half length."""
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window=window) * up
+    return h, half_len
+
+def _resample_poly_epochs(ydata, lengths, up, down, *, h=None, half_len=None,
+                          buffer_len=4194304):
+    """Polyphase resampling (by up/down) of each epoch of concatenated
+    signals.
+
+    Each epoch is resampled independently, exactly as
+    scipy.signal.resample_poly would (zero padding at the epoch
+    boundaries), but only the output samples are ever computed, and the
+    input is processed in chunks of about buffer_len elements, so that
+    no full-rate copy of ydata is made.
+
+    Parameters
+    ----------
+    ydata : array, shape (n_signals, n_samples)
+    lengths : array-like of int
+        Number of samples in each epoch.
+    up, down : int
+        Upsampling and downsampling factors.
+    h : array, optional
+        FIR filter (at the upsampled rate). Default is the filter of
+        scipy.signal.resample_poly, in which case half_len is ignored.
+    half_len : int, optional
+        Index of the center of h.
+    buffer_len : int, optional
+        Approximate number of input elements to process at once.
+
+    Returns
+    -------
+    out : array, shape (n_signals, n_out)
+    out_lengths : array of int
+        Number of output samples in each epoch, ceil(length*up/down).
+    """
+    from scipy.signal import upfirdn
+
+    if h is None:
+        h, half_len = _resample_poly_filter(up, down)
+    lengths = np.asarray(lengths, dtype=int).ravel()
+    starts = _get_epoch_starts(lengths, ydata.shape[1])
+    out_lengths = -(-lengths * up // down)
+    out = np.zeros((ydata.shape[0], out_lengths.sum()))
+    out_starts = np.cumsum(out_lengths) - out_lengths
+
+    # number of output samples per chunk:
+    chunk = max(1, (buffer_len // max(ydata.shape[0], 1)) * up // down)
+    for start, length, out_start, n_out in zip(starts, lengths, out_starts,
+                                               out_lengths):
+        x = ydata[:, start:start+length]
+        for m0 in range(0, n_out, chunk):
+            m1 = min(m0 + chunk, n_out)
+            # out[m] = sum_n x[n] h[m*down + half_len - n*up]
+            n0 = max(0, -(-(m0*down - half_len) // up))
+            n1 = min(length, ((m1-1)*down + half_len) // up + 1)
+            # align the filter so that output k of upfirdn is output m=k-d
+            d = -(-(half_len - n0*up) // down)
+            pad = d*down + n0*up - half_len
+            hp = np.concatenate((np.zeros(pad), h))
+            y = upfirdn(hp, x[:, n0:n1], up, down, axis=1)
+            k0, k1 = m0 + d, m1 + d
+            out[:, out_start+m0:out_start+m1] = y[:, k0:k1]
+    return out, out_lengths
+
+def _downsample_polyphase(obj, *, fs_out, aafilter=True, inplace=False):
+    """Downsample an AnalogSignalArray by polyphase filtering, epoch by
+    epoch. See downsample_analogsignalarray."""
+    up, down = _rational_rate_ratio(obj.fs, fs_out)
+    fs_new = obj.fs * up / down
+    if not np.isclose(fs_new, fs_out):
+        warnings.warn("fs_out approximated by fs*{}/{} = {}".format(up, down, fs_new))
+
+    lengths = obj.lengths
+    if aafilter:
+        ydata, out_lengths = _resample_poly_epochs(obj._ydata_rowsig, lengths,
+                                                   up, down)
+    elif up == 1:
+        # plain decimation: keep every down-th sample of each epoch
+        keep = np.concatenate([np.arange(start, start+length, down) for start, length in
+                               zip(_get_epoch_starts(lengths, obj.n_samples), lengths)]
+                              + [np.array([], dtype=int)])
+        ydata = obj._ydata_rowsig[:, keep]
+        out_lengths = -(-np.asarray(lengths, dtype=int) // down)
+    else:
+        raise ValueError("aafilter=False is only supported for integer "
+                         "downsampling factors (got {}/{})".format(up, down))
+
+    # output timestamps, from the first timestamp of each epoch:
+    first = obj.time[_get_epoch_starts(lengths, obj.n_samples)[np.asarray(lengths) > 0]]
+    out_starts = np.repeat(np.cumsum(out_lengths) - out_lengths, out_lengths)
+    time = np.repeat(first, out_lengths[out_lengths > 0]) \
+        + (np.arange(out_lengths.sum()) - out_starts) / fs_new
+
+    if inplace:
+        out = obj
+    else:
+        out = obj._copy_without_data()
+    out._ydata = ydata
+    out._time = time
+    out._fs = fs_new
+    out.__renew__()
+    return out
+
+def downsample_analogsignalarray(obj, *, fs_out, aafilter=True, inplace=False,
+                                 method=None):
+    """Downsample an AnalogSignalArray to a new sampling rate.
 
+    Parameters
+    ----------
+    obj : AnalogSignalArray
+    fs_out : float
+        Sampling rate of the output.
+    aafilter : bool, optional
+        If True (default), apply an anti-aliasing filter.
+    inplace : bool, optional
+        If True, modify obj in place. Default is False.
+    method : string, optional
+        'iir' (default) filters the entire signal with a zero-phase
+        Chebyshev type II filter at the input rate, and then resamples it
+        with simplify(). 'polyphase' resamples each epoch by an integer or
+        rational factor, fs_out/fs ~= up/down, with the polyphase FIR
+        filter of scipy.signal.resample_poly, only computing the output
+        samples, and without copying the full-rate signal. This is much
+        faster, and memory-bounded, for e.g. wideband to LFP conversion.
+
+    Returns
+    -------
+    out : AnalogSignalArray
+    """
     if not isinstance(obj, core.AnalogSignalArray):
         raise TypeError('obj is expected to be a nelpy.core.AnalogSignalArray!')
 
     assert fs_out < obj.fs, "fs_out must be less than current sampling rate!"
 
+    if method is None:
+        method = 'iir'
+    if method == 'polyphase':
+        return _downsample_polyphase(obj, fs_out=fs_out, aafilter=aafilter,
+                                     inplace=inplace)
+    elif method != 'iir':
+        raise ValueError("method must be 'iir' or 'polyphase'")
+
     if inplace:
         out = obj
     else:
@@ -451,9 +736,114 @@ def get_mua_events(mua, fs=None, minLength=None, maxLength=None, PrimaryThreshol
 
     return mua_epochs
 
+def _check_random_state(random_state=None):
+    """Return a random number generator.
+
+    Parameters
+    ----------
+    random_state : None, int, np.random.Generator or np.random.RandomState
+        If None, the global numpy random state (np.random) is used, so that
+        np.random.seed() applies. An int is used to seed a new Generator,
+        and generators are returned as is.
+
+    Returns
+    -------
+    rng : object with uniform(), random(), poisson() and permutation() methods
+    """
+    if random_state is None:
+        return np.random.mtrand._rand
+    if isinstance(random_state, (np.random.Generator, np.random.RandomState)):
+        return random_state
+    return np.random.default_rng(random_state)
+
+def _iter_chunks(data, chunksize=None):
+    """Yield data as 1D numpy arrays of (at most) chunksize elements.
+
+    Arrays (including memmaps) and other sequences are sliced, so that
+    only one chunk is in memory at a time; any other iterable is assumed
+    to already yield chunks (or scalars).
+    """
+    if chunksize is None:
+        chunksize = 1048576
+    if hasattr(data, '__len__') and hasattr(data, '__getitem__'):
+        for start in range(0, len(data), chunksize):
+            yield np.asarray(data[start:start+chunksize]).ravel()
+    else:
+        for chunk in data:
+            yield np.atleast_1d(np.asarray(chunk)).ravel()
+
+def _get_contiguous_segments_chunked(chunks, *, step=None, assume_sorted=None,
+                                     index=False, inclusive=False):
+    """Streaming get_contiguous_segments, over an iterable of 1D chunks.
+
+    Uses the same rule as the in-core computation (a new segment starts
+    wherever neighboring samples are at least 2*step apart), with the last
+    sample of each chunk carried over to the next one, so that segments
+    can span any number of chunks. If step is None, it is estimated as
+    the median step within the first chunk(s).
+    """
+    starts, stops = [], []          # global indices of closed segments
+    start_vals, stop_vals = [], []
+    cur_start = cur_start_val = None
+    prev = None                     # last sample of the previous chunk
+    offset = 0                      # global index of the first element of ext
+    warned = False
+    pending = np.array([])          # samples held back to estimate step
+
+    for chunk in chunks:
+        if step is None:
+            pending = np.concatenate((pending, chunk))
+            if len(pending) < 2:
+                continue
+            step = np.median(np.diff(pending))
+            chunk, pending = pending, None
+        if len(chunk) == 0:
+            continue
+        if prev is None:
+            ext = chunk
+            cur_start, cur_start_val = 0, chunk[0]
+        else:
+            ext = np.concatenate(([prev], chunk))
+        d = np.diff(ext)
+        if not assume_sorted and np.any(d < 0):
+            raise NotImplementedError("out-of-core sorting has not been implemented yet...")
+        if not warned and np.any(d < step):
+            warnings.warn("some steps in the data are smaller than the requested step size.")
+            warned = True
+        breaks = np.flatnonzero(d >= 2*step)
+        if len(breaks):
+            # segments close at ext[breaks], and new ones start at ext[breaks+1]
+            starts.append(np.r_[cur_start, offset + breaks[:-1] + 1])
+            start_vals.append(np.r_[cur_start_val, ext[breaks[:-1] + 1]])
+            stops.append(offset + breaks)
+            stop_vals.append(ext[breaks])
+            cur_start, cur_start_val = offset + breaks[-1] + 1, ext[breaks[-1] + 1]
+        offset += len(ext) - 1
+        prev = ext[-1]
+
+    if pending is not None and len(pending):
+        # a single sample in total, so that step could not be estimated
+        step = 1
+        cur_start, cur_start_val, prev, offset = 0, pending[0], pending[0], 0
+    if prev is not None:
+        starts.append([cur_start])
+        start_vals.append([cur_start_val])
+        stops.append([offset])
+        stop_vals.append([prev])
+
+    if not starts:
+        return np.zeros((0, 2))
+    starts, stops = np.concatenate(starts), np.concatenate(stops)
+    if index:
+        if inclusive:
+            return np.vstack((starts, stops)).T
+        return np.vstack((starts, stops + 1)).T
+    return np.vstack((np.concatenate(start_vals),
+                      np.concatenate(stop_vals) + step)).T
+
 def get_contiguous_segments(data, *, step=None, assume_sorted=None,
                             in_core=True, index=False, inclusive=False,
-                            fs=None, sort=None, in_memory=None):
+                            fs=None, sort=None, in_memory=None, chunksize=None):
     """Compute contiguous segments (seperated by step) in a list.
 
     Note! This function requires that a sorted list is passed.
@@ -469,7 +859,7 @@ def get_contiguous_segments(data, *, step=None, assume_sorted=None,
           arguments to function call.
 
     WARNING! Step is robustly computed in-core (i.e., when in_core is
-        True), but is assumed to be 1 when out-of-core.
+        True), but is estimated from the first chunk only when out-of-core.
 
     Example
     -------
@@ -496,9 +886,9 @@ def get_contiguous_segments(data, *, step=None, assume_sorted=None,
         reliable.
     in_core : bool, optional
         If True, then we use np.diff which requires all the data to fit
-        into memory simultaneously, otherwise we use groupby, which uses
-        a generator to process potentially much larger chunks of data,
-        but also much slower.
+        into memory simultaneously, otherwise the data is streamed in
+        chunks (e.g., from a memmap, or from an iterator of arrays), so
+        that only one chunk is in memory at a time.
     index : bool, optional
         If True, the indices of segment boundaries will be returned. Otherwise,
         the segment boundaries will be returned in terms of the data itself.
@@ -506,6 +896,10 @@ def get_contiguous_segments(data, *, step=None, assume_sorted=None,
     inclusive : bool, optional
         If True, the boundaries are returned as [(inclusive idx, inclusive idx)]
         Default is False, and can only be used when index==True.
+    chunksize : int, optional
+        Number of samples per chunk when out-of-core, if data is an array
+        (or memmap). If data is any other iterable, then it is assumed to
+        yield the chunks itself. Default is 2**20.
 
     Deprecated
     ----------
@@ -560,45 +954,104 @@ def get_contiguous_segments(data, *, step=None, assume_sorted=None,
                 indices = np.vstack((starts, stops + 1)).T
             return indices
     else:
-        from itertools import groupby
-        from operator import itemgetter
+        return _get_contiguous_segments_chunked(
+            _iter_chunks(data, chunksize), step=step,
+            assume_sorted=assume_sorted, index=index, inclusive=inclusive)
+    return np.asarray(bdries)
 
-        if not assume_sorted:
-            if not is_sorted(data):
-                # data = np.sort(data)  # algorithm assumes sorted list
-                raise NotImplementedError("out-of-core sorting has not been implemented yet...")
+def _get_epoch_starts(lengths, n_samples):
+    """Validate lengths of concatenated epochs, and return their start
+    indices."""
+    if lengths is None:
+        lengths = [n_samples]
+    lengths = np.asarray(lengths, dtype=int).ravel()
+    if lengths.sum() != n_samples:
+        raise ValueError("lengths must sum to the number of elements in mask")
+    return np.cumsum(lengths) - lengths
 
-        if step is None:
-            step = 1
-
-        bdries = []
-
-        if not index:
-            for k, g in groupby(enumerate(data), lambda ix: (ix[0] - ix[1])):
-                f = itemgetter(1)
-                gen = (f(x) for x in g)
-                start = next(gen)
-                stop = start
-                for stop in gen:
-                    pass
-                bdries.append([start, stop + step])
-        else:
-            counter = 0
-            for k, g in groupby(enumerate(data), lambda ix: (ix[0] - ix[1])):
-                f = itemgetter(1)
-                gen = (f(x) for x in g)
-                _ = next(gen)
-                start = counter
-                stop = start
-                for _ in gen:
-                    stop +=1
-                if inclusive:
-                    bdries.append([start, stop])
-                else:
-                    bdries.append([start, stop + 1])
-                counter = stop + 1
+def get_run_boundaries(mask, *, lengths=None, min_length=None,
+                       return_epochs=False):
+    """Find runs of consecutive True elements in a boolean array of
+    concatenated epochs.
 
-    return np.asarray(bdries)
+    Runs never extend across epoch boundaries. This is fully vectorized,
+    so that it scales to millions of elements.
+
+    Example
+    -------
+    >>> mask = [1, 1, 0, 1, 1, 1, 1, 0]
+    >>> get_run_boundaries(mask, lengths=[5, 3])
+    array([[0, 2], [3, 5], [5, 7]])
+    >>> get_run_boundaries(mask, lengths=[5, 3], min_length=2, return_epochs=True)
+    (array([[0, 2], [3, 5], [5, 7]]), array([0, 0, 1]))
+
+    Parameters
+    ----------
+    mask : array-like of bool, shape (n_samples,)
+        Concatenated boolean arrays of all epochs.
+    lengths : array-like of int, optional
+        Number of elements of each epoch. Default is a single epoch.
+    min_length : int, optional
+        Only return runs of at least min_length elements.
+    return_epochs : bool, optional
+        If True, also return the index of the epoch of each run.
+
+    Returns
+    -------
+    bounds : np.array of shape (n_runs, 2)
+        Indices [start, stop) (inclusive, exclusive) of each run into mask.
+    epochs : np.array of shape (n_runs,)
+        Epoch index of each run; only returned if return_epochs is True.
+    """
+    mask = np.asarray(mask, dtype=bool).ravel()
+    n_samples = mask.size
+    epoch_starts = _get_epoch_starts(lengths, n_samples)
+
+    # is_first[i] is True if element i is the first element of an epoch;
+    # (empty trailing epochs can start at n_samples)
+    is_first = np.zeros(n_samples + 1, dtype=bool)
+    is_first[epoch_starts] = True
+
+    continues = np.zeros(n_samples, dtype=bool)  # run continues from i-1
+    continues[1:] = mask[:-1] & mask[1:]
+    continues &= ~is_first[:-1]
+
+    starts = np.flatnonzero(mask & ~continues)
+    stops = np.flatnonzero(mask & ~np.append(continues[1:], False)) + 1
+
+    if min_length is not None:
+        keep = (stops - starts) >= min_length
+        starts, stops = starts[keep], stops[keep]
+
+    bounds = np.column_stack((starts, stops))
+    if return_epochs:
+        epochs = np.searchsorted(epoch_starts, starts, side='right') - 1
+        return bounds, epochs
+    return bounds
+
+def get_max_run_lengths(mask, *, lengths=None):
+    """Return the length of the longest run of consecutive True elements in
+    each epoch of a boolean array of concatenated epochs.
+
+    Parameters
+    ----------
+    mask : array-like of bool, shape (n_samples,)
+        Concatenated boolean arrays of all epochs.
+    lengths : array-like of int, optional
+        Number of elements of each epoch. Default is a single epoch.
+
+    Returns
+    -------
+    max_lengths : np.array of int, shape (n_epochs,)
+    """
+    mask = np.asarray(mask, dtype=bool).ravel()
+    if lengths is None:
+        lengths = [mask.size]
+    bounds, epochs = get_run_boundaries(mask, lengths=lengths,
+                                        return_epochs=True)
+    max_lengths = np.zeros(len(lengths), dtype=int)
+    np.maximum.at(max_lengths, epochs, bounds[:,1] - bounds[:,0])
+    return max_lengths
 
 def get_direction(asa, *, sigma=None):
     """Return epochs during which an animal was running left to right, or right
@@ -629,11 +1082,11 @@ def get_direction(asa, *, sigma=None):
     direction[direction<0] = -1
     direction = direction.squeeze()
 
-    l2r = get_contiguous_segments(np.argwhere(direction>0).squeeze(), step=1)
+    l2r = get_run_boundaries(direction>0)
     l2r[:,1] -= 1 # change bounds from [inclusive, exclusive] to [inclusive, inclusive]
     l2r = core.EpochArray(asa.time[l2r])
 
-    r2l = get_contiguous_segments(np.argwhere(direction<0).squeeze(), step=1)
+    r2l = get_run_boundaries(direction<0)
     r2l[:,1] -= 1 # change bounds from [inclusive, exclusive] to [inclusive, inclusive]
     r2l = core.EpochArray(asa.time[r2l])
 
@@ -786,28 +1239,25 @@ def find_threshold_crossing_events(x, threshold, *, mode='above'):
     mode : string, optional in ['above', 'below']; default 'above'
         event triggering above, or below threshold
     """
-    from itertools import groupby
-    from operator import itemgetter
-
+    x = np.asarray(x)
     if mode == 'below':
-        cross_threshold = np.where(x <= threshold, 1, 0)
+        cross_threshold = x <= threshold
     elif mode == 'above':
-        cross_threshold = np.where(x >= threshold, 1, 0)
+        cross_threshold = x >= threshold
     else:
         raise NotImplementedError(
             "mode {} not understood for find_threshold_crossing_events".format(str(mode)))
-    eventlist = []
-    eventmax = []
-    for k,v in groupby(enumerate(cross_threshold),key=itemgetter(1)):
-        if k:
-            v = list(v)
-            eventlist.append([v[0][0],v[-1][0]])
-            try :
-                eventmax.append(x[v[0][0]:(v[-1][0]+1)].max())
-            except :
-                print(v, x[v[0][0]:v[-1][0]])
-    eventmax = np.asarray(eventmax)
-    eventlist = np.asarray(eventlist)
+    bounds = get_run_boundaries(cross_threshold)
+    if len(bounds) == 0:
+        return np.asarray([]), np.asarray([])
+    # reduce over [start0, stop0), [stop0, start1), [start1, stop1), ...
+    # and keep every other result, i.e., the maxima within the runs:
+    idx = bounds.ravel()
+    if idx[-1] == len(x):
+        idx = idx[:-1]
+    eventmax = np.maximum.reduceat(x, idx)[::2]
+    eventlist = bounds.copy()
+    eventlist[:,1] -= 1  # INCLUSIVE
     return eventlist, eventmax
 
 def get_events_boundaries(x, *, PrimaryThreshold=None,
@@ -936,6 +1386,8 @@ def signal_envelope1D(data, *, sigma=None, fs=None):
 
     sigma = 0 means no smoothing (default 4 ms)
     """
+    from scipy.signal import hilbert
+    import scipy.ndimage.filters
 
     if sigma is None:
         sigma = 0.004   # 4 ms standard deviation
@@ -1032,6 +1484,63 @@ def nextfastpower(n):
     n2 = nextpower (n / n35)
     return int (min (n2 * n35))
 
+def _issparse(x):
+    """Return True if x is a scipy.sparse matrix.
+
+    scipy.sparse is not imported here: if it has not been imported yet, x
+    cannot be a sparse matrix.
+    """
+    sparse = sys.modules.get('scipy.sparse')
+    return sparse is not None and sparse.issparse(x)
+
+def _gaussian_filter_sparse(data, cum_lengths, *, sigma, bw, chunksize=None):
+    """Gaussian filter the rows of a sparse matrix, within each epoch.
+
+    Each epoch is filtered in blocks of at most chunksize columns, padded
+    with as many neighboring columns as the kernel radius, so that only one
+    block is dense at any time. Results are identical to filtering the
+    dense epochs.
+
+    Parameters
+    ----------
+    data : scipy.sparse matrix, shape (n_signals, n_samples)
+    cum_lengths : array-like of int, shape (n_epochs + 1,)
+        Epoch boundaries, in samples, including 0 and n_samples.
+    sigma : float
+        Standard deviation of the Gaussian kernel, in samples.
+    bw : float
+        Bandwidth (truncation) of the kernel, in standard deviations.
+    chunksize : int, optional
+        Number of columns per block. By default, blocks of roughly 4
+        million values are used.
+
+    Returns
+    -------
+    out : scipy.sparse.csr_matrix of float, shape (n_signals, n_samples)
+    """
+    from scipy import sparse
+    import scipy.ndimage
+
+    n_signals = data.shape[0]
+    if chunksize is None:
+        chunksize = max(1, 2**22 // max(n_signals, 1))
+    radius = int(bw * sigma + 0.5)
+    data = data.tocsc()
+
+    blocks = []
+    for start, stop in zip(cum_lengths[:-1], cum_lengths[1:]):
+        for frm in range(start, stop, chunksize):
+            to = min(frm + chunksize, stop)
+            lo = max(start, frm - radius)
+            hi = min(stop, to + radius)
+            block = data[:, lo:hi].toarray().astype(float)
+            block = scipy.ndimage.gaussian_filter(block, sigma=(0, sigma), truncate=bw)
+            blocks.append(sparse.csc_matrix(block[:, frm-lo:to-lo]))
+    if not blocks:
+        return sparse.csr_matrix(data.shape, dtype=float)
+    return sparse.hstack(blocks, format='csr')
+
+@instrumented('smoothing')
 def gaussian_filter(obj, *, fs=None, sigma=None, bw=None, inplace=False):
     """Smooths with a Gaussian kernel.
 
@@ -1059,6 +1568,7 @@ def gaussian_filter(obj, *, fs=None, sigma=None, bw=None, inplace=False):
     out : AnalogSignalArray or BinnedSpikeTrainArray
         An object with smoothed data is returned.
     """
+    import scipy.ndimage.filters
 
     if not inplace:
         out = copy.deepcopy(obj)
@@ -1093,8 +1603,13 @@ def gaussian_filter(obj, *, fs=None, sigma=None, bw=None, inplace=False):
         # now smooth each epoch separately
         for idx in range(asa.n_epochs):
             out._ydata[:,cum_lengths[idx]:cum_lengths[idx+1]] = scipy.ndimage.filters.gaussian_filter(asa._ydata[:,cum_lengths[idx]:cum_lengths[idx+1]], sigma=(0,sigma), truncate=bw)
+    elif isinstance(out, core.BinnedSpikeTrainArray) and out.issparse:
+        out._data = _gaussian_filter_sparse(out._data, cum_lengths, sigma=sigma, bw=bw)
+        out._densify_if_needed()
     elif isinstance(out, core.BinnedSpikeTrainArray):
-        out._data = out._data.astype(float)
+        # float data that out owns is smoothed without another copy; views
+        # (e.g., of the data of an epoch slice) are copied first
+        out._data = out._data.astype(float, copy=out._data.base is not None)
         # now smooth each epoch separately
         for idx in range(out.n_epochs):
             out._data[:,cum_lengths[idx]:cum_lengths[idx+1]] = scipy.ndimage.filters.gaussian_filter(out._data[:,cum_lengths[idx]:cum_lengths[idx+1]], sigma=(0,sigma), truncate=bw)
@@ -1277,6 +1792,150 @@ def get_inactive_epochs(speed, v1=5, v2=7):
     inactive_epochs = get_threshold_crossing_epochs(asa=speed, t1=v1, t2=v2, mode='below')
     return inactive_epochs
 
+def _gradient_per_epoch(ydata, lengths):
+    """np.gradient (unit spacing) along the last axis, within each epoch.
+
+    Equivalent to calling np.gradient on every epoch separately, but
+    computed for all epochs at once. Epochs with a single sample have a
+    gradient of zero.
+    """
+    ydata = np.asarray(ydata, dtype=float)
+    grad = np.empty_like(ydata)
+    lengths = np.asarray(lengths, dtype=int).ravel()
+    epoch_starts = _get_epoch_starts(lengths, ydata.shape[-1])
+    grad[:, 1:-1] = (ydata[:, 2:] - ydata[:, :-2]) / 2
+    long_enough = lengths > 1
+    starts = epoch_starts[long_enough]
+    stops = starts + lengths[long_enough] - 1 # inclusive
+    grad[:, starts] = ydata[:, starts + 1] - ydata[:, starts]
+    grad[:, stops] = ydata[:, stops] - ydata[:, stops - 1]
+    grad[:, epoch_starts[~long_enough]] = 0
+    return grad
+
+def _hysteresis_runs(x, lengths, t1, t2, mode='above'):
+    """Runs (within epochs) of x beyond t2, that reach t1 at least once.
+
+    Returns
+    -------
+    bounds : np.array of shape (n_runs, 2)
+        Indices [start, stop) of each run.
+    """
+    if mode == 'above':
+        assert t2 <= t1, \
+            "Secondary Threshold by definition should include more data than Primary Threshold"
+        bounds = get_run_boundaries(x >= t2, lengths=lengths)
+        reduce, reached = np.maximum, lambda peak: peak >= t1
+    elif mode == 'below':
+        assert t2 >= t1, \
+            "Secondary Threshold by definition should include more data than Primary Threshold"
+        bounds = get_run_boundaries(x <= t2, lengths=lengths)
+        reduce, reached = np.minimum, lambda peak: peak <= t1
+    else:
+        raise NotImplementedError(
+            "mode {} not understood for _hysteresis_runs".format(str(mode)))
+    if len(bounds) == 0:
+        return bounds
+    # interleaved reduction, as in find_threshold_crossing_events:
+    idx = bounds.ravel()
+    if idx[-1] == len(x):
+        idx = idx[:-1]
+    peaks = reduce.reduceat(x, idx)[::2]
+    return bounds[reached(peaks)]
+
+def _bounds_to_epochs(bounds, time, fs):
+    """EpochArray from [start, stop) sample indices, closed with 1/fs."""
+    if len(bounds) == 0:
+        return core.EpochArray(empty=True)
+    return core.EpochArray(np.column_stack((time[bounds[:,0]],
+                                            time[bounds[:,1]-1] + 1/fs)))
+
+def get_motion_epochs(pos, *, v1=10, v2=8, rest_v1=5, rest_v2=7, sigma=None,
+                      bw=None, direction=False):
+    """Return run and rest epochs (and optionally movement direction
+    epochs) directly from position data.
+
+    This fuses dxdt_AnalogSignalArray(pos, smooth=True), get_run_epochs and
+    get_inactive_epochs (and get_direction) into a single pass over the
+    position samples, without intermediate AnalogSignalArrays. The speed is
+    the same as that of dxdt_AnalogSignalArray, but, unlike
+    get_threshold_crossing_epochs, epochs never extend across the epochs
+    of pos.
+
+    Parameters
+    ----------
+    pos : AnalogSignalArray or PositionArray
+        1D or 2D position data.
+    v1 : float, optional
+        Minimum speed (in units/sec) that has to be reached / exceeded
+        during a run epoch. Default is 10 [units/sec]
+    v2 : float, optional
+        Speed that defines the run epoch boundaries. Default is 8 [units/sec]
+    rest_v1 : float, optional
+        Speed (in units/sec) that has to be reached / undershot during a rest
+        epoch. Default is 5 [units/sec]
+    rest_v2 : float, optional
+        Speed that defines the rest epoch boundaries. Default is 7 [units/sec]
+    sigma : float, optional
+        Standard deviation of the Gaussian kernel used to smooth the speed
+        (and velocity), in seconds. Default is 0.05 (50 ms).
+    bw : float, optional
+        Bandwidth outside of which the filter value will be zero. Default is 4.0
+    direction : bool, optional
+        If True, also return the epochs of left to right and right to left
+        movement, from the sign of the smoothed velocity (1D only). Default
+        is False.
+
+    Returns
+    -------
+    run_epochs : EpochArray
+    rest_epochs : EpochArray
+    l2r, r2l : EpochArray
+        Only returned if direction is True.
+    """
+    from scipy.ndimage import gaussian_filter1d
+
+    if not isinstance(pos, core.AnalogSignalArray):
+        raise TypeError('AnalogSignalArray expected!')
+    if pos.n_signals not in (1, 2):
+        raise TypeError("more than 2D not currently supported!")
+    if direction and pos.n_signals != 1:
+        raise TypeError("direction is only supported for 1D position!")
+    if pos.fs is None:
+        raise ValueError("fs must be contained in the AnalogSignalArray!")
+    if sigma is None:
+        sigma = 0.05 # 50 ms default
+    if bw is None:
+        bw = 4 # bandwidth of filter (outside of this bandwidth, the filter is zero)
+
+    fs = pos.fs
+    lengths = np.asarray(pos.lengths)
+    grad = _gradient_per_epoch(pos._ydata, lengths)
+    # rows: speed, and (1D only) signed velocity
+    if pos.n_signals == 1:
+        signals = np.vstack((np.abs(grad), grad)) if direction else np.abs(grad)
+    else:
+        signals = np.linalg.norm(grad, axis=0, keepdims=True)
+    signals *= fs
+
+    # smooth within each epoch, in place:
+    for start, length in zip(_get_epoch_starts(lengths, pos.n_samples), lengths):
+        signals[:, start:start+length] = gaussian_filter1d(
+            signals[:, start:start+length], sigma=sigma*fs, truncate=bw, axis=-1)
+
+    speed = signals[0]
+    time = pos.time
+    run_epochs = _bounds_to_epochs(
+        _hysteresis_runs(speed, lengths, v1, v2, mode='above'), time, fs)
+    rest_epochs = _bounds_to_epochs(
+        _hysteresis_runs(speed, lengths, rest_v1, rest_v2, mode='below'), time, fs)
+    if not direction:
+        return run_epochs, rest_epochs
+
+    velocity = signals[1]
+    l2r = _bounds_to_epochs(get_run_boundaries(velocity >= 0, lengths=lengths), time, fs)
+    r2l = _bounds_to_epochs(get_run_boundaries(velocity < 0, lengths=lengths), time, fs)
+    return run_epochs, rest_epochs, l2r, r2l
+
 def spiketrain_union(st1, st2):
     """Join two spiketrains together.
 
@@ -1,12 +1,20 @@
+import contextlib
 import functools
 import inspect
+import time
+import tracemalloc
 import warnings
 
 __all__ = ['add_method_to_instance',
            'add_method_to_class',
            'add_prop_to_instance',
            'add_prop_to_class',
-           'deprecated']
+           'deprecated',
+           'instrumented',
+           'Instrumentation',
+           'enable_instrumentation',
+           'disable_instrumentation',
+           'get_instrumentation']
 
 def deprecated(func):
     '''This is a decorator which can be used to mark functions
@@ -98,4 +106,314 @@ def add_prop_to_class(cls):
             cls.__perinstance = True
         setattr(cls, f.__name__, property(f))
         return f
-    return decorator
\ No newline at end of file
+    return decorator
+
+########################################################################
+# opt-in instrumentation of hot paths
+########################################################################
+
+# stack of active Instrumentation recorders; when empty, instrumented
+# functions are called directly, without any timing overhead.
+_recorders = []
+_global_recorder = None
+
+class Instrumentation:
+    """Record wall time, call counts and allocated bytes of instrumented
+    functions (see instrumented).
+
+    Use as a context manager around (part of) a pipeline run, and
+    optionally attribute costs to named stages:
+
+    >>> with Instrumentation(label='session 1') as rec:
+    >>>     with rec.stage('preprocessing'):
+    >>>         bst = st[run_epochs].bin(ds=0.05)
+    >>>     with rec.stage('decoding'):
+    >>>         posterior, *_ = nel.decoding.decode1D(bst, ratemap)
+    >>> rec.summary(by='category')
+
+    Times are inclusive, so that an instrumented function that calls other
+    instrumented functions is charged for those calls as well. Allocated
+    bytes are only recorded when track_memory is True, and are the net
+    change in memory traced by tracemalloc over the call (i.e., the memory
+    that was allocated and still in use upon return). Tracing memory slows
+    down execution considerably.
+
+    Recorders can be nested; all active recorders record every call.
+    Recorders of several runs can be aggregated with merge, or with +.
+
+    Parameters
+    ----------
+    label : string, optional
+        Label of the run, e.g., a session identifier.
+    track_memory : bool, optional
+        Whether or not to record allocated bytes. Default is False.
+    """
+
+    def __init__(self, *, label=None, track_memory=False):
+        self.label = label
+        self.track_memory = track_memory
+        self.stats = {}  # (stage, name) -> entry
+        self.stages = {}  # stage -> entry
+        self._stage_stack = []
+        self._started_tracemalloc = False
+
+    def __repr__(self):
+        address_str = " at " + str(hex(id(self)))
+        n_calls = sum(entry['calls'] for entry in self.stats.values())
+        return "<Instrumentation{}: {} calls to {} functions{}>".format(
+            '' if self.label is None else ' ' + str(self.label),
+            n_calls,
+            len(set(name for _, name in self.stats)),
+            address_str)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def __add__(self, other):
+        out = Instrumentation(label=self.label,
+                              track_memory=self.track_memory)
+        out.merge(self)
+        out.merge(other)
+        return out
+
+    @property
+    def active(self):
+        """(bool) Whether or not the recorder is currently recording."""
+        return self in _recorders
+
+    @property
+    def current_stage(self):
+        """(string) Name of the current (possibly nested) stage, or None."""
+        if not self._stage_stack:
+            return None
+        return '/'.join(self._stage_stack)
+
+    def start(self):
+        """Start recording calls to instrumented functions."""
+        if not self.active:
+            if self.track_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            _recorders.append(self)
+        return self
+
+    def stop(self):
+        """Stop recording calls to instrumented functions."""
+        if self.active:
+            _recorders.remove(self)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return self
+
+    def reset(self):
+        """Discard all recorded statistics."""
+        self.stats = {}
+        self.stages = {}
+        return self
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager attributing all calls within it to stage name.
+
+        Stages can be nested, in which case their names are joined with
+        '/'. The total wall time spent in each stage is recorded in
+        self.stages, together with the number of times it was entered.
+        """
+        self._stage_stack.append(str(name))
+        stage = self.current_stage
+        mem0 = self._traced_memory()
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - t0
+            nbytes = self._traced_memory() - mem0
+            self._stage_stack.pop()
+            entry = self.stages.setdefault(stage, _new_entry(stage=stage))
+            _update_entry(entry, 1, elapsed, nbytes)
+
+    def _traced_memory(self):
+        if self.track_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+    def _record(self, name, category, elapsed, nbytes):
+        stage = self.current_stage
+        key = (stage, name)
+        try:
+            entry = self.stats[key]
+        except KeyError:
+            entry = self.stats[key] = _new_entry(stage=stage,
+                                                 name=name,
+                                                 category=category)
+        _update_entry(entry, 1, elapsed, nbytes if self.track_memory else 0)
+
+    def merge(self, other):
+        """Add the statistics recorded by other to those of self (in place).
+
+        Parameters
+        ----------
+        other : Instrumentation
+
+        Returns
+        -------
+        self : Instrumentation
+        """
+        if not isinstance(other, Instrumentation):
+            raise TypeError("Instrumentation expected")
+        for key, entry in other.stats.items():
+            own = self.stats.setdefault(key, _new_entry(**{
+                k: entry[k] for k in ('stage', 'name', 'category')}))
+            _update_entry(own, entry['calls'], entry['time'], entry['bytes'])
+        for key, entry in other.stages.items():
+            own = self.stages.setdefault(key, _new_entry(stage=key))
+            _update_entry(own, entry['calls'], entry['time'], entry['bytes'])
+        return self
+
+    def summary(self, *, by='name'):
+        """Aggregate the recorded statistics.
+
+        Parameters
+        ----------
+        by : string, optional
+            One of 'name' (default), 'category', 'stage', or 'stage/name'.
+
+        Returns
+        -------
+        summary : dict
+            Keyed by the grouping, with 'calls', 'time' (s) and 'bytes'
+            entries, ordered by decreasing time.
+        """
+        if by == 'stage/name':
+            keyfunc = lambda entry: (entry['stage'], entry['name'])
+        elif by in ('name', 'category', 'stage'):
+            keyfunc = lambda entry: entry[by]
+        else:
+            raise ValueError("by must be one of 'name', 'category', 'stage',"
+                             " or 'stage/name'")
+        summary = {}
+        for entry in self.stats.values():
+            agg = summary.setdefault(keyfunc(entry), _new_entry())
+            _update_entry(agg, entry['calls'], entry['time'], entry['bytes'])
+        ordered = sorted(summary.items(), key=lambda kv: -kv[1]['time'])
+        return {key: {k: agg[k] for k in ('calls', 'time', 'bytes')}
+                for key, agg in ordered}
+
+    def to_dict(self):
+        """Return the recorded statistics as a JSON-serializable dict."""
+        return {'label': self.label,
+                'track_memory': self.track_memory,
+                'stats': [dict(entry) for entry in self.stats.values()],
+                'stages': [dict(entry) for entry in self.stages.values()]}
+
+    def report(self, *, by='name'):
+        """Return a formatted table of the summary (see summary)."""
+        summary = self.summary(by=by)
+        keys = ['/'.join(str(k) for k in key) if isinstance(key, tuple)
+                else str(key) for key in summary]
+        width = max([len(by)] + [len(key) for key in keys])
+        lines = ['{:<{w}}  {:>8}  {:>12}  {:>14}'.format(
+            by, 'calls', 'time (s)', 'bytes', w=width)]
+        for key, agg in zip(keys, summary.values()):
+            lines.append('{:<{w}}  {:>8d}  {:>12.6f}  {:>14d}'.format(
+                key, agg['calls'], agg['time'], agg['bytes'], w=width))
+        return '\n'.join(lines)
+
+def _new_entry(*, stage=None, name=None, category=None):
+    return {'stage': stage,
+            'name': name,
+            'category': category,
+            'calls': 0,
+            'time': 0.0,
+            'bytes': 0}
+
+def _update_entry(entry, calls, elapsed, nbytes):
+    entry['calls'] += calls
+    entry['time'] += elapsed
+    entry['bytes'] += nbytes
+
+def instrumented(category=None, *, name=None):
+    """Decorator to record calls to a function with all active
+    Instrumentation recorders.
+
+    When no recorder is active (the default), the decorated function is
+    called directly, so that the overhead is a single check.
+
+    Parameters
+    ----------
+    category : string, optional
+        Category of the operation, e.g., 'binning', 'restriction',
+        'interpolation', 'smoothing', 'decoding', 'hmm', or 'shuffle'.
+    name : string, optional
+        Name under which calls are recorded. Default is the qualified name
+        of the function, e.g., 'BinnedSpikeTrainArray._bin_spikes'.
+
+    Example
+    -------
+    >>> @instrumented('binning')
+    >>> def _bin_spikes(self, spiketrainarray, epochArray, ds):
+    >>>     ...
+    """
+    def decorator(func):
+        key = name if name is not None else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _recorders:
+                return func(*args, **kwargs)
+            track = tracemalloc.is_tracing() and \
+                any(rec.track_memory for rec in _recorders)
+            mem0 = tracemalloc.get_traced_memory()[0] if track else 0
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                nbytes = tracemalloc.get_traced_memory()[0] - mem0 if track else 0
+                for rec in list(_recorders):
+                    rec._record(key, category, elapsed, nbytes)
+        wrapper.__instrumented__ = (key, category)
+        return wrapper
+    return decorator
+
+def enable_instrumentation(*, track_memory=False):
+    """Globally enable instrumentation (see Instrumentation).
+
+    Returns
+    -------
+    recorder : Instrumentation
+        The global recorder, which keeps recording until
+        disable_instrumentation is called.
+    """
+    global _global_recorder
+    if _global_recorder is None:
+        _global_recorder = Instrumentation(label='global',
+                                           track_memory=track_memory)
+    elif track_memory and not _global_recorder.track_memory:
+        _global_recorder.stop()
+        _global_recorder.track_memory = True
+    return _global_recorder.start()
+
+def disable_instrumentation():
+    """Globally disable instrumentation.
+
+    Returns
+    -------
+    recorder : Instrumentation, or None
+        The global recorder (if any), with all statistics recorded so far.
+    """
+    global _global_recorder
+    recorder = _global_recorder
+    _global_recorder = None
+    if recorder is not None:
+        recorder.stop()
+    return recorder
+
+def get_instrumentation():
+    """Return the global recorder, or None if not enabled."""
+    return _global_recorder
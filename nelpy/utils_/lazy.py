@@ -0,0 +1,51 @@
+"""
+:mod:`lazy` --- deferred submodule imports
+=============================================================
+"""
+
+import importlib
+import sys
+
+__all__ = ['lazy_submodules']
+
+def lazy_submodules(module_name, submodules):
+    """Build module-level __getattr__ and __dir__ functions (PEP 562) that
+    import submodules on first attribute access.
+
+    Parameters
+    ----------
+    module_name : string
+        Name of the module that exposes the lazy attributes, typically
+        __name__ of the calling module.
+    submodules : dict
+        Mapping of attribute names to (possibly relative) module names,
+        e.g. {'plotting': 'nelpy.plotting', 'metrics': '.utils_.metrics'}.
+        Relative names are resolved against the package of module_name.
+
+    Returns
+    -------
+    __getattr__, __dir__ : functions
+        To be assigned at module level in the calling module.
+
+    Example
+    -------
+    >>> __getattr__, __dir__ = lazy_submodules(__name__, {'io': '.io'})
+    """
+    package = module_name.rpartition('.')[0] \
+        if not hasattr(sys.modules.get(module_name), '__path__') else module_name
+
+    def __getattr__(name):
+        try:
+            target = submodules[name]
+        except KeyError:
+            raise AttributeError("module {!r} has no attribute {!r}".format(
+                module_name, name)) from None
+        module = importlib.import_module(target, package)
+        # cache on the calling module so that __getattr__ is only hit once
+        setattr(sys.modules[module_name], name, module)
+        return module
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[module_name])) | set(submodules))
+
+    return __getattr__, __dir__
@@ -30,9 +30,10 @@ setup(
                     'scipy>=0.17.0', # 0.17.0 introduced functionality we use for interp1d
                     'matplotlib>=1.5.0', # 1.4.3 doesn't support the step kwarg in rasterc yet
                     'dill', # so that we can pickle lambda functions
-                    'pykalman', # for smoothing trajectories
                     # 'shapely>=1.6'
                     ],
+    extras_require={'test': ['pykalman'], # reference for the trajectory smoother
+                    },
     author_email='era3@rice.edu',
     description='Neuroelectrophysiology object model and data analysis in Python.',
     long_description=long_description,
@@ -0,0 +1,15 @@
+"""Shared test fixtures"""
+import numpy as np
+import pytest
+
+import nelpy as nel
+
+@pytest.fixture
+def st():
+    """Random SpikeTrainArray with 5 units on two epochs, in which unit 3
+    follows unit 2 by 5 ms, and unit 4 has no spikes."""
+    rng = np.random.RandomState(0)
+    times = [np.sort(rng.uniform(0, 20, rng.randint(50, 300))) for _ in range(5)]
+    times[2] = np.sort(np.r_[times[1][:50] + 0.005, times[2]])
+    times[3] = np.array([])
+    return nel.SpikeTrainArray(times, fs=1000, support=nel.EpochArray([[0, 8], [9, 20]]))
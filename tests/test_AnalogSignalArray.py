@@ -1,4 +1,62 @@
 """Tests for AnalogSignalArray"""
 
 # sig = nel.AnalogSignalArray(ydata=[1,2,3,4,5,4,7,8,9,10], timestamps=np.array([1,2,3,5,6,7,11,12,13,14])/5)
-# sig2 = nel.AnalogSignalArray(ydata=[[1,2,4,8,15,6,7,4,3,10],[10,11,13,14,15,16,17,18,19,110]], timestamps=np.array([1,2,3,5,6,7,11,12,13,14])/5)
\ No newline at end of file
+# sig2 = nel.AnalogSignalArray(ydata=[[1,2,4,8,15,6,7,4,3,10],[10,11,13,14,15,16,17,18,19,110]], timestamps=np.array([1,2,3,5,6,7,11,12,13,14])/5)
+import numpy as np
+from scipy.signal import resample_poly
+
+import nelpy as nel
+from nelpy import utils
+
+class TestDownsample:
+
+    def test_resample_poly_epochs(self):
+        rng = np.random.RandomState(0)
+        lengths = np.array([1, 2, 5, 100, 333, 0, 1000])
+        ydata = rng.randn(3, lengths.sum())
+        starts = np.cumsum(lengths) - lengths
+        for up, down in [(1, 24), (2, 3), (5, 7)]:
+            for buffer_len in [37, 4194304]:
+                out, out_lengths = utils._resample_poly_epochs(
+                    ydata, lengths, up, down, buffer_len=buffer_len)
+                out_starts = np.cumsum(out_lengths) - out_lengths
+                for start, length, out_start, n_out in zip(starts, lengths,
+                                                           out_starts, out_lengths):
+                    if length == 0:
+                        assert n_out == 0
+                        continue
+                    expected = resample_poly(ydata[:, start:start+length], up, down, axis=1)
+                    np.testing.assert_allclose(out[:, out_start:out_start+n_out],
+                                               expected, atol=1e-12)
+
+    def test_polyphase_respects_epochs(self):
+        fs = 3000
+        rng = np.random.RandomState(0)
+        t = np.arange(30*fs) / fs
+        asa = nel.AnalogSignalArray(rng.randn(2, len(t)), timestamps=t, fs=fs)
+        asa = asa[nel.EpochArray([[0, 10], [10.5, 20]])]
+        lfp = asa.downsample(fs_out=125, method='polyphase')
+        assert lfp.fs == 125
+        assert lfp.n_epochs == 2
+        np.testing.assert_array_equal(lfp.lengths, -(-asa.lengths // 24))
+        first = lfp.time[lfp.lengths[0]]
+        assert np.isclose(first, asa.time[asa.lengths[0]])
+        np.testing.assert_allclose(np.diff(lfp.time[:lfp.lengths[0]]), 1/125)
+        # plain decimation keeps every 24th sample of each epoch
+        dec = asa.downsample(fs_out=125, method='polyphase', aafilter=False)
+        keep = np.r_[np.arange(0, asa.lengths[0], 24),
+                     asa.lengths[0] + np.arange(0, asa.lengths[1], 24)]
+        np.testing.assert_array_equal(dec._ydata, asa._ydata[:, keep])
+
+    def test_polyphase_utils_call_is_independent(self):
+        fs = 3000
+        rng = np.random.RandomState(0)
+        t = np.arange(30*fs) / fs
+        asa = nel.AnalogSignalArray(rng.randn(2, len(t)), timestamps=t, fs=fs)
+        asa = asa[nel.EpochArray([[0, 10], [10.5, 20]])]
+        dec = utils.downsample_analogsignalarray(asa, fs_out=125, method='polyphase',
+                                                 aafilter=False)
+        assert dec._epochdata._parent is dec
+        assert dec._support is not asa._support
+        np.testing.assert_array_equal(dec[1]._ydata, dec._ydata[:, dec.lengths[0]:])
+        np.testing.assert_array_equal(dec[1]._ydata, asa[1]._ydata[:, ::24])
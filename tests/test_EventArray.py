@@ -0,0 +1,89 @@
+"""EventArray and ValueEventArray tests"""
+import warnings
+
+import numpy as np
+import pytest
+
+import nelpy as nel
+
+def _make_events(seed=0):
+    rng = np.random.RandomState(seed)
+    times = [np.sort(rng.uniform(0, 10, n)) for n in (50, 80, 0, 30)]
+    values = [rng.randn(len(t)) for t in times]
+    support = nel.EpochArray([[0, 2.03], [3, 3.01], [4, 7.5], [7.5, 9.97]])
+    return times, values, support
+
+class TestEventArray:
+
+    def test_restriction_matches_spiketrainarray(self):
+        times, _, support = _make_events()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            st = nel.SpikeTrainArray(times, fs=1000, support=support)
+            ea = nel.EventArray(times, fs=1000, support=support)
+            epochs = nel.EpochArray([[1, 3.005], [5, 8]])
+            for actual, desired in zip(ea[epochs].time, st[epochs].time):
+                np.testing.assert_array_equal(actual, desired)
+        for actual, desired in zip(ea.time, st.time):
+            np.testing.assert_array_equal(actual, desired)
+
+    def test_bin_matches_spiketrainarray(self):
+        times, _, support = _make_events()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            bst = nel.SpikeTrainArray(times, fs=1000, support=support).bin(ds=0.1)
+            binned = nel.EventArray(times, fs=1000, support=support).bin(ds=0.1)
+        np.testing.assert_array_equal(binned.data, bst.data)
+        np.testing.assert_allclose(binned.bins, bst.bins)
+        np.testing.assert_allclose(binned.bin_centers, bst.bin_centers)
+        np.testing.assert_array_equal(binned.binnedSupport, bst.binnedSupport)
+        np.testing.assert_allclose(binned.support.time, bst.support.time)
+        assert binned.unit_ids == [0, 1, 2, 3]
+
+class TestValueEventArray:
+
+    def test_values_follow_times(self):
+        times, values, support = _make_events()
+        rng = np.random.RandomState(1)
+        order = [rng.permutation(len(t)) for t in times]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            vea = nel.ValueEventArray([t[o] for t, o in zip(times, order)],
+                                      eventvalues=[v[o] for v, o in zip(values, order)],
+                                      fs=1000, support=support)
+            sliced = vea[nel.EpochArray([4, 9])]
+        for t, v, tt, vv in zip(times, values, vea.time, vea.values):
+            keep = np.any([(t >= a) & (t < b) for a, b in support.time], axis=0)
+            np.testing.assert_array_equal(tt, t[keep])
+            np.testing.assert_array_equal(vv, v[keep])
+        for t, v, tt, vv in zip(times, values, sliced.time, sliced.values):
+            keep = (t >= 4) & (t < 9)
+            np.testing.assert_array_equal(tt, t[keep])
+            np.testing.assert_array_equal(vv, v[keep])
+
+        with pytest.raises(ValueError):
+            nel.ValueEventArray([[1, 2, 3]], eventvalues=[[1, 2]], fs=1)
+
+    @pytest.mark.parametrize('method', ['count', 'sum', 'mean', 'min', 'max',
+                                        'first', 'last'])
+    def test_bin_methods(self, method):
+        times, values, support = _make_events()
+        ds = 0.5
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            vea = nel.ValueEventArray(times, eventvalues=values, fs=1000,
+                                      support=support)
+            asa = vea.bin(ds=ds, method=method)
+        assert asa.fs == 1/ds
+        empty = 0 if method in ('count', 'sum') else np.nan
+        aggregate = {'count': len, 'sum': np.sum, 'mean': np.mean, 'min': np.min,
+                     'max': np.max, 'first': lambda v: v[0], 'last': lambda v: v[-1]}
+        for t, v, signal in zip(times, values, asa.ydata):
+            expected = []
+            for start in asa.time - ds/2:
+                in_bin = (t >= start) & (t < start + ds)
+                expected.append(aggregate[method](v[in_bin]) if in_bin.any() else empty)
+            np.testing.assert_allclose(signal, expected)
+
+        with pytest.raises(ValueError):
+            vea.bin(ds=ds, method='median')
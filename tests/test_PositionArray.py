@@ -0,0 +1,92 @@
+"""PositionArray Kalman smoother tests"""
+import warnings
+
+import numpy as np
+import pytest
+
+import nelpy as nel
+from nelpy.auxiliary import _position
+
+def _make_trajectory(n_samples=600, seed=0):
+    rng = np.random.RandomState(seed)
+    velocity = np.cumsum(rng.randn(2, n_samples)*0.1, axis=1)
+    return np.cumsum(velocity, axis=1) + rng.randn(2, n_samples)
+
+def _loop_smoother(ydata, lengths, Q, R):
+    """Steady-state Kalman filter and RTS smoother, one sample at a time."""
+    K, J, _, _, _ = _position._steady_state_kalman_gains(Q*np.identity(2), R)
+    F = _position._CV_TRANSITION
+    xs = np.full((ydata.shape[0], 2, ydata.shape[1]), np.nan)
+    start = 0
+    for length in lengths:
+        segment = ydata[:, start:start+length]
+        observed = np.all(np.isfinite(segment), axis=0)
+        if observed.any():
+            first = np.argmax(observed)
+            for dd, y in enumerate(segment):
+                xf = np.zeros((2, length))
+                x = np.array([y[first], 0.])
+                for tt in range(length):
+                    if tt > first:
+                        x = F @ x
+                        if observed[tt]:
+                            x = x + K*(y[tt] - x[0])
+                    xf[:, tt] = x
+                smoothed = xf.copy()
+                for tt in range(length-2, -1, -1):
+                    smoothed[:, tt] = xf[:, tt] + J @ (smoothed[:, tt+1] - F @ xf[:, tt])
+                xs[dd, :, start:start+length] = smoothed
+        start += length
+    return xs
+
+class TestKalmanSmoother:
+
+    def test_matches_sample_by_sample(self):
+        ydata = _make_trajectory()
+        ydata[:, 0:3] = np.nan
+        ydata[:, 50:60] = np.nan
+        ydata[:, 399] = np.nan
+        ydata[:, 500:] = np.nan # an epoch without observations
+        lengths = [100, 300, 150, 50]
+        xs, _, _ = _position._cv_kalman_smooth(ydata, lengths, Q=0.01, R=1.)
+        expected = _loop_smoother(ydata, lengths, Q=0.01, R=1.)
+        np.testing.assert_array_equal(np.isnan(xs), np.isnan(expected))
+        np.testing.assert_allclose(xs[~np.isnan(xs)], expected[~np.isnan(expected)],
+                                   atol=1e-9)
+
+    def test_matches_pykalman_after_transient(self):
+        pykalman = pytest.importorskip('pykalman')
+        ydata = _make_trajectory()[:1]
+        xs, _, _ = _position._cv_kalman_smooth(ydata, [ydata.shape[1]], Q=0.01, R=1.)
+        kf = pykalman.KalmanFilter(transition_matrices=_position._CV_TRANSITION,
+                                   observation_matrices=_position._CV_OBSERVATION,
+                                   transition_covariance=0.01*np.identity(2),
+                                   observation_covariance=np.identity(1),
+                                   initial_state_mean=[ydata[0, 0], 0])
+        expected, _ = kf.smooth(ydata.T)
+        np.testing.assert_allclose(xs[0, :, 100:-100], expected[100:-100].T,
+                                   atol=1e-6)
+
+    def test_em_fixed_point(self):
+        rng = np.random.RandomState(1)
+        n_samples = 100000
+        velocity = np.cumsum(rng.randn(2, n_samples)*0.1, axis=1)
+        position = np.cumsum(velocity, axis=1) + rng.randn(2, n_samples)*0.1
+        ydata = position + rng.randn(2, n_samples)*2
+        _, Q, R = _position._cv_kalman_smooth(ydata, [n_samples//2]*2,
+                                              Q=0.01, R=4, n_iter=5)
+        np.testing.assert_allclose(np.diag(Q), [0.01, 0.01], rtol=0.2)
+        assert np.isclose(R, 4, rtol=0.05)
+
+    def test_position_array(self):
+        ydata = _make_trajectory()
+        ydata[:, 200:210] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            pos = nel.PositionArray(ydata, timestamps=np.arange(600)/60, fs=60)
+            smoothed = pos.smooth(Kalman=True)
+            position, speed = pos._kalman_smoother(recompute=True, n_iter=2)
+        assert smoothed.ydata.shape == ydata.shape
+        assert not np.any(np.isnan(smoothed.ydata))
+        assert position.shape == ydata.shape and speed.shape == (600,)
+        assert pos._kalmanfilter['transition_covariance'].shape == (2, 2)
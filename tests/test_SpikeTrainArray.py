@@ -0,0 +1,92 @@
+"""SpikeTrainArray lazy plan tests"""
+import copy
+
+import numpy as np
+
+import nelpy as nel
+from nelpy.core._spiketrain import SpikeTrainPlan
+
+EPOCHS1 = nel.EpochArray([[0, 4], [6, 12], [14, 18]])
+EPOCHS2 = nel.EpochArray([[2, 8], [10, 16]])
+
+class TestLazyPlan:
+
+    def test_matches_eager(self, st):
+        eager = st[EPOCHS1][EPOCHS2].bin(ds=0.02).smooth(sigma=0.05).flatten()
+        plan = st.lazy()[EPOCHS1][EPOCHS2].bin(ds=0.02).smooth(sigma=0.05).flatten()
+        assert isinstance(plan, SpikeTrainPlan)
+        assert plan._result is None
+        np.testing.assert_allclose(plan.data, eager.data, atol=1e-12)
+        np.testing.assert_allclose(plan.bins, eager.bins)
+        np.testing.assert_allclose(plan.support.time, eager.support.time)
+        assert plan.unit_ids == eager.unit_ids
+        assert plan.compute() is plan.compute()
+
+    def test_flatten_spiketrain(self, st):
+        eager = st[EPOCHS1].flatten(unit_id=3)
+        plan = st.lazy()[EPOCHS1].flatten(unit_id=3)
+        assert plan.n_units == 1
+        assert plan.unit_ids == [3]
+        np.testing.assert_array_equal(plan.time, eager.time)
+        np.testing.assert_array_equal(eager.time[0],
+                                      np.sort(np.concatenate(st[EPOCHS1].time)))
+
+    def test_unit_indexing_is_not_fused(self, st):
+        eager = st[EPOCHS1][:, [2, 4]].bin(ds=0.05).flatten()
+        plan = st.lazy()[EPOCHS1][:, [2, 4]].bin(ds=0.05).flatten()
+        np.testing.assert_array_equal(plan.data, eager.data)
+
+    def test_source_is_not_modified(self, st):
+        bst = st[EPOCHS1].bin(ds=0.02)
+        data = bst.data.copy()
+        plan = bst.lazy()[1].smooth(sigma=0.05)
+        np.testing.assert_allclose(plan.data, bst[1].smooth(sigma=0.05).data)
+        plan = bst.lazy().smooth(sigma=0.05).flatten()
+        np.testing.assert_allclose(plan.data, bst.smooth(sigma=0.05).flatten().data)
+        np.testing.assert_array_equal(bst.data, data)
+
+    def test_smooth_inplace_copies(self, st):
+        bst = st[EPOCHS1].bin(ds=0.02)
+        bst._data = bst._data.astype(float)
+        data = bst._data
+        bst.smooth(sigma=0.05, inplace=True)
+        assert bst._data is data
+        # smoothing (a view of) an epoch does not modify the parent
+        before = bst.data.copy()
+        bst[1].smooth(sigma=0.05, inplace=True)
+        np.testing.assert_array_equal(bst.data, before)
+
+    def test_copy_without_compute(self, st):
+        plan = st.lazy()[EPOCHS1].bin(ds=0.02)
+        plan2 = copy.deepcopy(plan)
+        assert plan._result is None and plan2._result is None
+        assert 'pending' in repr(plan)
+
+class TestSparseBinning:
+
+    def test_matches_dense(self, st):
+        st = st[EPOCHS1]
+        dense = st.bin(ds=0.001)
+        bst = st.bin(ds=0.001, sparse=True)
+        assert bst.issparse and not dense.issparse
+        np.testing.assert_array_equal(bst.data, dense.data)
+        np.testing.assert_array_equal(bst.bins, dense.bins)
+        np.testing.assert_array_equal(bst.binnedSupport, dense.binnedSupport)
+        np.testing.assert_array_equal(bst.n_spikes, dense.n_spikes)
+        np.testing.assert_array_equal(bst.n_active_per_bin, dense.n_active_per_bin)
+        np.testing.assert_array_equal(bst[1].data, dense[1].data)
+        np.testing.assert_array_equal(bst.flatten().data, dense.flatten().data)
+
+    def test_smooth(self, st):
+        st = st[EPOCHS1]
+        bst = st.bin(ds=0.001, sparse=True)
+        smoothed = bst.smooth(sigma=0.01)
+        np.testing.assert_allclose(smoothed.data,
+                                   st.bin(ds=0.001).smooth(sigma=0.01).data, atol=1e-12)
+        assert bst.issparse
+
+    def test_density_threshold(self, st):
+        assert not st.bin(ds=0.5, sparse=True).issparse
+        bst = st.bin(ds=0.5).tosparse()
+        assert bst.issparse
+        assert not bst.todense().issparse
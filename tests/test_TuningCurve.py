@@ -0,0 +1,74 @@
+"""TuningCurve shuffle significance tests"""
+import warnings
+
+import numpy as np
+
+import nelpy as nel
+from nelpy.auxiliary._tuningcurve import _shifted_spike_counts
+
+def _random_walk(n_samples, rng, lo=0, hi=100):
+    """Reflected random walk within [lo, hi]."""
+    x = np.cumsum(rng.randn(n_samples)) % (2*(hi - lo))
+    return lo + np.where(x > hi - lo, 2*(hi - lo) - x, x)
+
+def _make_session(n_place=6, n_other=6, duration=600, fs=50, seed=0, ndim=1):
+    rng = np.random.RandomState(seed)
+    t = np.arange(duration*fs) / fs
+    xy = np.vstack([_random_walk(len(t), rng) for _ in range(ndim)])
+    pos = nel.AnalogSignalArray(xy, timestamps=t, fs=fs)
+    spikes = []
+    for uu in range(n_place + n_other):
+        if uu < n_place:
+            center = rng.uniform(20, 80, (ndim, 1))
+            rate = 20*np.exp(-np.sum((xy - center)**2, axis=0)/(2*8**2))
+        else:
+            rate = np.full(len(t), 3.)
+        spikes.append(t[rng.rand(len(t)) < rate/fs])
+    st = nel.SpikeTrainArray(spikes, support=nel.EpochArray([0, duration]), fs=fs)
+    return st.bin(ds=0.1), pos
+
+class TestShuffleSignificance:
+
+    def test_shifted_spike_counts(self):
+        rng = np.random.RandomState(0)
+        counts = rng.poisson(0.3, (4, 200))
+        bin_idx = rng.randint(0, 7, 200)
+        shifts = np.array([0, 3, 199, 50])
+        out = _shifted_spike_counts(counts, bin_idx, 7, shifts, chunksize=3)
+        for shifted, shift in zip(out, shifts):
+            rolled = np.roll(counts, shift, axis=1)
+            expected = np.zeros((4, 7))
+            for tt in range(200):
+                expected[:, bin_idx[tt]] += rolled[:, tt]
+            np.testing.assert_allclose(shifted, expected)
+
+    def test_place_cells_1d(self):
+        bst, pos = _make_session()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            tc = nel.TuningCurve1D(bst=bst, extern=pos, n_extern=50,
+                                   extmin=0, extmax=100)
+        pvalues, observed, null = tc.shuffle_significance(
+            bst, pos, n_shuffles=200, min_shift=20, return_null=True,
+            random_state=0)
+        assert null.shape == (200, 12)
+        assert np.all(pvalues[:6] < 0.01)
+        assert np.median(pvalues[6:]) > 0.05
+        np.testing.assert_allclose(observed, tc.spatial_metrics()['information'],
+                                   rtol=0.1)
+        _, _, null2 = tc.shuffle_significance(
+            bst, pos, n_shuffles=200, min_shift=20, return_null=True,
+            random_state=np.random.default_rng(0))
+        np.testing.assert_array_equal(null2, null)
+
+    def test_place_cells_2d(self):
+        bst, pos = _make_session(n_place=3, n_other=3, ndim=2)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            tc = nel.TuningCurve2D(bst=bst, extern=pos, ext_nx=15, ext_ny=15,
+                                   ext_xmin=0, ext_xmax=100, ext_ymin=0,
+                                   ext_ymax=100)
+        pvalues = tc.shuffle_significance(bst, pos, n_shuffles=100, min_shift=20,
+                                          sigma=5, random_state=0)
+        assert pvalues.shape == (6,)
+        assert np.all(pvalues[:3] < 0.02)
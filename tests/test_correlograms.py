@@ -0,0 +1,70 @@
+"""Correlogram tests"""
+import numpy as np
+
+import nelpy as nel
+from nelpy.analysis import correlogram as cg
+
+BIN_SIZE = 0.002
+WINDOW_SIZE = 0.05
+
+def _brute_force(st, epochs):
+    """Pairwise histograms of all spike time differences within epochs."""
+    bounds = st.support.intersect(epochs).time
+    n_half = int(0.5 * WINDOW_SIZE / BIN_SIZE)
+    def epoch_ids(t):
+        ids = np.full(t.shape, -1)
+        for ii, (start, stop) in enumerate(bounds):
+            ids[(t >= start) & (t <= stop)] = ii
+        return ids
+    ccgs = np.zeros((st.n_units, st.n_units, 2*n_half + 1), dtype=int)
+    for a, ta in enumerate(st.time):
+        for b, tb in enumerate(st.time):
+            ea, eb = epoch_ids(ta), epoch_ids(tb)
+            same = (ea[:, None] == eb[None, :]) & (ea[:, None] >= 0)
+            if a == b:
+                np.fill_diagonal(same, False)
+            dt = (tb[None, :] - ta[:, None])[same]
+            dt = dt[np.abs(dt) < (n_half + 0.5) * BIN_SIZE]
+            lag = np.sign(dt) * np.floor(np.abs(dt) / BIN_SIZE + 0.5)
+            ccgs[a, b] = np.bincount((lag + n_half).astype(int), minlength=2*n_half + 1)
+    return ccgs
+
+class TestCorrelograms:
+
+    def test_matches_brute_force(self, st):
+        epochs = nel.EpochArray([[1, 7], [7.5, 15]])
+        expected = _brute_force(st, epochs)
+        ccgs, lags = cg.correlograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE,
+                                     epochs=epochs)
+        np.testing.assert_array_equal(ccgs, expected)
+        assert lags[np.argmax(ccgs[1, 2])] > 0
+        np.testing.assert_array_equal(ccgs[2, 1], ccgs[1, 2][::-1])
+
+        acgs, _ = cg.autocorrelograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE,
+                                      epochs=epochs)
+        np.testing.assert_array_equal(acgs, np.diagonal(expected).T)
+
+        pairs = cg.PairCorrelograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE,
+                                    epochs=epochs)
+        np.testing.assert_array_equal(pairs[2, 3], expected[1, 2])
+        np.testing.assert_array_equal(pairs[5, 5], expected[4, 4])
+        np.testing.assert_array_equal(pairs.lags, lags)
+
+    def test_workers(self, st):
+        ccgs, _ = cg.correlograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE)
+        ccgs2, _ = cg.correlograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE,
+                                   n_workers=2)
+        np.testing.assert_array_equal(ccgs, ccgs2)
+
+    def test_jitter(self, st):
+        n_ext, kernel = cg._triangular_lag_kernel(0.01, BIN_SIZE)
+        assert len(kernel) == 2*n_ext + 1
+        np.testing.assert_allclose(kernel.sum(), 1)
+        np.testing.assert_allclose(kernel, kernel[::-1])
+
+        jccgs, expected, lags = cg.jitter_correlograms(
+            st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE, jitter=0.01)
+        ccgs, _ = cg.correlograms(st, bin_size=BIN_SIZE, window_size=WINDOW_SIZE)
+        np.testing.assert_allclose(jccgs + expected, ccgs)
+        # the 5 ms excess stands out from the jitter expectation:
+        assert np.argmax(jccgs[1, 2]) == np.argmax(ccgs[1, 2])
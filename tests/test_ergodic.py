@@ -0,0 +1,72 @@
+"""Ergodic Markov chain statistics tests"""
+import numpy as np
+import pytest
+
+from nelpy.analysis import ergodic
+
+OZ = np.array([[.5, .25, .25], [.5, 0, .5], [.25, .25, .5]])
+
+def _make_transmats(n_models=20, k=5, seed=0):
+    rng = np.random.RandomState(seed)
+    transmats = rng.uniform(0, 1, (n_models, k, k))
+    return transmats / transmats.sum(axis=2, keepdims=True)
+
+def _first_step_fmpt(P):
+    """Mean first passage times from first-step analysis, one target at a time."""
+    k = len(P)
+    pi = ergodic.steady_state(P)
+    M = np.zeros((k, k))
+    for j in range(k):
+        others = [i for i in range(k) if i != j]
+        # m_ij = 1 + sum_{l != j} P_il m_lj
+        A = np.identity(k-1) - P[np.ix_(others, others)]
+        M[others, j] = np.linalg.solve(A, np.ones(k-1))
+        M[j, j] = 1 / pi[j]
+    return M
+
+class TestErgodic:
+
+    def test_land_of_oz(self):
+        np.testing.assert_allclose(ergodic.steady_state(OZ), [0.4, 0.2, 0.4])
+        np.testing.assert_allclose(ergodic.fmpt(OZ), [[2.5, 4, 10/3],
+                                                      [8/3, 5, 8/3],
+                                                      [10/3, 4, 2.5]])
+        np.testing.assert_allclose(ergodic.var_fmpt(OZ), [[67/12, 12, 62/9],
+                                                          [56/9, 12, 56/9],
+                                                          [62/9, 12, 67/12]])
+        # np.matrix input is still accepted
+        np.testing.assert_allclose(ergodic.fmpt(np.matrix(OZ)), ergodic.fmpt(OZ))
+
+    def test_stacked_matches_single(self):
+        transmats = _make_transmats()
+        pis = ergodic.steady_state(transmats)
+        assert pis.shape == (20, 5)
+        np.testing.assert_allclose(np.einsum('ni,nij->nj', pis, transmats), pis)
+        M = ergodic.fmpt(transmats)
+        V = ergodic.var_fmpt(transmats)
+        assert M.shape == V.shape == (20, 5, 5)
+        for P, m, v in zip(transmats, M, V):
+            np.testing.assert_allclose(m, _first_step_fmpt(P))
+            np.testing.assert_allclose(m, ergodic.fmpt(P))
+            np.testing.assert_allclose(v, ergodic.var_fmpt(P))
+
+    def test_reducible(self):
+        # two closed classes: the balance equations are singular
+        P = np.array([[1, 0, 0, 0],
+                      [0, 1, 0, 0],
+                      [0, 0, .5, .5],
+                      [.2, 0, .3, .5]])
+        pi = ergodic.steady_state(P)
+        np.testing.assert_allclose(pi.sum(), 1)
+        np.testing.assert_allclose(pi @ P, pi, atol=1e-12)
+        # a singular matrix does not abort the rest of the stack
+        transmats = _make_transmats(n_models=3, k=4)
+        stack = np.concatenate([transmats, P[np.newaxis], np.identity(4)[np.newaxis]])
+        pis = ergodic.steady_state(stack)
+        np.testing.assert_allclose(pis[:3], ergodic.steady_state(transmats))
+        np.testing.assert_allclose(pis[3], pi)
+        np.testing.assert_allclose(pis[4].sum(), 1)
+
+    def test_bad_shape(self):
+        with pytest.raises(ValueError):
+            ergodic.fmpt(np.ones((3, 4)))
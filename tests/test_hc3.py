@@ -0,0 +1,106 @@
+"""hc3 loader tests"""
+import os
+
+import numpy as np
+import pytest
+
+from nelpy.io import hc3
+
+FS = 32552
+SESSION = dict(animal='gor01', year=2006, month=6, day=7, sessiontime='11-26-53')
+
+def _write_session(root, n_elec=3, seed=0):
+    """Write random .clu/.res files; return per-electrode (n_clusters, clu, res)."""
+    rng = np.random.RandomState(seed)
+    sessiondir, prefix = hc3._get_session_dir(root, **SESSION)
+    os.makedirs(sessiondir)
+    electrodes = []
+    for ele in range(1, n_elec + 1):
+        n_clusters = rng.randint(3, 8)
+        n_spikes = rng.randint(50, 200)
+        clu = rng.randint(0, n_clusters, n_spikes)
+        res = np.sort(rng.randint(0, 10*FS, n_spikes))
+        np.savetxt('{}/{}.clu.{}'.format(sessiondir, prefix, ele),
+                   np.r_[n_clusters, clu], fmt='%d')
+        np.savetxt('{}/{}.res.{}'.format(sessiondir, prefix, ele), res, fmt='%d')
+        electrodes.append((n_clusters, clu, res))
+    return electrodes
+
+def _reference(electrodes, includeUnsortedSpikes):
+    """Per-unit mask-and-sort, as the original serial loader did."""
+    st_array = [np.array([])] if includeUnsortedSpikes else []
+    for n_clusters, eu, ts in electrodes:
+        for uu in range(2, n_clusters):
+            st_array.append(ts[eu == uu])
+        if includeUnsortedSpikes:
+            st_array[0] = np.append(st_array[0], ts[eu == 1])
+    return [np.sort(spikes)/FS for spikes in st_array]
+
+class TestLoadHc3Spikes:
+
+    @pytest.mark.parametrize('includeUnsortedSpikes', [False, True])
+    @pytest.mark.parametrize('n_workers', [1, 2])
+    def test_matches_per_unit_split(self, tmp_path, includeUnsortedSpikes, n_workers):
+        electrodes = _write_session(str(tmp_path))
+        st = hc3.load_hc3_spikes(str(tmp_path), fs=FS, n_workers=n_workers,
+                                 includeUnsortedSpikes=includeUnsortedSpikes,
+                                 **SESSION)
+        expected = _reference(electrodes, includeUnsortedSpikes)
+        assert st.n_units == len(expected)
+        for actual, desired in zip(st.time, expected):
+            np.testing.assert_array_equal(actual, desired)
+        assert st.unit_ids[0] == (0 if includeUnsortedSpikes else 1)
+        assert st.fs == FS
+
+    @pytest.mark.parametrize('includeUnsortedSpikes', [False, True])
+    def test_out_of_range_clusters(self, tmp_path, includeUnsortedSpikes):
+        electrodes = _write_session(str(tmp_path))
+        # cluster ids at or above the header n_clusters (and negative ids)
+        # are dropped, instead of being assigned to the next electrode:
+        sessiondir, prefix = hc3._get_session_dir(str(tmp_path), **SESSION)
+        n_clusters, clu, res = electrodes[0]
+        clu = clu.copy()
+        clu[:5] = n_clusters
+        clu[5:8] = n_clusters + 3
+        clu[8] = -1
+        np.savetxt('{}/{}.clu.1'.format(sessiondir, prefix),
+                   np.r_[n_clusters, clu], fmt='%d')
+        electrodes[0] = (n_clusters, clu, res)
+        st = hc3.load_hc3_spikes(str(tmp_path), fs=FS, n_workers=1,
+                                 includeUnsortedSpikes=includeUnsortedSpikes,
+                                 **SESSION)
+        expected = _reference(electrodes, includeUnsortedSpikes)
+        assert st.n_units == len(expected)
+        for actual, desired in zip(st.time, expected):
+            np.testing.assert_array_equal(actual, desired)
+
+    def test_load_hc3_data_spikes(self, tmp_path):
+        electrodes = _write_session(str(tmp_path))
+        st = hc3.load_hc3_data(str(tmp_path), datatype='spikes', fs=FS, **SESSION)
+        expected = _reference(electrodes, False)
+        for actual, desired in zip(st.time, expected):
+            np.testing.assert_array_equal(actual, desired)
+
+    def test_cache(self, tmp_path):
+        root = str(tmp_path / 'data')
+        cachedir = str(tmp_path)
+        _write_session(root)
+        st1 = hc3.load_hc3_spikes(root, fs=FS, n_workers=1, cache=cachedir, **SESSION)
+        cachefiles = [f for f in os.listdir(cachedir) if f.endswith('.npz')]
+        assert len(cachefiles) == 1
+        st2 = hc3.load_hc3_spikes(root, fs=FS, n_workers=1, cache=cachedir, **SESSION)
+        assert st1.n_units == st2.n_units
+        for a, b in zip(st1.time, st2.time):
+            np.testing.assert_array_equal(a, b)
+
+        # modified files invalidate the cache
+        electrodes = _write_session(str(tmp_path / 'data2'), seed=1)
+        sessiondir, prefix = hc3._get_session_dir(root, **SESSION)
+        newdir, _ = hc3._get_session_dir(str(tmp_path / 'data2'), **SESSION)
+        for ff in os.listdir(newdir):
+            os.replace(os.path.join(newdir, ff), os.path.join(sessiondir, ff))
+        st3 = hc3.load_hc3_spikes(root, fs=FS, n_workers=1, cache=cachedir, **SESSION)
+        expected = _reference(electrodes, False)
+        assert st3.n_units == len(expected)
+        for actual, desired in zip(st3.time, expected):
+            np.testing.assert_array_equal(actual, desired)
@@ -0,0 +1,94 @@
+"""HMMSurrogate transition matrix score tests"""
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import nelpy as nel
+from nelpy.analysis import hmm_sparsity
+from nelpy.analysis.ergodic import steady_state
+
+def _make_transmat(n_states=6, seed=0):
+    rng = np.random.RandomState(seed)
+    transmat = rng.uniform(0, 1, (n_states, n_states))**4 + np.eye(n_states)
+    return transmat / transmat.sum(axis=1, keepdims=True)
+
+def _loop_bottleneck(P):
+    """Minimum of Q(S, S^c)/pi(S) over all subsets with pi(S) <= 1/2."""
+    pi = steady_state(P).real
+    k = len(pi)
+    best = 1
+    for size in range(1, k):
+        for S in combinations(range(k), size):
+            Sc = set(range(k)) - set(S)
+            pi_S = sum(pi[i] for i in S)
+            if pi_S > 0.5:
+                continue
+            Q = sum(pi[i]*P[i, j] for i in S for j in Sc)
+            best = min(best, Q / pi_S)
+    return best
+
+def _make_surrogate(num_states=6):
+    rng = np.random.RandomState(0)
+    times = [np.sort(rng.uniform(0, 10, 50)) for _ in range(4)]
+    events = nel.EpochArray([[ii, ii + 0.2] for ii in range(10)])
+    st = nel.SpikeTrainArray(times, support=events)
+    surrogate = hmm_sparsity.HMMSurrogate(kind='actual', st=st, num_states=num_states)
+    surrogate.hmm.transmat_ = _make_transmat(num_states)
+    return surrogate
+
+class TestBottleneckRatio:
+
+    def test_exact_matches_loops(self):
+        for seed in range(3):
+            P = _make_transmat(seed=seed)
+            assert np.isclose(hmm_sparsity.bottleneck_ratio(P, method='exact'),
+                              _loop_bottleneck(P))
+
+    def test_sampled_and_spectral_bounds(self):
+        P = _make_transmat(n_states=8)
+        exact = hmm_sparsity.bottleneck_ratio(P, method='exact', chunksize=50)
+        np.random.seed(0)
+        sampled = hmm_sparsity.bottleneck_ratio(P, n_samples=2000, chunksize=300)
+        lower, upper = hmm_sparsity.bottleneck_ratio(P, method='spectral')
+        assert exact <= sampled + 1e-12
+        assert lower <= exact <= upper
+
+        with pytest.raises(ValueError):
+            hmm_sparsity.bottleneck_ratio(np.eye(20), method='exact')
+
+    def test_random_subsets_are_light(self):
+        pi = np.array([0.45, 0.3, 0.1, 0.1, 0.05])
+        np.random.seed(0)
+        subsets = hmm_sparsity._random_subsets(pi, 500)
+        n_members = subsets.sum(axis=1)
+        assert n_members.min() >= 1 and n_members.max() <= 3
+        assert np.all((subsets @ pi <= 0.5) | (n_members == 1))
+
+class TestMixing:
+
+    def test_mixing_time_matches_powers(self):
+        P = _make_transmat()
+        pi = steady_state(P).real
+        for eps in [0.25, 0.01, 1e-4]:
+            t, Pt = 1, P.copy()
+            while 0.5*np.abs(Pt - pi).sum(axis=1).max() > eps:
+                t, Pt = t + 1, Pt @ P
+            assert hmm_sparsity.mixing_time(P, eps=eps) == t
+
+        # a periodic chain never mixes
+        assert hmm_sparsity.mixing_time(np.array([[0., 1.], [1., 0.]]), t_max=64) == np.inf
+
+    def test_surrogate_scores(self):
+        surrogate = _make_surrogate()
+        surrogate.score_bottleneck_ratio()
+        surrogate.score_bottleneck_ratio(method='spectral')
+        surrogate.score_mixing_time()
+        surrogate.score_spectrum()
+        results = surrogate.results
+        assert np.isclose(results['bottleneck'][0], _loop_bottleneck(surrogate.transmat))
+        lower, upper = results['bottleneck_spectral'][0]
+        assert lower <= results['bottleneck'][0] <= upper
+        assert results['mixing_time'][0] >= 1
+        assert np.isclose(np.abs(results['spectrum'][0][0]), 1)
+        assert 0 < results['spectral_gap'][0] <= 1
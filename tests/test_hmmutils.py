@@ -0,0 +1,99 @@
+"""PoissonHMM forward filter tests"""
+import numpy as np
+from scipy.special import logsumexp
+from scipy.stats import poisson
+
+import nelpy as nel
+from nelpy.hmmutils import PoissonHMM, _cumsum_per_sequence
+from nelpy.analysis import replay
+
+def _make_hmm(n_components=4, n_units=6, seed=0):
+    rng = np.random.RandomState(seed)
+    hmm = PoissonHMM(n_components=n_components)
+    hmm.means_ = rng.uniform(0.1, 3, (n_components, n_units))
+    hmm.means_[0, 0] = 0  # exercise zero rates
+    transmat = rng.uniform(0, 1, (n_components, n_components))
+    hmm.transmat_ = transmat / transmat.sum(axis=1, keepdims=True)
+    hmm.startprob_ = np.ones(n_components) / n_components
+    return hmm
+
+def _make_bst(n_units=6, seed=0):
+    rng = np.random.RandomState(seed)
+    times = [np.sort(rng.uniform(0, 3, 40)) for _ in range(n_units)]
+    st = nel.SpikeTrainArray(times, fs=1000, support=nel.EpochArray([0, 3]))
+    events = nel.EpochArray([[0, 0.5], [1, 1.2], [2, 2.1], [2.5, 2.52]])
+    return st[events].bin(ds=0.02)
+
+def _brute_force_prefix_logprob(hmm, X, lengths, transmat=None):
+    """Log probability of every prefix of every sequence, in log space."""
+    if transmat is None:
+        transmat = hmm.transmat_
+    framelogprob = np.column_stack([poisson.logpmf(X, mu).sum(axis=1)
+                                    for mu in hmm.means_])
+    out = []
+    start = 0
+    for length in lengths:
+        logalpha = np.log(hmm.startprob_) + framelogprob[start]
+        out.append(logsumexp(logalpha))
+        for tt in range(start + 1, start + length):
+            logalpha = logsumexp(logalpha[:, None] + np.log(transmat), axis=0) \
+                + framelogprob[tt]
+            out.append(logsumexp(logalpha))
+        start += length
+    return np.array(out)
+
+class TestForwardFilter:
+
+    def test_feature_matrix(self):
+        hmm = _make_hmm()
+        rng = np.random.RandomState(1)
+        X = rng.poisson(1, (30, 6))
+        X[:, 0] = 0
+        lengths = [10, 1, 19]
+        log_normalizers = hmm.forward_filter(X, lengths=lengths)
+        expected = _brute_force_prefix_logprob(hmm, X, lengths)
+        np.testing.assert_allclose(
+            _cumsum_per_sequence(log_normalizers, lengths), expected)
+
+    def test_batched_transmats(self):
+        hmm = _make_hmm()
+        bst = _make_bst()
+        X = bst.data.T
+        transmats = np.stack([hmm.transmat_,
+                              replay.shuffle_transmat(hmm.transmat_),
+                              np.eye(4)*0.5 + 0.125])
+        log_normalizers = hmm.forward_filter_transmats(bst, transmats)
+        assert log_normalizers.shape == (3, bst.n_bins)
+        for row, transmat in zip(log_normalizers, transmats):
+            np.testing.assert_allclose(
+                _cumsum_per_sequence(row, bst.lengths),
+                _brute_force_prefix_logprob(hmm, X, bst.lengths, transmat))
+
+    def test_score_hmm_time_resolved(self):
+        hmm = _make_hmm()
+        bst = _make_bst()
+        X = bst.data.T
+        lengths = bst.lengths
+        starts = np.cumsum(lengths) - lengths
+
+        np.random.seed(42)
+        scores, shuffled = replay.score_hmm_time_resolved(bst, hmm, n_shuffles=5)
+
+        # reference: the definition, with brute force prefix scores
+        np.random.seed(42)
+        Lbraw = _brute_force_prefix_logprob(hmm, X, lengths)
+        prev = np.r_[0, Lbraw[:-1]]
+        prev[starts] = 0
+        np.testing.assert_allclose(scores, Lbraw - prev)
+        transmat = hmm.transmat_
+        for ii in range(5):
+            transmat = replay.shuffle_transmat(transmat)
+            Lbtmat = _brute_force_prefix_logprob(hmm, X, lengths, transmat)
+            np.testing.assert_allclose(shuffled[ii], Lbtmat - prev)
+
+    def test_sparse_emissions(self):
+        hmm = _make_hmm()
+        bst = _make_bst()
+        sparse_bst = bst.tosparse()
+        np.testing.assert_allclose(hmm.forward_filter(sparse_bst),
+                                   hmm.forward_filter(bst))
@@ -0,0 +1,34 @@
+"""Import-time regression tests"""
+import subprocess
+import sys
+
+import nelpy as nel
+
+def _loaded_after_import(module, candidates):
+    code = ("import sys; import {}; "
+            "print(','.join(m for m in {!r} if m in sys.modules))").format(module, candidates)
+    out = subprocess.check_output([sys.executable, '-c', code])
+    return [m for m in out.decode().strip().split(',') if m]
+
+class TestLazyImport:
+
+    def test_import_nelpy_is_light(self):
+        heavy = ['matplotlib', 'pandas', 'hmmlearn', 'scipy.signal', 'scipy.stats']
+        assert _loaded_after_import('nelpy', heavy) == []
+
+    def test_import_nelpy_all_is_light(self):
+        heavy = ['matplotlib', 'pandas', 'hmmlearn']
+        assert _loaded_after_import('nelpy.all', heavy) == []
+
+    def test_lazy_submodule_access(self):
+        assert nel.metrics.gini is not None
+        assert nel.filtering.__name__ == 'nelpy.filtering'
+        assert 'plotting' in dir(nel)
+
+    def test_unknown_attribute(self):
+        try:
+            nel.this_does_not_exist
+        except AttributeError:
+            pass
+        else:
+            assert False
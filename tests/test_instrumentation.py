@@ -0,0 +1,56 @@
+"""Hot-path instrumentation tests"""
+import nelpy as nel
+from nelpy.utils_.decorators import (Instrumentation,
+                                     instrumented,
+                                     enable_instrumentation,
+                                     disable_instrumentation)
+
+def _make_st():
+    return nel.SpikeTrainArray([[1, 2, 3, 4.5, 6, 8], [1.5, 2.5, 7, 9]],
+                               support=nel.EpochArray([0, 10]))
+
+class TestInstrumentation:
+
+    def test_disabled_records_nothing(self):
+        rec = Instrumentation()
+        st = _make_st()
+        st.bin(ds=1)
+        assert rec.stats == {}
+
+    def test_binning_and_restriction(self):
+        st = _make_st()
+        with Instrumentation() as rec:
+            st[nel.EpochArray([[0, 3], [5, 9]])].bin(ds=0.5)
+        summary = rec.summary(by='category')
+        assert summary['binning']['calls'] == 1
+        assert summary['restriction']['calls'] >= 1
+        assert 'BinnedSpikeTrainArray._bin_spikes' in rec.summary()
+
+    def test_stages_and_merge(self):
+        st = _make_st()
+        runs = []
+        for _ in range(2):
+            with Instrumentation(track_memory=True) as rec:
+                with rec.stage('binning'):
+                    bst = st.bin(ds=0.5)
+                with rec.stage('smoothing'):
+                    bst.smooth(sigma=1)
+            runs.append(rec)
+        total = runs[0] + runs[1]
+        by_stage = total.summary(by='stage/name')
+        assert by_stage[('binning', 'BinnedSpikeTrainArray._bin_spikes')]['calls'] == 2
+        assert by_stage[('smoothing', 'gaussian_filter')]['calls'] == 2
+        assert total.stages['binning']['calls'] == 2
+        assert 'gaussian_filter' in total.report()
+
+    def test_global_switch(self):
+        @instrumented('test')
+        def f(x):
+            return 2*x
+        rec = enable_instrumentation()
+        try:
+            assert f(2) == 4
+        finally:
+            assert disable_instrumentation() is rec
+        assert f(3) == 6
+        assert rec.summary(by='category')['test']['calls'] == 1
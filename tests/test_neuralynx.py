@@ -0,0 +1,98 @@
+"""Neuralynx reader tests"""
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from nelpy.io import neuralynx as nlx
+
+def _header(lines):
+    header = '\n'.join(lines).encode()
+    return header + b'\x00'*(2**14 - len(header))
+
+def _write_ntt(path, n_spikes=500, seed=0):
+    rng = np.random.RandomState(seed)
+    data = np.zeros(n_spikes, dtype=nlx._NTT_DTYPE)
+    data['spiketimes'] = np.sort(rng.randint(0, 60*10**6, n_spikes))
+    data['cellnums'] = rng.randint(0, 5, n_spikes)
+    data['waveforms'] = rng.randint(-2000, 2000, (n_spikes, 32, 4))
+    with open(path, 'wb') as f:
+        f.write(_header(['######## Neuralynx Data File Header',
+                         '-ADBitVolts 0.000000030518 0.000000030518 0.000000030518 0.000000030518',
+                         '-SamplingFrequency 32000']))
+        data.tofile(f)
+    return data
+
+def _write_nvt(path, n_samples=300, seed=0):
+    rng = np.random.RandomState(seed)
+    data = np.zeros(n_samples, dtype=nlx._NVT_DTYPE)
+    data['time'] = np.arange(n_samples) * 33333 + 10**6
+    data['x'] = rng.randint(1, 640, n_samples)
+    data['y'] = rng.randint(1, 480, n_samples)
+    data['x'][::7] = 0
+    data['y'][::7] = 0
+    with open(path, 'wb') as f:
+        f.write(_header(['######## Neuralynx Data File Header']))
+        data.tofile(f)
+    return data
+
+class TestNeuralynx:
+
+    def test_import_does_not_warn(self):
+        subprocess.check_call([sys.executable, '-W', 'error::FutureWarning', '-c',
+                               'import nelpy.io.neuralynx'])
+        assert nlx._NTT_DTYPE.itemsize == 304
+        assert nlx._NTT_DTYPE['cellnums'].shape == ()
+
+    def test_read_ntt_matches_load_ntt(self, tmp_path):
+        path = str(tmp_path / 'TT1.ntt')
+        _write_ntt(path)
+        spiketimes, waveforms, fs, cellnums = nlx.load_ntt(path)
+        ntt_data = nlx.read_ntt(path, fields=['spiketimes', 'cellnums', 'waveforms'])
+        np.testing.assert_array_equal(ntt_data['spiketimes'], spiketimes)
+        np.testing.assert_array_equal(ntt_data['cellnums'], cellnums)
+        np.testing.assert_allclose(ntt_data['waveforms'], waveforms)
+        assert ntt_data['fs'] == fs == 32000
+
+        ntt_data = nlx.read_ntt(path)
+        assert 'waveforms' not in ntt_data
+
+        with pytest.raises(ValueError):
+            nlx.read_ntt(path, fields=['nope'])
+
+    def test_time_range(self, tmp_path):
+        path = str(tmp_path / 'TT1.ntt')
+        data = _write_ntt(path)
+        t = data['spiketimes'] / 1e6
+        ntt_data = nlx.read_ntt(path, start=10, stop=20.5)
+        np.testing.assert_array_equal(ntt_data['spiketimes'], t[(t >= 10) & (t < 20.5)])
+
+        chunks = list(nlx.iter_ntt_waveforms(path, start=10, stop=20.5, chunksize=7))
+        np.testing.assert_array_equal(np.concatenate([c[0] for c in chunks]),
+                                      ntt_data['spiketimes'])
+        assert all(len(c[0]) <= 7 for c in chunks)
+
+    def test_load_ntt_spikes(self, tmp_path):
+        path = str(tmp_path / 'TT1.ntt')
+        data = _write_ntt(path)
+        t = data['spiketimes'] / 1e6
+        st = nlx.load_ntt_spikes(path, start=5, stop=50, unit_ids=[3, 1])
+        assert st.unit_ids == [3, 1]
+        assert st.fs == 32000
+        for unit, cellnum in zip(st.time, [3, 1]):
+            mask = (data['cellnums'] == cellnum) & (t >= 5) & (t < 50)
+            np.testing.assert_array_equal(unit, t[mask])
+        assert st.support.start == 5 and st.support.stop == 50
+
+    def test_load_position(self, tmp_path):
+        path = str(tmp_path / 'VT1.nvt')
+        _write_nvt(path)
+        nvt_data = nlx.load_nvt(path)
+        pos = nlx.load_position(path)
+        np.testing.assert_allclose(pos.time, nvt_data['time'])
+        np.testing.assert_allclose(pos._ydata[0], nvt_data['x'])
+
+        nvt_data = nlx.read_nvt(path, start=2, stop=4)
+        assert nvt_data['time'].min() >= 2 and nvt_data['time'].max() < 4
+        assert np.all(nvt_data['x'] != 0)
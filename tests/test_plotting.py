@@ -0,0 +1,107 @@
+"""Level-of-detail plotting tests"""
+import numpy as np
+import pytest
+
+pytest.importorskip('nelpy.plotting')
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from nelpy.plotting import utils
+
+class TestMinMaxPyramid:
+
+    def test_levels_match_block_envelopes(self):
+        rng = np.random.RandomState(0)
+        x = np.arange(1001) / 100
+        y = rng.randn(1001)
+        pyramid = utils._MinMaxPyramid(x, y)
+        for level, (xl, ymin, ymax) in enumerate(pyramid.levels):
+            size = 2**level
+            blocks = [y[ii:ii+size] for ii in range(0, len(y), size)]
+            np.testing.assert_array_equal(xl, x[::size])
+            np.testing.assert_array_equal(ymin, [b.min() for b in blocks])
+            np.testing.assert_array_equal(ymax, [b.max() for b in blocks])
+
+    def test_get(self):
+        rng = np.random.RandomState(0)
+        x = np.arange(100000) / 1000
+        y = rng.randn(100000)
+        pyramid = utils._MinMaxPyramid(x, y)
+        # zoomed out: a bounded number of vertices, with the full envelope
+        xv, yv = pyramid.get(x[0], x[-1], n_pixels=500)
+        assert len(xv) <= 4*500 + 8
+        assert yv.min() == y.min() and yv.max() == y.max()
+        # zoomed in: the samples themselves, and one more on either side
+        xv, yv = pyramid.get(10, 10.5, n_pixels=500)
+        i0, i1 = np.searchsorted(x, [10, 10.5])
+        np.testing.assert_array_equal(xv, x[i0-1:i1+2])
+        np.testing.assert_array_equal(yv, y[i0-1:i1+2])
+
+class TestSpikePyramid:
+
+    def test_decimation(self):
+        rng = np.random.RandomState(0)
+        times = np.sort(rng.uniform(0, 10, 5000))
+        pyramid = utils._SpikePyramid(times, t0=0, dt=0.001)
+        for level in range(8):
+            width = 0.001 * 2**level
+            occupied = np.unique(np.floor(times / width).astype(np.int64))
+            np.testing.assert_array_equal(pyramid.level(level), occupied)
+            ticks = pyramid.get(2, 3, level)
+            # one tick at the center of every occupied bin that meets [2, 3]
+            expected = occupied[(occupied >= np.floor(2 / width))
+                                & (occupied < np.ceil(3 / width))]
+            np.testing.assert_allclose(ticks, (expected + 0.5) * width)
+        np.testing.assert_array_equal(pyramid.get(2, 3, -1),
+                                      times[(times >= 2) & (times <= 3)])
+        assert pyramid.count(2, 3) == np.sum((times >= 2) & (times <= 3))
+
+    def test_raster_level(self):
+        rng = np.random.RandomState(0)
+        spiketrains = [np.sort(rng.uniform(0, 100, 20000)) for _ in range(3)]
+        fig, ax = plt.subplots()
+        raster = utils.LODRaster(ax, spiketrains, [1, 2, 3], 'k')
+        n_pixels = int(ax.bbox.width)
+        ax.set_xlim(0, 100)
+        # occupied bins are narrower than a pixel, but wider than half a pixel
+        assert len(raster.collection.get_segments()) <= 3 * (2*n_pixels + 2)
+        ax.set_xlim(50, 50.1)
+        n_visible = sum(np.sum((st >= 50) & (st <= 50.1)) for st in spiketrains)
+        assert len(raster.collection.get_segments()) == n_visible
+        plt.close(fig)
+
+class TestEpochCollections:
+
+    def test_merge_epochs(self):
+        starts = np.array([0, 1, 2, 5, 5.5, 9.0])
+        stops = np.array([1.5, 1.8, 3, 6, 5.7, 10])
+        new_starts, new_stops = utils._merge_epochs(starts, stops)
+        np.testing.assert_array_equal(new_starts, [0, 2, 5, 9])
+        np.testing.assert_array_equal(new_stops, [1.8, 3, 6, 10])
+        new_starts, new_stops = utils._merge_epochs(starts, stops, min_gap=0.25)
+        np.testing.assert_array_equal(new_starts, [0, 5, 9])
+        np.testing.assert_array_equal(new_stops, [3, 6, 10])
+
+    @pytest.mark.parametrize('cls, args', [(utils.EpochCollection, (0, 1)),
+                                           (utils.EpochLineCollection, (0.5,))])
+    def test_visible_epochs(self, cls, args):
+        starts = np.arange(0, 1000, 2.0)
+        stops = starts + 1
+        stops[10] = 49.5  # long epoch that overlaps many others
+        fig, ax = plt.subplots()
+        coll = cls(starts, stops, *args)
+        ax.add_collection(coll)
+        ax.set_xlim(30, 60)
+        vis_starts, vis_stops = coll._visible_epochs()
+        # the long epoch absorbs those it overlaps; the remaining ones in
+        # view are separated by more than a pixel, and are drawn as is
+        expected_starts = np.r_[20, np.arange(50, 62, 2.0)]
+        np.testing.assert_array_equal(vis_starts, expected_starts)
+        np.testing.assert_array_equal(vis_stops, np.r_[49.5, expected_starts[1:] + 1])
+        # zoomed out, epochs less than a pixel apart are merged
+        ax.set_xlim(0, 1000)
+        vis_starts, vis_stops = coll._visible_epochs()
+        assert len(vis_starts) == 1
+        assert vis_starts[0] == 0 and vis_stops[0] == 999
+        plt.close(fig)
@@ -0,0 +1,85 @@
+"""Sequence order score tests"""
+from itertools import groupby, permutations
+
+import numpy as np
+
+from nelpy import scoring
+
+class _HMM:
+    def __init__(self, transmat):
+        self.transmat_ = transmat
+
+def _make_hmm(n_states=5, seed=0):
+    rng = np.random.RandomState(seed)
+    transmat = rng.uniform(0, 1, (n_states, n_states))
+    return _HMM(transmat / transmat.sum(axis=1, keepdims=True))
+
+def _make_sequences(n_sequences=20, n_states=5, seed=0):
+    rng = np.random.RandomState(seed)
+    return [rng.randint(0, n_states, rng.randint(1, 12)) for _ in range(n_sequences)]
+
+def _loop_score(logP, pth, no_duplicates, average):
+    """Element-wise reference, as in the original implementation."""
+    if no_duplicates:
+        pth = [x[0] for x in groupby(pth)]
+    score = sum(logP[pth[ii], pth[ii+1]] for ii in range(len(pth)-1))
+    if average:
+        score -= np.log(len(pth))
+    return score
+
+class TestOrderScores:
+
+    def test_scores_match_loops(self):
+        hmm = _make_hmm()
+        logP = np.log(hmm.transmat_)
+        seqs = _make_sequences()
+        for func, no_duplicates, average in [(scoring.scoreOrderND, True, True),
+                                             (scoring.scoreOrderD, False, True),
+                                             (scoring.scoreOrderNAND, True, False),
+                                             (scoring.scoreOrderNA, False, False)]:
+            expected = [_loop_score(logP, seq, no_duplicates, average) for seq in seqs]
+            np.testing.assert_allclose(func(hmm, seqs), expected)
+
+    def test_lengths_and_diversity(self):
+        seqs = [[0, 0, 1, 1, 0], [3], [2, 2, 2], [4, 1, 4, 1]]
+        np.testing.assert_array_equal(scoring.score_plen(None, seqs), [5, 1, 3, 4])
+        np.testing.assert_array_equal(scoring.score_plenND(None, seqs), [3, 1, 1, 4])
+        np.testing.assert_array_equal(scoring.score_SD(None, seqs), [2, 1, 1, 2])
+        comboscore, scores = scoring.bigscore(_make_hmm(), seqs)
+        assert comboscore.shape == (4,)
+
+    def test_concatenated_input(self):
+        hmm = _make_hmm()
+        seqs = _make_sequences()
+        states, lengths = scoring.concatenate_sequences(seqs)
+        logP = np.log(hmm.transmat_)
+        np.testing.assert_allclose(scoring.transition_logprob(logP, states, lengths),
+                                   scoring.scoreOrderNA(hmm, seqs))
+
+    def test_time_swap(self):
+        hmm = _make_hmm()
+        logP = np.log(hmm.transmat_)
+        seqs = _make_sequences(n_sequences=10)
+        seqs = [seq[:5] for seq in seqs]
+        np.random.seed(0)
+        scores, shuffled = scoring.scoreOrderD_time_swap(hmm, seqs, n_shuffles=30)
+        assert shuffled.shape == (30, len(seqs))
+        np.testing.assert_allclose(scores, scoring.scoreOrderD(hmm, seqs))
+        # every shuffled score must be the score of a permutation of its sequence
+        for seqid, seq in enumerate(seqs):
+            attainable = np.array([_loop_score(logP, list(p), False, True)
+                                   for p in permutations(seq)])
+            for value in shuffled[:, seqid]:
+                assert np.min(np.abs(attainable - value)) < 1e-9
+
+    def test_chunked_shuffles(self):
+        logP = np.log(_make_hmm().transmat_)
+        states, lengths = scoring.concatenate_sequences(_make_sequences())
+        np.random.seed(1)
+        a = scoring.shuffled_transition_logprob(logP, states, lengths, n_shuffles=7)
+        np.random.seed(1)
+        b = scoring.shuffled_transition_logprob(logP, states, lengths, n_shuffles=7,
+                                                chunksize=2)
+        assert a.shape == b.shape == (7, len(lengths))
+        # chunks draw the same random keys, row after row:
+        np.testing.assert_allclose(b, a)
@@ -0,0 +1,54 @@
+"""Spike time surrogate tests"""
+import numpy as np
+import pytest
+
+import nelpy as nel
+from nelpy.analysis import surrogates
+
+def _units(st, row):
+    """Split a row of the spike buffer into the spike times of each unit."""
+    edges = np.insert(np.cumsum([len(t) for t in st.time]), 0, 0)
+    return [row[start:stop] for start, stop in zip(edges[:-1], edges[1:])]
+
+class TestSurrogates:
+
+    def test_uniform_jitter(self, st):
+        n_spikes = sum(len(t) for t in st.time)
+        out = np.empty((4, n_spikes))
+        jittered = surrogates.uniform_jitter_st(st, 0.01, n_surrogates=4,
+                                                random_state=1, out=out)
+        assert jittered is out
+        for row in jittered:
+            for original, unit in zip(st.time, _units(st, row)):
+                assert np.all(np.diff(unit) >= 0)
+                assert np.all(np.abs(unit - np.sort(original)) <= 0.01 + 1e-12)
+        again = surrogates.uniform_jitter_st(st, 0.01, n_surrogates=4, random_state=1)
+        np.testing.assert_array_equal(again, jittered)
+        with pytest.raises(ValueError):
+            surrogates.uniform_jitter_st(st, 0.01, n_surrogates=2, out=out)
+
+    def test_interval_jitter(self, st):
+        jittered = surrogates.interval_jitter_st(st, 0.1, n_surrogates=3, random_state=2)
+        for row in jittered:
+            for original, unit in zip(st.time, _units(st, row)):
+                np.testing.assert_array_equal(np.floor(unit / 0.1), np.floor(original / 0.1))
+
+    def test_isi_shuffle(self, st):
+        shuffled = surrogates.isi_shuffle_st(st, n_surrogates=3, random_state=3)
+        for row in shuffled:
+            for original, unit in zip(st.time, _units(st, row)):
+                if len(original):
+                    assert unit[0] == original[0]
+                    np.testing.assert_allclose(np.sort(np.diff(unit)), np.sort(np.diff(original)))
+        assert not np.allclose(shuffled[0], shuffled[1])
+
+    def test_bin_surrogates(self, st):
+        bst = st.bin(ds=0.05)
+        jittered = surrogates.uniform_jitter_st(st, 0.02, n_surrogates=3, random_state=4)
+        counts = surrogates.bin_surrogates(jittered, st, bst)
+        assert counts.shape == (3, st.n_units, bst.n_bins)
+        for row, row_counts in zip(jittered, counts):
+            surrogate = nel.SpikeTrainArray(_units(st, row), fs=1000, support=st.support)
+            np.testing.assert_array_equal(row_counts, surrogate.bin(ds=0.05).data)
+        np.testing.assert_array_equal(surrogates.bin_surrogates(
+            np.concatenate(st.time)[np.newaxis], st, bst)[0], bst.data)
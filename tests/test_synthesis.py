@@ -0,0 +1,51 @@
+"""Poisson spike train synthesis tests"""
+import warnings
+
+import numpy as np
+
+import nelpy as nel
+from nelpy.synthesis import poisson
+
+class TestInhomogeneousPoisson:
+
+    def test_rates(self):
+        t = np.arange(20000) / 100
+        rates = np.vstack([np.full(t.size, 5.),
+                           20 + 20*np.sin(2*np.pi*t/10),
+                           np.zeros(t.size)])
+        st = poisson.inhomogeneous_poisson_st(rates, 100, timestamps=t + 3,
+                                              unit_ids=[4, 5, 6], random_state=0)
+        assert st.unit_ids == [4, 5, 6]
+        assert st.support.start == 3 and st.support.stop == 203
+        expected = rates.sum(axis=1) / 100
+        np.testing.assert_allclose(st.n_spikes[:2], expected[:2], rtol=0.05)
+        assert st.n_spikes[2] == 0
+        for unit_times in st.time:
+            assert np.all(np.diff(unit_times) >= 0)
+            assert np.all((unit_times >= 3) & (unit_times < 203))
+        # spikes follow the rate modulation:
+        phase = ((st.time[1] - 3) % 10) / 10
+        assert np.mean(phase < 0.5) > 0.75
+
+    def test_seed(self):
+        rates = np.full((3, 1000), 10.)
+        st1 = poisson.inhomogeneous_poisson_st(rates, 50, random_state=1)
+        st2 = poisson.inhomogeneous_poisson_st(rates, 50,
+                                               random_state=np.random.default_rng(1))
+        for a, b in zip(st1.time, st2.time):
+            np.testing.assert_array_equal(a, b)
+
+    def test_tuningcurve(self):
+        ratemap = np.zeros((2, 10))
+        ratemap[0, 2] = 50
+        ratemap[1, 7] = 30
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            tc = nel.TuningCurve1D(ratemap=ratemap, extmin=0, extmax=100, unit_ids=[8, 9])
+            x = np.tile(np.arange(100.), 30)
+            pos = nel.AnalogSignalArray(x, timestamps=np.arange(x.size) / 10, fs=10)
+            st = poisson.poisson_st_from_tuningcurve(tc, pos, random_state=2)
+        assert st.unit_ids == [8, 9]
+        for unit_times, (lo, hi) in zip(st.time, [(20, 30), (70, 80)]):
+            at = x[np.floor(unit_times * 10).astype(int)]
+            assert np.all((at >= lo) & (at < hi))
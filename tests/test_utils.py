@@ -1,3 +1,5 @@
+import numpy as np
+
 from nelpy.utils import *
 
 class TestUtils:
@@ -25,4 +27,181 @@ class TestUtils:
     def test_linear_merge5(self):
         """Merge two empty lists"""
         merged = linear_merge([],[])
-        assert list(merged) == []
\ No newline at end of file
+        assert list(merged) == []
+
+class TestRunLengths:
+
+    def test_run_boundaries_split_at_epochs(self):
+        mask = [1, 1, 0, 1, 1, 1, 1, 0]
+        bounds, epochs = get_run_boundaries(mask, lengths=[5, 3], return_epochs=True)
+        assert bounds.tolist() == [[0, 2], [3, 5], [5, 7]]
+        assert epochs.tolist() == [0, 0, 1]
+        bounds = get_run_boundaries(mask, lengths=[5, 0, 3], min_length=2,
+                                    return_epochs=True)[1]
+        assert bounds.tolist() == [0, 0, 2]
+        assert get_run_boundaries(np.zeros(4, dtype=bool)).shape == (0, 2)
+
+    def test_max_run_lengths(self):
+        rng = np.random.RandomState(0)
+        lengths = rng.randint(0, 20, 50)
+        mask = rng.rand(lengths.sum()) > 0.4
+        expected = []
+        start = 0
+        for length in lengths:
+            best = run = 0
+            for b in mask[start:start+length]:
+                run = run + 1 if b else 0
+                best = max(best, run)
+            expected.append(best)
+            start += length
+        assert get_max_run_lengths(mask, lengths=lengths).tolist() == expected
+
+    def test_events_boundaries(self):
+        from nelpy.utils import find_threshold_crossing_events
+        x = np.array([0, 5, 6, 0, 0, 7, 1, 9, 9, 8])
+        events, maxes = find_threshold_crossing_events(x, 5)
+        assert events.tolist() == [[1, 2], [5, 5], [7, 9]]
+        assert maxes.tolist() == [6, 7, 9]
+        bounds, maxes, events = get_events_boundaries(x, PrimaryThreshold=7,
+                                                      SecondaryThreshold=5)
+        assert bounds.tolist() == [[5, 5], [7, 9]]
+        assert maxes.tolist() == [7, 9]
+
+    def test_three_consecutive_bins_above_q(self):
+        from nelpy.analysis.replay import three_consecutive_bins_above_q
+        pvals = np.array([0, 0, 0, 1,    # run of 3, followed by a miss
+                          0, 0, 1, 0,    # no run of 3
+                          1, 0, 0, 0])   # trailing run of 3
+        idx = three_consecutive_bins_above_q(pvals, lengths=[4, 4, 4], q=50)
+        assert idx.tolist() == [0, 2]
+
+def _make_position(n_signals=1, n_samples=6000, fs=60, seed=0):
+    import nelpy as nel
+    rng = np.random.RandomState(seed)
+    t = np.arange(n_samples) / fs
+    x = np.cumsum(rng.randn(n_signals, n_samples), axis=1) * 0.05
+    x[0] += 60*np.sin(t/3)
+    return nel.AnalogSignalArray(x, timestamps=t, fs=fs)
+
+class TestMotionEpochs:
+
+    def test_matches_speed_pipeline(self):
+        from nelpy.utils import (dxdt_AnalogSignalArray, get_run_epochs,
+                                 get_inactive_epochs)
+        for n_signals in [1, 2]:
+            pos = _make_position(n_signals=n_signals)
+            speed = dxdt_AnalogSignalArray(pos, smooth=True)
+            run, rest = get_motion_epochs(pos)
+            expected = get_run_epochs(speed)
+            assert run.n_epochs == expected.n_epochs > 0
+            np.testing.assert_allclose(run.time, expected.time)
+            expected = get_inactive_epochs(speed)
+            assert rest.n_epochs == expected.n_epochs > 0
+            np.testing.assert_allclose(rest.time, expected.time)
+
+    def test_epochs_do_not_cross_support(self):
+        import nelpy as nel
+        pos = _make_position()
+        pos = pos[nel.EpochArray([[0, 20], [20.5, 60], [61, 100]])]
+        run, rest, l2r, r2l = get_motion_epochs(pos, direction=True)
+        for epochs in [run, rest, l2r, r2l]:
+            assert epochs.n_epochs > 0
+            for start, stop in epochs.time:
+                assert np.any((pos.support.starts <= start)
+                              & (stop <= pos.support.stops + 1/pos.fs))
+        # direction epochs tile the samples
+        assert np.isclose(l2r.duration + r2l.duration, pos.n_samples / pos.fs)
+
+    def test_gradient_per_epoch(self):
+        from nelpy.utils import _gradient_per_epoch
+        rng = np.random.RandomState(0)
+        lengths = [5, 1, 2, 7]
+        y = rng.randn(2, 15)
+        grad = _gradient_per_epoch(y, lengths)
+        start = 0
+        for length in lengths:
+            chunk = y[:, start:start+length]
+            expected = np.gradient(chunk, axis=1) if length > 1 else 0
+            np.testing.assert_allclose(grad[:, start:start+length], expected)
+            start += length
+
+class TestContiguousSegments:
+
+    def test_chunked_matches_in_core(self):
+        import warnings
+        rng = np.random.RandomState(0)
+        for _ in range(50):
+            n = rng.randint(2, 300)
+            step = rng.choice([1, 0.001, 1/30000])
+            d = np.where(rng.rand(n) < 0.05, rng.uniform(2, 10, n)*step,
+                         step*rng.uniform(0.9, 1.1, n))
+            data = np.cumsum(d)
+            for index, inclusive in [(False, False), (True, False), (True, True)]:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    expected = get_contiguous_segments(
+                        data, step=step, index=index, inclusive=inclusive)
+                    for chunksize in [1, 7, 1000]:
+                        actual = get_contiguous_segments(
+                            data, step=step, index=index, inclusive=inclusive,
+                            in_core=False, chunksize=chunksize)
+                        np.testing.assert_allclose(actual, expected)
+                    chunks = iter(np.array_split(data, rng.randint(1, 10)))
+                    actual = get_contiguous_segments(
+                        chunks, step=step, index=index, inclusive=inclusive,
+                        in_core=False)
+                    np.testing.assert_allclose(actual, expected)
+
+    def test_chunked_memmap(self, tmp_path):
+        import pytest
+        path = str(tmp_path / 'time.npy')
+        data = np.lib.format.open_memmap(path, mode='w+', shape=(10000,))
+        data[:] = np.arange(10000) / 100
+        data[6000:] += 5
+        data.flush()
+        data = np.load(path, mmap_mode='r')
+        segments = get_contiguous_segments(data, in_core=False, chunksize=999)
+        np.testing.assert_allclose(segments, [[0, 60], [65, 105]])
+        with pytest.raises(NotImplementedError):
+            get_contiguous_segments(data[::-1], in_core=False, chunksize=999)
+
+class TestSpatialMetrics:
+
+    def test_matches_definitions(self):
+        rng = np.random.RandomState(0)
+        ratemaps = rng.gamma(1, 2, (20, 5, 30))
+        ratemaps[..., 5] = 0
+        occupancy = rng.uniform(0, 5, 30)
+        occupancy[10] = 0
+        metrics = spatial_metrics(ratemaps, occupancy)
+        visited = occupancy > 0
+        Pi = occupancy / occupancy.sum()
+        for ii, uu in [(0, 0), (3, 4), (19, 2)]:
+            Ri = ratemaps[ii, uu]
+            R = np.sum(Pi*Ri)
+            info = sum(Pi[i]*(Ri[i]/R)*np.log2(Ri[i]/R)
+                       for i in range(30) if visited[i] and Ri[i] > 0)
+            assert np.isclose(metrics['information'][ii, uu], info)
+            assert np.isclose(metrics['information_rate'][ii, uu], R*info)
+            assert np.isclose(metrics['sparsity'][ii, uu], R**2/np.sum(Pi*Ri**2))
+            assert np.isclose(metrics['selectivity'][ii, uu], Ri[visited].max()/R)
+            x, y = [], []
+            for i in np.flatnonzero(visited):
+                neighbors = [j for j in (i-1, i+1) if 0 <= j < 30 and visited[j]]
+                x.append(Ri[i])
+                y.append(np.mean(Ri[neighbors]))
+            assert np.isclose(metrics['coherence'][ii, uu],
+                              np.arctanh(np.corrcoef(x, y)[0, 1]))
+
+    def test_2d_and_tuning_curve(self):
+        import nelpy as nel
+        rng = np.random.RandomState(1)
+        ratemaps = rng.gamma(1, 2, (7, 6, 5))
+        metrics = spatial_metrics(ratemaps[np.newaxis], np.ones((6, 5)))
+        assert metrics['coherence'].shape == (1, 7)
+        # uniform occupancy information matches spatial_information
+        np.testing.assert_allclose(metrics['information'][0],
+                                   spatial_information(ratemaps))
+        tc = nel.TuningCurve1D(ratemap=ratemaps[:, :, 0])
+        np.testing.assert_allclose(tc.spatial_metrics()['sparsity'],
+                                   spatial_metrics(ratemaps[:, :, 0])['sparsity'])